@@ -124,14 +124,24 @@ interface PicksData {
   }
   copa_del_rey?: { nombre: string; partidos: Partido[]; total_partidos: number }
   metricas_validacion: {
-    brier_score: number
-    log_loss: number
+    brier_score: number | null
+    log_loss: number | null
     total_edge_bets: number
     avg_confidence: number
-    roi_esperado_percent: number
+    roi_esperado_percent: number | null
   }
 }
 
+interface ArtefactoManifest {
+  archivo: string
+  sha256: string
+}
+
+interface PicksManifest {
+  resumen: ArtefactoManifest
+  shards: Record<string, ArtefactoManifest>
+}
+
 /* ─── HELPERS ─── */
 const getConfColor = (c: number) =>
   c >= 75 ? 'from-emerald-400 to-green-500' : c >= 60 ? 'from-amber-400 to-yellow-500' : 'from-rose-400 to-red-500'
@@ -151,6 +161,9 @@ const formatForma = (forma: string) =>
 
 const getCuota = (p: Pick): number | null => p.cuota ?? p.cuota_mercado ?? null
 
+const formatRoi = (roi: number | null): string =>
+  roi == null ? '—' : (roi >= 0 ? '+' : '') + roi + '%'
+
 const catGrad: Record<string, string> = {
   value: 'from-emerald-500 to-green-600',
   medium: 'from-amber-500 to-orange-500',
@@ -172,6 +185,22 @@ async function safeFetch(url: string) {
   }
 }
 
+// Picks troceados por competición/jornada (manifest + shards); el hash evita cachés obsoletas
+async function fetchPicks(): Promise<PicksData | null> {
+  const manifest: PicksManifest | null = await safeFetch('/data/picks/manifest.json')
+  if (!manifest) return safeFetch('/data/picks_complete.json')
+  const url = (a: ArtefactoManifest) => `/data/picks/${a.archivo}?v=${a.sha256}`
+  const competiciones = Object.keys(manifest.shards)
+  const [resumen, ...shards] = await Promise.all([
+    safeFetch(url(manifest.resumen)),
+    ...competiciones.map(c => safeFetch(url(manifest.shards[c]))),
+  ])
+  if (!resumen || shards.some(s => !s)) return safeFetch('/data/picks_complete.json')
+  const jornada = { ...resumen.jornada }
+  competiciones.forEach((c, i) => { jornada[c] = shards[i] })
+  return { ...resumen, jornada }
+}
+
 /* ─── CARD PARTIDO ─── */
 function PartidoCard({ p, isExpanded, onToggle, isChampions }: {
   p: Partido; isExpanded: boolean; onToggle: () => void; isChampions?: boolean
@@ -562,7 +591,7 @@ export default function Home() {
 
   useEffect(() => {
     Promise.all([
-      safeFetch('/data/picks_complete.json'),
+      fetchPicks(),
       safeFetch('/data/combinadas.json'),
       safeFetch('/data/combinadas_champions.json'),
       safeFetch('/data/champions_data.json'),
@@ -685,7 +714,7 @@ export default function Home() {
               {[
                 { Icon: Zap, label: 'Picks EDGE', val: String(picksData.metricas_validacion.total_edge_bets), c: 'emerald' },
                 { Icon: Target, label: 'Confianza', val: picksData.metricas_validacion.avg_confidence + '%', c: 'amber' },
-                { Icon: BarChart3, label: 'ROI Esp.', val: '+' + picksData.metricas_validacion.roi_esperado_percent + '%', c: 'blue' },
+                { Icon: BarChart3, label: 'ROI Backtest', val: formatRoi(picksData.metricas_validacion.roi_esperado_percent), c: 'blue' },
                 { Icon: Activity, label: 'Modelo', val: 'Ensemble', c: 'purple' },
               ].map(({ Icon, label, val, c }) => (
                 <div key={label} className={`bg-${c}-500/10 border border-${c}-500/30 rounded-xl p-4`}>
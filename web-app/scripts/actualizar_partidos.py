@@ -2,14 +2,29 @@
 """
 Actualizador Automático de Partidos
 - Obtiene partidos de la jornada actual
-- Integra con API-Football o scraping de BeSoccer
+- Integra con API-Football (cliente asíncrono, cliente_api.py) o template manual
+- Posición, forma y goles desde la clasificación de la API; cuotas con el
+  mejor precio entre casas
 - Actualiza automáticamente cada semana
 """
 
 import json
-import requests
+import os
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from almacen_datos import AlmacenJornadas
+from equipos import registro_por_defecto, EQUIPOS_PATH
+
+TEMPORADA = '2025-26'
+TEMPORADA_API = int(TEMPORADA[:4])
+# Partidos que se piden a la API: desde hoy hasta VENTANA_DIAS después
+VENTANA_DIAS = 7
+# Sin clasificación ni estadísticas de un equipo: valores neutros de la plantilla
+POSICION_DEFECTO = 10
+GOLES_DEFECTO = 30
+RESULTADOS_FORMA = {'W': ('V', 3), 'D': ('E', 1), 'L': ('D', 0)}
 
 class ActualizadorPartidos:
     """
@@ -48,75 +63,147 @@ class ActualizadorPartidos:
     
     def obtener_partidos_api(self) -> Dict:
         """
-        Obtiene partidos desde API-Football
-        Requiere API key (gratis: 100 requests/día)
+        Partidos de los próximos VENTANA_DIAS días de cada competición desde
+        API-Football, con clasificación y cuotas pedidas en paralelo.
+        Requiere API_FOOTBALL_KEY (gratis: 100 requests/día) salvo con
+        API_OFFLINE=1, que sirve solo desde la caché de respuestas; sin ella o si
+        la API falla devuelve el template manual.
         """
-        # NOTA: Requiere configurar API_KEY en variables de entorno
-        api_key = "TU_API_KEY_AQUI"  # Cambiar por tu API key
-        
-        # Endpoint para LaLiga
-        url = "https://v3.football.api-sports.io/fixtures"
-        headers = {
-            'x-rapidapi-host': "v3.football.api-sports.io",
-            'x-rapidapi-key': api_key
-        }
-        
-        # Próxima jornada de LaLiga (ID 140)
-        params = {
-            'league': 140,
-            'season': 2025,
-            'round': f'Regular Season - {self.jornada_actual}'
-        }
+        from cliente_api import CuotaAgotada, ErrorApi, LIGAS_API, refrescar
         
+        hoy = datetime.now()
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-            data = response.json()
-            
-            if data['response']:
-                return self.formatear_partidos_api(data['response'])
-            
-        except Exception as e:
+            datos = refrescar(LIGAS_API, TEMPORADA_API, hoy.strftime('%Y-%m-%d'),
+                              (hoy + timedelta(days=VENTANA_DIAS)).strftime('%Y-%m-%d'))
+        except (ImportError, ValueError, CuotaAgotada, ErrorApi) as e:
             print(f"❌ Error al obtener de API: {e}")
+            return self.template_manual()
         
-        return self.template_manual()
+        for error in datos['errores']:
+            print(f"⚠️  {error}")
+        if not datos['competiciones']:
+            return self.template_manual()
+        resultado = self.formatear_partidos_api(datos['competiciones'])
+        resultado['peticiones'] = datos['peticiones']
+        resultado['cuota_restante'] = datos['cuota_restante']
+        resultado['cache'] = datos['cache']
+        return resultado
     
-    def formatear_partidos_api(self, partidos_raw: List[Dict]) -> Dict:
-        """Formatea respuesta de API al formato del sistema"""
-        partidos_formateados = []
-        
-        for idx, partido in enumerate(partidos_raw, 1):
-            # Extraer información básica
-            equipo_local = partido['teams']['home']['name']
-            equipo_visitante = partido['teams']['away']['name']
-            fecha = datetime.fromisoformat(partido['fixture']['date'].replace('Z', '+00:00'))
-            
-            partido_data = {
-                "id": idx,
-                "local": equipo_local,
-                "visitante": equipo_visitante,
-                "fecha": fecha.strftime('%Y-%m-%d'),
-                "hora": fecha.strftime('%H:%M'),
-                "estadio": partido['fixture']['venue']['name'],
-                "liga": "LaLiga EA Sports",
-                "local_pos": 10,  # Obtener de tabla
-                "visitante_pos": 10,
-                "local_forma": "EEEEE",  # Obtener de estadísticas
-                "visitante_forma": "EEEEE",
-                "local_goles_favor": 30,
-                "local_goles_contra": 30,
-                "visitante_goles_favor": 30,
-                "visitante_goles_contra": 30,
-                "local_ultimos_5": [1, 1, 1, 1, 1],
-                "visitante_ultimos_5": [1, 1, 1, 1, 1]
-            }
-            
-            partidos_formateados.append(partido_data)
+    def equipo_api(self, equipo: Dict) -> str:
+        """
+        Nombre canónico de un equipo de API-Football: por su id de API si ya
+        se conoce, si no por nombre/alias (y se recuerda su id de API)
+        """
+        registro = registro_por_defecto()
+        ident = registro.buscar_externo('api-football', equipo['id'])
+        if ident is None:
+            ident = registro.id(equipo['name'])
+            registro.anadir_externo('api-football', equipo['id'], ident)
+        return registro.nombres[ident]
+    
+    def datos_equipo(self, equipo_id: int, clasificacion: Dict[int, Dict],
+                     estadisticas: Dict[int, Dict]) -> Dict:
+        """
+        Posición, forma y goles de un equipo: de su fila de la clasificación o,
+        si no aparece en ella, de sus estadísticas de temporada
+        """
+        fila = clasificacion.get(equipo_id)
+        if fila is not None:
+            pos, forma = fila['rank'], fila.get('form') or ''
+            goles_favor, goles_contra = fila['all']['goals']['for'], fila['all']['goals']['against']
+        elif equipo_id in estadisticas:
+            stats = estadisticas[equipo_id]
+            pos, forma = POSICION_DEFECTO, stats.get('form') or ''
+            goles_favor = stats['goals']['for']['total']['total']
+            goles_contra = stats['goals']['against']['total']['total']
+        else:
+            pos, forma, goles_favor, goles_contra = POSICION_DEFECTO, '', GOLES_DEFECTO, GOLES_DEFECTO
         
+        # La API da la forma del más antiguo al más reciente; aquí va primero el último partido
+        ultimos = [RESULTADOS_FORMA[r] for r in reversed(forma[-5:]) if r in RESULTADOS_FORMA]
+        ultimos += [RESULTADOS_FORMA['D']] * (5 - len(ultimos))
         return {
-            'primera_division': partidos_formateados,
-            'jornada': self.jornada_actual
+            'pos': pos,
+            'forma': ''.join(letra for letra, _ in ultimos),
+            'goles_favor': goles_favor,
+            'goles_contra': goles_contra,
+            'ultimos_5': [puntos for _, puntos in ultimos],
         }
     
+    def formatear_partidos_api(self, competiciones: Dict[str, Dict]) -> Dict:
+        """
+        Formatea la respuesta de API al formato del sistema: partidos por
+        competición (ids correlativos entre competiciones, jornada de la ronda
+        de la API) y mejores cuotas por id de partido
+        """
+        from betting_analyzer import NOMBRES_COMPETICION
+        from cliente_api import mejores_cuotas
+        
+        resultado = {'jornada': self.jornada_actual, 'cuotas': {}}
+        siguiente_id = 1
+        for competicion, datos in competiciones.items():
+            clasificacion = {fila['team']['id']: fila for fila in datos['clasificacion']}
+            cuotas_api = mejores_cuotas(datos['cuotas'])
+            partidos_formateados = []
+            
+            for partido in datos['partidos']:
+                # Extraer información básica (equipos con su nombre canónico del registro)
+                equipo_local = self.equipo_api(partido['teams']['home'])
+                equipo_visitante = self.equipo_api(partido['teams']['away'])
+                fecha = datetime.fromisoformat(partido['fixture']['date'].replace('Z', '+00:00'))
+                ronda = partido['league'].get('round', '').rsplit(' - ', 1)[-1]
+                local = self.datos_equipo(partido['teams']['home']['id'], clasificacion, datos['estadisticas'])
+                visitante = self.datos_equipo(partido['teams']['away']['id'], clasificacion, datos['estadisticas'])
+                
+                partido_data = {
+                    "id": siguiente_id,
+                    "jornada": int(ronda) if ronda.isdigit() else self.jornada_actual,
+                    "local": equipo_local,
+                    "visitante": equipo_visitante,
+                    "fecha": fecha.strftime('%Y-%m-%d'),
+                    "hora": fecha.strftime('%H:%M'),
+                    "estadio": (partido['fixture'].get('venue') or {}).get('name') or '',
+                    "liga": NOMBRES_COMPETICION.get(competicion, partido['league']['name']),
+                    "local_pos": local['pos'],
+                    "visitante_pos": visitante['pos'],
+                    "local_forma": local['forma'],
+                    "visitante_forma": visitante['forma'],
+                    "local_goles_favor": local['goles_favor'],
+                    "local_goles_contra": local['goles_contra'],
+                    "visitante_goles_favor": visitante['goles_favor'],
+                    "visitante_goles_contra": visitante['goles_contra'],
+                    "local_ultimos_5": local['ultimos_5'],
+                    "visitante_ultimos_5": visitante['ultimos_5']
+                }
+                if cuotas_api.get(partido['fixture']['id']):
+                    resultado['cuotas'][siguiente_id] = cuotas_api[partido['fixture']['id']]
+                
+                partidos_formateados.append(partido_data)
+                siguiente_id += 1
+            resultado[competicion] = partidos_formateados
+        
+        # Ids de API aprendidos y equipos nuevos quedan en el registro
+        registro = registro_por_defecto()
+        if registro.modificado:
+            registro.guardar(os.getenv('EQUIPOS_PATH', EQUIPOS_PATH))
+        
+        return resultado
+    
+    def guardar_jornadas_api(self, data: Dict, almacen: Optional[AlmacenJornadas] = None) -> List[str]:
+        """Guarda en el almacén cada (competición, jornada) obtenida de la API con sus cuotas"""
+        from cliente_api import LIGAS_API
+        
+        almacen = almacen or AlmacenJornadas()
+        paths = []
+        for competicion in LIGAS_API:
+            por_jornada = defaultdict(list)
+            for partido in data.get(competicion, []):
+                por_jornada[partido['jornada']].append(partido)
+            for jornada, partidos in sorted(por_jornada.items()):
+                cuotas = {p['id']: data['cuotas'][p['id']] for p in partidos if p['id'] in data['cuotas']}
+                paths.append(almacen.guardar(TEMPORADA, competicion, jornada, partidos, cuotas))
+        return paths
+    
     def template_manual(self) -> Dict:
         """
         Template para actualización manual
@@ -193,8 +280,11 @@ class ActualizadorPartidos:
                 print("\n⚠️  Template no actualizado. Por favor, edita partidos_template.json")
                 return False
             
-            # Todo OK, proceder
+            # Todo OK, guardar la jornada en el almacén que lee el analizador
             print("✅ Partidos actualizados detectados")
+            path = AlmacenJornadas().guardar(TEMPORADA, 'primera_division',
+                                             data['jornada'], data['primera_division'])
+            print(f"💾 Jornada {data['jornada']} guardada en: {path}")
             return True
             
         except FileNotFoundError:
@@ -209,11 +299,31 @@ def main():
     print("=" * 70)
     print()
     
-    actualizador = ActualizadorPartidos(modo='manual')
+    # Con API_FOOTBALL_KEY (o API_OFFLINE=1 desde la caché) los partidos se
+    # descargan y se guardan en el almacén
+    modo = 'api' if os.getenv('API_FOOTBALL_KEY') or os.getenv('API_OFFLINE') == '1' else 'manual'
+    actualizador = ActualizadorPartidos(modo=modo)
     
     print(f"📅 Jornada calculada: {actualizador.jornada_actual}")
     print()
     
+    if modo == 'api':
+        inicio = datetime.now()
+        data = actualizador.obtener_partidos_api()
+        if data.get('modo') != 'manual':
+            segundos = (datetime.now() - inicio).total_seconds()
+            for path in actualizador.guardar_jornadas_api(data):
+                print(f"💾 Jornada guardada en: {path}")
+            print(f"🌐 {data['peticiones']} peticiones a API-Football en {segundos:.2f}s | "
+                  f"{len(data['cuotas'])} partidos con cuotas | cuota restante hoy: {data['cuota_restante']}")
+            if data['cache']:
+                cache = data['cache']
+                tasa = f"{cache['tasa_aciertos']:.0%}" if cache['tasa_aciertos'] is not None else '-'
+                print(f"🗄️  Caché: {cache['aciertos']} aciertos ({tasa}), {cache['revalidadas']} revalidadas (304), "
+                      f"{cache['descargas']} descargas, {cache['caducadas']} caducadas servidas")
+            return
+        print("↩️  Se genera el template manual")
+    
     # Generar template
     actualizador.guardar_template()
     
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Ajuste de máxima verosimilitud del modelo Dixon-Coles
+- Estima ataque/defensa por equipo, ventaja local y rho desde resultados históricos
+- Log-verosimilitud y gradiente analítico totalmente vectorizados
+- Pesos con decaimiento temporal exponencial (Dixon & Coles, 1997)
+- Arranque en caliente desde los parámetros de la jornada anterior
+
+Modelo: λ_local = exp(home + ataque[local] + defensa[visitante])
+        μ_visit = exp(ataque[visitante] + defensa[local])
+con la restricción de identificabilidad media(ataque) = 0.
+
+Formato de resultados (CSV): fecha,liga,local,visitante,goles_local,goles_visitante
+"""
+
+import csv
+import json
+import os
+import sys
+import numpy as np
+from datetime import datetime
+from typing import Dict, Optional
+
+from equipos import registro_por_defecto
+
+# Decaimiento por día: semivida de ~1 año
+XI_DEFECTO = 0.0019
+RHO_LIMITES = (-0.2, 0.2)
+PARAMETROS_PATH = 'data/parametros_dc.json'
+RESULTADOS_PATH = 'data/resultados.csv'
+
+
+def cargar_resultados(path: str = RESULTADOS_PATH) -> Dict[str, np.ndarray]:
+    """Lee el CSV de resultados a arrays columnares (equipos con su nombre canónico)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        filas = list(csv.DictReader(f))
+
+    registro = registro_por_defecto()
+    return {
+        'fecha': np.array([fila['fecha'] for fila in filas], dtype='datetime64[D]'),
+        'liga': np.array([fila['liga'] for fila in filas]),
+        'local': registro.canonicos(np.array([fila['local'] for fila in filas])),
+        'visitante': registro.canonicos(np.array([fila['visitante'] for fila in filas])),
+        'goles_local': np.array([int(fila['goles_local']) for fila in filas]),
+        'goles_visitante': np.array([int(fila['goles_visitante']) for fila in filas]),
+    }
+
+
+class AjustadorDixonColes:
+    """Ajusta los parámetros Dixon-Coles por máxima verosimilitud ponderada"""
+
+    def __init__(self, xi: float = XI_DEFECTO):
+        self.xi = xi
+        self.parametros: Optional[Dict] = None
+
+    def _preparar(self, resultados: Dict[str, np.ndarray], fecha_referencia=None):
+        """Índices enteros de equipos y pesos temporales"""
+        fechas = resultados['fecha']
+        if fecha_referencia is None:
+            fecha_referencia = fechas.max()
+        fecha_referencia = np.datetime64(fecha_referencia, 'D')
+
+        # Solo partidos anteriores a la fecha de referencia (sin fuga de datos)
+        mascara = fechas <= fecha_referencia
+        local = resultados['local'][mascara]
+        visitante = resultados['visitante'][mascara]
+
+        self.equipos, indices = np.unique(np.concatenate([local, visitante]), return_inverse=True)
+        self.idx_local = indices[:len(local)]
+        self.idx_visitante = indices[len(local):]
+        self.x = resultados['goles_local'][mascara].astype(float)
+        self.y = resultados['goles_visitante'][mascara].astype(float)
+
+        dias = (fecha_referencia - fechas[mascara]).astype(float)
+        self.pesos = np.exp(-self.xi * dias)
+        self.fecha_referencia = str(fecha_referencia)
+
+        # Máscaras de las 4 celdas con corrección tau
+        self.m00 = (self.x == 0) & (self.y == 0)
+        self.m01 = (self.x == 0) & (self.y == 1)
+        self.m10 = (self.x == 1) & (self.y == 0)
+        self.m11 = (self.x == 1) & (self.y == 1)
+
+    def _desempaquetar(self, theta: np.ndarray):
+        n = len(self.equipos)
+        return theta[:n], theta[n:2 * n], theta[2 * n], theta[2 * n + 1]
+
+    def negativa_log_verosimilitud(self, theta: np.ndarray):
+        """-log L ponderada y su gradiente analítico"""
+        n = len(self.equipos)
+        ataque, defensa, home, rho = self._desempaquetar(theta)
+        i, j = self.idx_local, self.idx_visitante
+
+        log_lam = home + ataque[i] + defensa[j]
+        log_mu = ataque[j] + defensa[i]
+        lam = np.exp(log_lam)
+        mu = np.exp(log_mu)
+
+        # Término tau y sus derivadas respecto a log λ, log μ y rho
+        tau = np.ones_like(lam)
+        d_lam = np.zeros_like(lam)
+        d_mu = np.zeros_like(lam)
+        d_rho = np.zeros_like(lam)
+
+        tau[self.m00] = 1 - lam[self.m00] * mu[self.m00] * rho
+        tau[self.m01] = 1 + lam[self.m01] * rho
+        tau[self.m10] = 1 + mu[self.m10] * rho
+        tau[self.m11] = 1 - rho
+        tau = np.maximum(tau, 1e-10)
+
+        d_lam[self.m00] = -lam[self.m00] * mu[self.m00] * rho
+        d_mu[self.m00] = d_lam[self.m00]
+        d_rho[self.m00] = -lam[self.m00] * mu[self.m00]
+        d_lam[self.m01] = lam[self.m01] * rho
+        d_rho[self.m01] = lam[self.m01]
+        d_mu[self.m10] = mu[self.m10] * rho
+        d_rho[self.m10] = mu[self.m10]
+        d_rho[self.m11] = -1.0
+
+        w = self.pesos
+        log_l = w * (np.log(tau) + self.x * log_lam - lam + self.y * log_mu - mu)
+
+        g_lam = w * (self.x - lam + d_lam / tau)
+        g_mu = w * (self.y - mu + d_mu / tau)
+
+        grad_ataque = np.bincount(i, g_lam, n) + np.bincount(j, g_mu, n)
+        grad_defensa = np.bincount(j, g_lam, n) + np.bincount(i, g_mu, n)
+        grad_home = g_lam.sum()
+        grad_rho = (w * d_rho / tau).sum()
+
+        # Restricción media(ataque) = 0 como penalización cuadrática
+        media = ataque.mean()
+        penal = n * media ** 2
+        grad_ataque = -grad_ataque + 2 * media
+
+        valor = -log_l.sum() + penal
+        grad = np.concatenate([grad_ataque, -grad_defensa, [-grad_home, -grad_rho]])
+        return valor, grad
+
+    def _theta_inicial(self, previos: Optional[Dict]) -> np.ndarray:
+        """Arranque en caliente: reutiliza los parámetros de la jornada anterior"""
+        n = len(self.equipos)
+        theta = np.zeros(2 * n + 2)
+        theta[2 * n] = 0.25
+        theta[2 * n + 1] = 0.0
+        if previos:
+            for k, equipo in enumerate(self.equipos):
+                if equipo in previos['ataque']:
+                    theta[k] = previos['ataque'][equipo]
+                    theta[n + k] = previos['defensa'][equipo]
+            theta[2 * n] = previos['home']
+            theta[2 * n + 1] = previos['rho']
+        return theta
+
+    def ajustar(self, resultados: Dict[str, np.ndarray], fecha_referencia=None,
+                previos: Optional[Dict] = None) -> Dict:
+        """Ajusta el modelo y devuelve los parámetros por nombre de equipo"""
+        # scipy solo se carga cuando se usa el ajuste
+        from scipy.optimize import minimize
+
+        self._preparar(resultados, fecha_referencia)
+        n = len(self.equipos)
+        theta0 = self._theta_inicial(previos)
+
+        limites = [(None, None)] * (2 * n + 1) + [RHO_LIMITES]
+        res = minimize(self.negativa_log_verosimilitud, theta0, jac=True,
+                       method='L-BFGS-B', bounds=limites)
+
+        ataque, defensa, home, rho = self._desempaquetar(res.x)
+        self.parametros = {
+            'fecha_referencia': self.fecha_referencia,
+            'xi': self.xi,
+            'partidos': int(len(self.x)),
+            'iteraciones': int(res.nit),
+            'log_verosimilitud': float(-res.fun),
+            'home': float(home),
+            'rho': float(rho),
+            'ataque': {str(e): float(a) for e, a in zip(self.equipos, ataque)},
+            'defensa': {str(e): float(d) for e, d in zip(self.equipos, defensa)},
+        }
+        return self.parametros
+
+    @staticmethod
+    def cargar(path: str = PARAMETROS_PATH) -> Optional[Dict]:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def guardar(self, path: str = PARAMETROS_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.parametros, f, ensure_ascii=False, indent=2)
+
+
+def lambdas_ajustadas(parametros: Dict, local: str, visitante: str):
+    """Goles esperados de un partido con los parámetros ajustados (None si falta un equipo)"""
+    ataque, defensa = parametros['ataque'], parametros['defensa']
+    if local not in ataque or visitante not in ataque:
+        return None
+    lambda_home = np.exp(parametros['home'] + ataque[local] + defensa[visitante])
+    lambda_away = np.exp(ataque[visitante] + defensa[local])
+    return lambda_home, lambda_away
+
+
+def main():
+    """Reajusta tras cada jornada arrancando desde los parámetros anteriores"""
+    resultados_path = sys.argv[1] if len(sys.argv) > 1 else RESULTADOS_PATH
+    parametros_path = os.getenv('PARAMETROS_DC_PATH', PARAMETROS_PATH)
+
+    resultados = cargar_resultados(resultados_path)
+    previos = AjustadorDixonColes.cargar(parametros_path)
+
+    inicio = datetime.now()
+    ajustador = AjustadorDixonColes()
+    parametros = ajustador.ajustar(resultados, previos=previos)
+    ajustador.guardar(parametros_path)
+    segundos = (datetime.now() - inicio).total_seconds()
+
+    print(f"✅ Ajuste Dixon-Coles: {parametros['partidos']} partidos, "
+          f"{len(parametros['ataque'])} equipos, {parametros['iteraciones']} iteraciones en {segundos:.2f}s")
+    print(f"🏠 Ventaja local: {np.exp(parametros['home']):.3f} | rho: {parametros['rho']:.3f}")
+    print(f"💾 Parámetros guardados en: {parametros_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Almacén de snapshots de cuotas multi-casa
+- Append-only y columnar: un fichero binario por columna en data/cuotas
+  (timestamp, partido, casa, selección, cuota), leídos con np.memmap
+- El partido se guarda como clave estable (equipos canónicos + fecha, ver
+  claves_snapshot): los ids de partido se reinician cada jornada y temporada
+- Índice de la cuota vigente por (partido, casa, selección) y de la mejor
+  cuota por (partido, selección): consulta O(1) de "mejor precio actual"
+- Escaneo por rango de tiempo para el movimiento de línea (searchsorted
+  mientras los snapshots lleguen en orden temporal)
+- Feeds simulados con ficheros locales: un JSON por snapshot de una casa
+  {"casa": "...", "timestamp": "2026-02-20T10:00:00", "cuotas": {"<id partido>": {"home": 2.1, ...}}}
+  Tanto el id de partido como los nombres de equipo se cruzan contra los
+  partidos de la jornada; los nombres, con el registro de equipos (equipos.py):
+  "partidos": [{"local": "Atletico Madrid", "visitante": "Sevilla", "cuotas": {...}}]
+"""
+
+import json
+import os
+import sys
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from equipos import BITS_EQUIPO, clave_partido, unir
+from registros import TablaPartidos
+
+CUOTAS_DIR = 'data/cuotas'
+# 2: partido = claves_snapshot (antes, id de partido de la jornada)
+FORMATO = 2
+SELECCIONES = ('home', 'draw', 'away', 'btts_yes', 'btts_no', 'over25', 'under25')
+COLUMNAS = {
+    'ts': np.int64,
+    'partido': np.int64,
+    'casa': np.int16,
+    'seleccion': np.int8,
+    'cuota': np.float32,
+}
+
+
+def _segundos(timestamp: str) -> int:
+    return int(datetime.fromisoformat(timestamp).timestamp())
+
+
+def claves_snapshot(tabla_partidos: TablaPartidos) -> np.ndarray:
+    """
+    Clave de cada partido en el almacén: (local, visitante) canónicos y fecha.
+    El par de equipos no se repite en una competición y temporada; la fecha
+    separa temporadas. Sin fecha cuenta solo el par.
+    """
+    nombres = tabla_partidos.textos.nombres
+    fechas = np.array([nombres[i] or 'NaT' for i in tabla_partidos.datos['fecha'].tolist()], dtype='datetime64[D]')
+    dias = np.where(np.isnat(fechas), 0, fechas.astype(np.int64))
+    return dias << (2 * BITS_EQUIPO) | tabla_partidos.claves()
+
+
+class AlmacenCuotas:
+    """Snapshots de cuotas de muchas casas con índice de mejor precio"""
+
+    def __init__(self, base_dir: str = CUOTAS_DIR):
+        self.base_dir = base_dir
+        self.casas: List[str] = []
+        self.ordenado = True
+        self.sin_cruzar = 0  # entradas sin partido de la jornada en la última ingesta
+        self._cargar_meta()
+        self._cargar_indice()
+
+    def _path(self, nombre: str) -> str:
+        return os.path.join(self.base_dir, nombre)
+
+    def _cargar_meta(self):
+        path = self._path('meta.json')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('formato') != FORMATO:
+                raise ValueError(f"{self.base_dir}: snapshots indexados por id de partido (formato antiguo); "
+                                 f"vuelve a ingerirlos en un directorio vacío")
+            self.casas = meta['casas']
+            self.ordenado = meta['ordenado']
+
+    def _guardar_meta(self):
+        with open(self._path('meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'formato': FORMATO, 'casas': self.casas, 'ordenado': self.ordenado,
+                       'filas': self.filas(), 'selecciones': SELECCIONES}, f, ensure_ascii=False)
+
+    def columna(self, nombre: str) -> np.ndarray:
+        """Columna completa mapeada en memoria (sin copiarla)"""
+        path = self._path(f'{nombre}.bin')
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.empty(0, dtype=COLUMNAS[nombre])
+        return np.memmap(path, dtype=COLUMNAS[nombre], mode='r')
+
+    def filas(self) -> int:
+        path = self._path('ts.bin')
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    def _cargar_indice(self):
+        """Índice persistido; se reconstruye si no cubre todas las filas"""
+        path = self._path('indice.npz')
+        if os.path.exists(path):
+            with np.load(path) as indice:
+                if int(indice['filas']) == self.filas():
+                    self.partidos = {int(p): k for k, p in enumerate(indice['partidos'])}
+                    self.actual = indice['actual']
+                    self.actual_ts = indice['actual_ts']
+                    self.mejor_cuota = indice['mejor_cuota']
+                    self.mejor_casa = indice['mejor_casa']
+                    return
+        self.partidos = {}
+        self.actual = np.full((0, len(self.casas), len(SELECCIONES)), np.nan, dtype=np.float32)
+        self.actual_ts = np.full(self.actual.shape, np.iinfo(np.int64).min, dtype=np.int64)
+        self.mejor_cuota = np.full((0, len(SELECCIONES)), np.nan, dtype=np.float32)
+        self.mejor_casa = np.full((0, len(SELECCIONES)), -1, dtype=np.int16)
+        if self.filas():
+            columnas = {nombre: self.columna(nombre) for nombre in COLUMNAS}
+            self._indexar(columnas)
+
+    def _guardar_indice(self):
+        np.savez(self._path('indice.npz'), filas=np.array(self.filas()),
+                 partidos=np.array(list(self.partidos), dtype=np.int64),
+                 actual=self.actual, actual_ts=self.actual_ts,
+                 mejor_cuota=self.mejor_cuota, mejor_casa=self.mejor_casa)
+
+    def _ampliar(self, n_partidos: int, n_casas: int):
+        """Agranda las matrices del índice para nuevos partidos/casas"""
+        p, c, s = self.actual.shape
+        if n_partidos <= p and n_casas <= c:
+            return
+        n_partidos, n_casas = max(n_partidos, p), max(n_casas, c)
+        actual = np.full((n_partidos, n_casas, s), np.nan, dtype=np.float32)
+        actual_ts = np.full(actual.shape, np.iinfo(np.int64).min, dtype=np.int64)
+        actual[:p, :c] = self.actual
+        actual_ts[:p, :c] = self.actual_ts
+        self.actual, self.actual_ts = actual, actual_ts
+        extra = n_partidos - p
+        self.mejor_cuota = np.concatenate([self.mejor_cuota, np.full((extra, s), np.nan, dtype=np.float32)])
+        self.mejor_casa = np.concatenate([self.mejor_casa, np.full((extra, s), -1, dtype=np.int16)])
+
+    def _indexar(self, columnas: Dict[str, np.ndarray]):
+        """Aplica un bloque de snapshots al índice de cuota vigente y mejor cuota"""
+        partidos, inverso = np.unique(columnas['partido'], return_inverse=True)
+        slots_unicos = np.array([self.partidos.setdefault(p, len(self.partidos)) for p in partidos.tolist()],
+                                dtype=np.intp)
+        self._ampliar(len(self.partidos), len(self.casas))
+        n_casas, n_sel = self.actual.shape[1:]
+
+        slots = slots_unicos[inverso.ravel()]
+        casa = columnas['casa'].astype(np.intp)
+        sel = columnas['seleccion'].astype(np.intp)
+
+        # Último snapshot del bloque por (partido, casa, selección)
+        clave = (slots * n_casas + casa) * n_sel + sel
+        orden = np.lexsort((columnas['ts'], clave))
+        ultimo = orden[np.append(clave[orden][1:] != clave[orden][:-1], True)]
+
+        p, c, s = slots[ultimo], casa[ultimo], sel[ultimo]
+        nuevo = columnas['ts'][ultimo] >= self.actual_ts[p, c, s]
+        p, c, s, ultimo = p[nuevo], c[nuevo], s[nuevo], ultimo[nuevo]
+        self.actual[p, c, s] = columnas['cuota'][ultimo]
+        self.actual_ts[p, c, s] = columnas['ts'][ultimo]
+
+        # Mejor cuota solo de los pares (partido, selección) tocados: O(casas) cada uno
+        pares = np.unique(p * n_sel + s)
+        p, s = pares // n_sel, pares % n_sel
+        if len(pares):
+            cuotas = self.actual[p, :, s]
+            con_cuota = ~np.isnan(cuotas).all(axis=1)
+            mejor = np.where(con_cuota, np.argmax(np.where(np.isnan(cuotas), -np.inf, cuotas), axis=1), -1)
+            self.mejor_casa[p, s] = mejor
+            self.mejor_cuota[p, s] = np.where(con_cuota, cuotas[np.arange(len(pares)), np.maximum(mejor, 0)], np.nan)
+
+    def _id_casa(self, casa: str) -> int:
+        if casa not in self.casas:
+            self.casas.append(casa)
+        return self.casas.index(casa)
+
+    def anadir(self, ts, partido, casa, seleccion, cuota) -> int:
+        """Añade snapshots (arrays alineados; partido como claves_snapshot, casa y selección por nombre)"""
+        nombres_casa, inv_casa = np.unique(np.asarray(casa), return_inverse=True)
+        ids_casa = np.array([self._id_casa(str(nombre)) for nombre in nombres_casa], dtype=np.int16)
+        nombres_sel, inv_sel = np.unique(np.asarray(seleccion), return_inverse=True)
+        ids_sel = np.array([SELECCIONES.index(str(nombre)) for nombre in nombres_sel], dtype=np.int8)
+        return self._anadir_columnas({
+            'ts': np.asarray(ts, dtype=np.int64),
+            'partido': np.asarray(partido, dtype=np.int64),
+            'casa': ids_casa[inv_casa.ravel()],
+            'seleccion': ids_sel[inv_sel.ravel()],
+            'cuota': np.asarray(cuota, dtype=np.float32),
+        })
+
+    def _anadir_columnas(self, columnas: Dict[str, np.ndarray]) -> int:
+        """Añade un bloque ya codificado (ids de casa y selección)"""
+        if not len(columnas['ts']):
+            return 0
+        orden = np.argsort(columnas['ts'], kind='stable')
+        columnas = {nombre: valores[orden].astype(COLUMNAS[nombre]) for nombre, valores in columnas.items()}
+
+        ts_previo = self.columna('ts')
+        if len(ts_previo) and columnas['ts'][0] < ts_previo[-1]:
+            self.ordenado = False
+        del ts_previo
+
+        os.makedirs(self.base_dir, exist_ok=True)
+        for nombre, valores in columnas.items():
+            with open(self._path(f'{nombre}.bin'), 'ab') as f:
+                f.write(valores.tobytes())
+
+        self._indexar(columnas)
+        self._guardar_meta()
+        self._guardar_indice()
+        return len(columnas['ts'])
+
+    def ingerir_snapshots(self, paths: List[str], tabla_partidos: Optional[TablaPartidos] = None) -> int:
+        """
+        Ingiere ficheros JSON de snapshot (una casa cada uno) en un solo bloque.
+        Las entradas por id de partido o por nombre de equipo se cruzan con
+        tabla_partidos (las jornadas en curso: ids únicos); las que no cruzan se
+        cuentan en self.sin_cruzar.
+        """
+        id_seleccion = {seleccion: k for k, seleccion in enumerate(SELECCIONES)}
+        ts, partidos, casas, selecciones, cuotas = [], [], [], [], []
+        snapshots = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            snapshots.append((_segundos(snapshot['timestamp']), self._id_casa(snapshot['casa']), snapshot))
+        por_nombre = iter(self._cruzar_nombres([snapshot for _, _, snapshot in snapshots], tabla_partidos))
+        por_id = {} if tabla_partidos is None else dict(zip(tabla_partidos.datos['id'].tolist(),
+                                                           claves_snapshot(tabla_partidos).tolist()))
+        for segundos, casa, snapshot in snapshots:
+            entradas = [(por_id.get(int(partido), -1), cuotas_p)
+                        for partido, cuotas_p in snapshot.get('cuotas', {}).items()]
+            self.sin_cruzar += sum(clave < 0 for clave, _ in entradas)
+            entradas += [(next(por_nombre), entrada['cuotas']) for entrada in snapshot.get('partidos', [])]
+            for partido, cuotas_partido in entradas:
+                if partido < 0:
+                    continue
+                for seleccion, cuota in cuotas_partido.items():
+                    if seleccion in id_seleccion and cuota:
+                        ts.append(segundos)
+                        partidos.append(partido)
+                        casas.append(casa)
+                        selecciones.append(id_seleccion[seleccion])
+                        cuotas.append(float(cuota))
+        return self._anadir_columnas({'ts': np.array(ts), 'partido': np.array(partidos),
+                                      'casa': np.array(casas), 'seleccion': np.array(selecciones),
+                                      'cuota': np.array(cuotas)})
+
+    def _cruzar_nombres(self, snapshots: List[Dict], tabla_partidos: Optional[TablaPartidos]) -> List[int]:
+        """Clave (claves_snapshot) de cada entrada por nombre (en orden), -1 si no cruza"""
+        entradas = [entrada for snapshot in snapshots for entrada in snapshot.get('partidos', [])]
+        self.sin_cruzar = 0
+        if not entradas:
+            return []
+        if tabla_partidos is None:
+            self.sin_cruzar = len(entradas)
+            return [-1] * len(entradas)
+        registro = tabla_partidos.equipos
+        claves = clave_partido(registro.ids([e['local'] for e in entradas], registrar=False),
+                               registro.ids([e['visitante'] for e in entradas], registrar=False))
+        posicion = unir(claves, tabla_partidos.claves())
+        self.sin_cruzar = int((posicion < 0).sum())
+        return np.where(posicion >= 0, claves_snapshot(tabla_partidos)[posicion], -1).tolist()
+
+    def mejor(self, partido: int, seleccion: str) -> Optional[Tuple[float, str]]:
+        """Mejor cuota vigente y su casa (partido como claves_snapshot), O(1)"""
+        slot = self.partidos.get(partido)
+        if slot is None:
+            return None
+        s = SELECCIONES.index(seleccion)
+        casa = int(self.mejor_casa[slot, s])
+        if casa < 0:
+            return None
+        return float(self.mejor_cuota[slot, s]), self.casas[casa]
+
+    def mejores_cuotas(self, tabla_partidos: TablaPartidos) -> Dict[int, Dict[str, float]]:
+        """
+        Mejores cuotas vigentes de los partidos de la tabla (cruzados por
+        equipos canónicos y fecha) por id de partido, con el formato de market_odds
+        """
+        indexados = np.fromiter(self.partidos, dtype=np.int64, count=len(self.partidos))
+        slots = unir(claves_snapshot(tabla_partidos), indexados)
+        resultado = {}
+        for partido_id, slot in zip(tabla_partidos.datos['id'].tolist(), slots.tolist()):
+            if slot < 0:
+                continue
+            fila = self.mejor_cuota[slot]
+            resultado[partido_id] = {sel: round(float(c), 2) for sel, c in zip(SELECCIONES, fila.tolist())
+                                     if not np.isnan(c)}
+        return resultado
+
+    def movimiento(self, partido: int, seleccion: str, desde: Optional[str] = None,
+                   hasta: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Snapshots de una selección (partido como claves_snapshot) en un rango de tiempo: ts, casa, cuota"""
+        ts = self.columna('ts')
+        inicio = _segundos(desde) if desde else np.iinfo(np.int64).min
+        fin = _segundos(hasta) if hasta else np.iinfo(np.int64).max
+        if self.ordenado:
+            rango = np.arange(np.searchsorted(ts, inicio, 'left'), np.searchsorted(ts, fin, 'right'))
+        else:
+            rango = np.flatnonzero((ts >= inicio) & (ts <= fin))
+
+        mascara = ((self.columna('partido')[rango] == partido) &
+                   (self.columna('seleccion')[rango] == SELECCIONES.index(seleccion)))
+        filas = rango[mascara]
+        return {
+            'ts': np.asarray(ts[filas]),
+            'casa': np.array(self.casas)[self.columna('casa')[filas]] if len(filas) else np.array([], dtype=str),
+            'cuota': np.asarray(self.columna('cuota')[filas]),
+        }
+
+
+def main():
+    """
+    python scripts/almacen_cuotas.py ingerir <snapshot.json> [...]
+    python scripts/almacen_cuotas.py mejor <id partido>
+    python scripts/almacen_cuotas.py movimiento <id partido> <selección> [desde] [hasta]
+    Los ids de partido son los de las últimas jornadas guardadas (AlmacenJornadas.ultimas)
+    """
+    if len(sys.argv) < 3:
+        print(main.__doc__)
+        sys.exit(1)
+
+    almacen = AlmacenCuotas(os.getenv('CUOTAS_DIR', CUOTAS_DIR))
+    comando, argumentos = sys.argv[1], sys.argv[2:]
+    # Partidos de las jornadas en curso para cruzar ids y nombres de equipo
+    from almacen_datos import AlmacenJornadas
+    fuente = AlmacenJornadas()
+    tabla_partidos = TablaPartidos()
+    for clave in fuente.ultimas():
+        tabla_partidos.ampliar(fuente.cargar(*clave)[0])
+    claves = dict(zip(tabla_partidos.datos['id'].tolist(), claves_snapshot(tabla_partidos).tolist()))
+    if comando in ('mejor', 'movimiento') and int(argumentos[0]) not in claves:
+        print(f"❌ Partido {argumentos[0]} no está en las últimas jornadas guardadas")
+        sys.exit(1)
+
+    if comando == 'ingerir':
+        total = almacen.ingerir_snapshots(argumentos, tabla_partidos)
+        print(f"💾 {total} cuotas de {len(argumentos)} snapshots ({almacen.filas()} en total, "
+              f"{len(almacen.casas)} casas, {len(almacen.partidos)} partidos)")
+        if almacen.sin_cruzar:
+            print(f"⚠️  {almacen.sin_cruzar} partidos sin cruzar con las jornadas en curso")
+    elif comando == 'mejor':
+        partido = claves[int(argumentos[0])]
+        for seleccion in SELECCIONES:
+            mejor = almacen.mejor(partido, seleccion)
+            if mejor:
+                print(f"   {seleccion:>9}: {mejor[0]:.2f} ({mejor[1]})")
+    elif comando == 'movimiento':
+        movimiento = almacen.movimiento(claves[int(argumentos[0])], argumentos[1], *argumentos[2:4])
+        for ts, casa, cuota in zip(movimiento['ts'].tolist(), movimiento['casa'].tolist(),
+                                   movimiento['cuota'].tolist()):
+            print(f"   {datetime.fromtimestamp(ts).isoformat()}  {casa:<15} {cuota:.2f}")
+    else:
+        print(main.__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Almacén columnar de partidos y cuotas por jornada
+- Un fichero .npz por (temporada, competición, jornada):
+  data/jornadas/<temporada>/<competicion>/<jornada>.npz
+- Se carga directamente como TablaPartidos (registros.py), sin pasar por dicts
+- Carga perezosa: solo se lee la jornada pedida, el tiempo de import no
+  crece con el histórico
+"""
+
+import json
+import os
+import sys
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
+
+from registros import TablaPartidos
+
+ALMACEN_DIR = 'data/jornadas'
+MERCADOS_CUOTAS = ('home', 'draw', 'away', 'btts_yes', 'btts_no', 'over25', 'under25')
+
+
+class AlmacenJornadas:
+    """Fuente de datos de partidos y cuotas por temporada/competición/jornada"""
+
+    def __init__(self, base_dir: str = ALMACEN_DIR):
+        self.base_dir = base_dir
+
+    def _path(self, temporada: str, competicion: str, jornada: int) -> str:
+        return os.path.join(self.base_dir, temporada, competicion, f"{int(jornada)}.npz")
+
+    def guardar(self, temporada: str, competicion: str, jornada: int,
+                partidos: Union[List[Dict], TablaPartidos],
+                cuotas: Optional[Dict[int, Dict[str, float]]] = None) -> str:
+        """Guarda una jornada; las cuotas ausentes se guardan como NaN"""
+        cuotas = cuotas or {}
+        if not isinstance(partidos, TablaPartidos):
+            partidos = TablaPartidos.desde_dicts(partidos)
+        columnas = partidos.columnas()
+
+        ids = sorted(cuotas)
+        matriz = np.full((len(ids), len(MERCADOS_CUOTAS)), np.nan)
+        for fila, partido_id in enumerate(ids):
+            for col, mercado in enumerate(MERCADOS_CUOTAS):
+                if cuotas[partido_id].get(mercado) is not None:
+                    matriz[fila, col] = cuotas[partido_id][mercado]
+
+        path = self._path(temporada, competicion, jornada)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(path, cuotas_id=np.array(ids, dtype=np.int32),
+                            cuotas=matriz, mercados=np.array(MERCADOS_CUOTAS), **columnas)
+        return path
+
+    def cargar(self, temporada: str, competicion: str,
+               jornada: int) -> Tuple[TablaPartidos, Dict[int, Dict[str, float]]]:
+        """
+        Lee solo la jornada pedida: (partidos, cuotas por id de partido).
+        Los mercados que no tenía el fichero (p.ej. btts_no/under25 en .npz
+        antiguos) se leen como NaN, es decir, ausentes
+        """
+        with np.load(self._path(temporada, competicion, jornada)) as datos:
+            columnas = {clave: datos[clave] for clave in datos.files}
+
+        partidos = TablaPartidos.desde_columnas(columnas, jornada)
+        matriz = np.full((len(columnas['cuotas_id']), len(MERCADOS_CUOTAS)), np.nan)
+        guardados = columnas['mercados'].tolist()
+        for col, mercado in enumerate(MERCADOS_CUOTAS):
+            if mercado in guardados:
+                matriz[:, col] = columnas['cuotas'][:, guardados.index(mercado)]
+        cuotas = {}
+        for partido_id, fila in zip(columnas['cuotas_id'].tolist(), matriz.tolist()):
+            cuotas[partido_id] = {m: v for m, v in zip(MERCADOS_CUOTAS, fila) if not np.isnan(v)}
+        return partidos, cuotas
+
+    def cargar_temporada(self, temporada: Optional[str] = None) -> Tuple[TablaPartidos, Dict[int, Dict[str, float]]]:
+        """Todas las jornadas guardadas de una temporada (la última si no se indica) en una tabla"""
+        claves = self.disponibles()
+        temporada = temporada or (claves[-1][0] if claves else None)
+        partidos, cuotas = TablaPartidos(), {}
+        for clave in claves:
+            if clave[0] == temporada:
+                partidos_jornada, cuotas_jornada = self.cargar(*clave)
+                partidos.ampliar(partidos_jornada)
+                cuotas.update(cuotas_jornada)
+        return partidos, cuotas
+
+    def ultimas(self, temporada: Optional[str] = None) -> List[Tuple[str, str, int]]:
+        """Última jornada guardada de cada competición de una temporada (la última si no se indica)"""
+        claves = self.disponibles()
+        temporada = temporada or (claves[-1][0] if claves else None)
+        ultimas = {}
+        for clave in claves:
+            if clave[0] == temporada:
+                ultimas[clave[1]] = clave
+        return list(ultimas.values())
+
+    def disponibles(self) -> List[Tuple[str, str, int]]:
+        """Claves (temporada, competición, jornada) presentes en disco"""
+        claves = []
+        if not os.path.isdir(self.base_dir):
+            return claves
+        for temporada in sorted(os.listdir(self.base_dir)):
+            for competicion in sorted(os.listdir(os.path.join(self.base_dir, temporada))):
+                carpeta = os.path.join(self.base_dir, temporada, competicion)
+                jornadas = sorted(int(f[:-4]) for f in os.listdir(carpeta) if f.endswith('.npz'))
+                claves.extend((temporada, competicion, j) for j in jornadas)
+        return claves
+
+
+def main():
+    """
+    Importa una jornada desde JSON:
+    python scripts/almacen_datos.py <fichero.json> <temporada> <competicion> <jornada>
+    El JSON es una lista de partidos o {"partidos": [...], "cuotas": {id: {...}}}
+    """
+    if len(sys.argv) != 5:
+        print(main.__doc__)
+        sys.exit(1)
+
+    fichero, temporada, competicion, jornada = sys.argv[1:]
+    with open(fichero, 'r', encoding='utf-8') as f:
+        datos = json.load(f)
+    if isinstance(datos, list):
+        datos = {'partidos': datos}
+    cuotas = {int(k): v for k, v in datos.get('cuotas', {}).items()}
+
+    path = AlmacenJornadas().guardar(temporada, competicion, int(jornada), datos['partidos'], cuotas)
+    print(f"💾 {len(datos['partidos'])} partidos guardados en: {path}")
+
+
+if __name__ == "__main__":
+    main()
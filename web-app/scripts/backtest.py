@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Backtest histórico del analizador
+- Reproduce las jornadas pasadas con AdvancedBettingAnalyzer usando solo
+  datos anteriores a cada jornada: clasificación/forma (EstadoLiga), ELO
+  (MotorElo) y, opcionalmente, parámetros Dixon-Coles reajustados
+- Lee los resultados temporada a temporada (streaming): en memoria solo
+  la temporada actual y la anterior
+- Salidas del modelo por partido (probabilidades sin calibrar) cacheadas
+  por temporada en .cache/backtest: re-puntuar tras cambiar la calibración
+  no vuelve a ejecutar el modelo
+- Métricas reales por mercado: Brier, log loss, ROI (stake Kelly de los
+  picks con edge) y CLV frente a la cuota de cierre
+- Calibración walk-forward: cada temporada se puntúa con calibradores
+  ajustados solo con las predicciones de las temporadas anteriores
+
+Formato (CSV, ordenado por fecha): fecha,liga,local,visitante,goles_local,goles_visitante
+Columnas opcionales de cuotas: cuota_<mercado> (cuota tomada) y
+cierre_<mercado> (cuota de cierre), con mercado en SELECCIONES de
+almacen_cuotas.py; con el libro completo el edge se mide sin margen (margen.py)
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from betting_analyzer import AdvancedBettingAnalyzer
+from ajuste_dixon_coles import AjustadorDixonColes, XI_DEFECTO, RESULTADOS_PATH
+from almacen_cuotas import SELECCIONES
+from calibracion import CalibradorMercados, PREDICCIONES_PATH
+from elo import MotorElo
+from equipos import registro_por_defecto
+from estado_liga import EstadoLiga
+from margen import probabilidades_justas
+
+BACKTEST_CACHE_DIR = '.cache/backtest'
+BACKTEST_PATH = 'data/backtest.json'
+MERCADOS_BACKTEST = ('1x2', 'btts', 'over25')
+SALIDAS_MODELO = ('home', 'draw', 'away', 'btts', 'over25',
+                  'expected_home_goals', 'expected_away_goals')
+# Componentes del ensemble que permiten re-mezclarlo sin el modelo
+COMPONENTES = ('elo_home', 'forma_home', 'forma_draw', 'forma_away')
+# Módulos cuyo código define las salidas del modelo (clave de la caché)
+MODULOS_MODELO = ('betting_analyzer.py', 'dixon_coles.py', 'mercados.py', 'kernel_poisson.py',
+                  'elo.py', 'ajuste_dixon_coles.py', 'estado_liga.py', 'backtest.py',
+                  'equipos.py', 'registros.py')
+
+
+def temporada_de(fecha: str) -> str:
+    """Temporada julio-junio: '2024-03-10' -> '2023-24'"""
+    anio, mes = int(fecha[:4]), int(fecha[5:7])
+    inicio = anio if mes >= 7 else anio - 1
+    return f"{inicio}-{(inicio + 1) % 100:02d}"
+
+
+def _columnas(filas) -> Dict[str, np.ndarray]:
+    registro = registro_por_defecto()
+    datos = {
+        'fecha': np.array([f['fecha'] for f in filas], dtype='datetime64[D]'),
+        'liga': np.array([f['liga'] for f in filas]),
+        'local': registro.canonicos(np.array([f['local'] for f in filas])),
+        'visitante': registro.canonicos(np.array([f['visitante'] for f in filas])),
+        'goles_local': np.array([int(f['goles_local']) for f in filas]),
+        'goles_visitante': np.array([int(f['goles_visitante']) for f in filas]),
+    }
+    for prefijo in ('cuota', 'cierre'):
+        for mercado in SELECCIONES:
+            datos[f'{prefijo}_{mercado}'] = np.array(
+                [float(f.get(f'{prefijo}_{mercado}') or 'nan') for f in filas])
+    return datos
+
+
+def leer_temporadas(path: str = RESULTADOS_PATH) -> Iterator[Tuple[str, Dict[str, np.ndarray], str]]:
+    """
+    Recorre el CSV temporada a temporada sin cargarlo entero.
+    Produce (temporada, columnas, huella del contenido de la temporada).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        lector = csv.DictReader(f)
+        actual, filas, huella = None, [], hashlib.sha1()
+        for fila in lector:
+            temporada = temporada_de(fila['fecha'])
+            if actual is not None and temporada != actual:
+                yield actual, _columnas(filas), huella.hexdigest()
+                filas, huella = [], hashlib.sha1()
+            actual = temporada
+            filas.append(fila)
+            huella.update(repr(sorted(fila.items())).encode('utf-8'))
+        if filas:
+            yield actual, _columnas(filas), huella.hexdigest()
+
+
+def _huella_modelo(configuracion: Dict) -> str:
+    """Hash del código del modelo y de su configuración"""
+    huella = hashlib.sha1(json.dumps(configuracion, sort_keys=True).encode('utf-8'))
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    for modulo in MODULOS_MODELO:
+        with open(os.path.join(carpeta, modulo), 'rb') as f:
+            huella.update(f.read())
+    return huella.hexdigest()[:16]
+
+
+class AcumuladorMercado:
+    """Sumas de un mercado acumuladas temporada a temporada"""
+
+    def __init__(self):
+        self.n = 0
+        self.brier = 0.0
+        self.log_loss = 0.0
+        self.apuestas = 0
+        self.stake = 0.0
+        self.beneficio = 0.0
+        self.clv = 0.0
+        self.n_clv = 0
+
+    def sumar(self, brier: np.ndarray, prob_real: np.ndarray, apuesta: Dict[str, np.ndarray]):
+        """prob_real: probabilidad asignada al resultado ocurrido"""
+        self.n += len(brier)
+        self.brier += float(brier.sum())
+        self.log_loss += float(-np.log(np.clip(prob_real, 1e-15, 1.0)).sum())
+
+        apostar = apuesta['apostar']
+        stake = apuesta['kelly_stake'][apostar]
+        cuota = apuesta['cuota'][apostar]
+        gana = apuesta['gana'][apostar]
+        self.apuestas += int(apostar.sum())
+        self.stake += float(stake.sum())
+        self.beneficio += float(np.where(gana, stake * (cuota - 1), -stake).sum())
+
+        cierre = apuesta['cierre'][apostar]
+        con_cierre = cierre > 1.0
+        self.clv += float((cuota[con_cierre] / cierre[con_cierre] - 1).sum())
+        self.n_clv += int(con_cierre.sum())
+
+    def resumen(self) -> Dict:
+        return {
+            'partidos': self.n,
+            'brier_score': round(self.brier / self.n, 4) if self.n else None,
+            'log_loss': round(self.log_loss / self.n, 4) if self.n else None,
+            'apuestas': self.apuestas,
+            'stake_total': round(self.stake, 4),
+            'beneficio': round(self.beneficio, 4),
+            'roi_percent': round(100 * self.beneficio / self.stake, 2) if self.stake else None,
+            'clv_percent': round(100 * self.clv / self.n_clv, 2) if self.n_clv else None,
+        }
+
+
+def puntuar(analyzer: AdvancedBettingAnalyzer, datos: Dict[str, np.ndarray],
+            salidas: Dict[str, np.ndarray], acumuladores: Dict[str, AcumuladorMercado]):
+    """
+    Calibra y puntúa salidas ya calculadas (sin ejecutar el modelo) con la
+    calibración, el edge mínimo y el método de margen del analizador
+    """
+    probs = analyzer.calibrate_probabilities({clave: salidas[clave] for clave in SALIDAS_MODELO})
+    gl, gv = datos['goles_local'], datos['goles_visitante']
+    n = len(gl)
+
+    # 1X2: Brier multiclase y pick del resultado más probable
+    p_1x2 = np.column_stack([probs['home'], probs['draw'], probs['away']])
+    resultado = np.where(gl > gv, 0, np.where(gl == gv, 1, 2))
+    ocurrido = np.eye(3)[resultado]
+    elegido = np.argmax(p_1x2, axis=1)
+    cuotas = np.column_stack([datos['cuota_home'], datos['cuota_draw'], datos['cuota_away']])
+    cierres = np.column_stack([datos['cierre_home'], datos['cierre_draw'], datos['cierre_away']])
+    filas = np.arange(n)
+    justas = probabilidades_justas(cuotas, analyzer.metodo_margen)
+    apuesta = analyzer.calculate_edge_batch(p_1x2[filas, elegido], cuotas[filas, elegido],
+                                            justas[filas, elegido])
+    apuesta.update(cuota=cuotas[filas, elegido], cierre=cierres[filas, elegido],
+                   gana=elegido == resultado)
+    acumuladores['1x2'].sumar(((p_1x2 - ocurrido) ** 2).sum(axis=1),
+                              p_1x2[filas, resultado], apuesta)
+
+    # Binarios: se apuesta al lado que predice el modelo, como en los picks
+    for mercado, (si, no), ocurre in (('btts', ('btts_yes', 'btts_no'), (gl > 0) & (gv > 0)),
+                                      ('over25', ('over25', 'under25'), gl + gv > 2)):
+        p = probs[mercado]
+        lado_si = p > 0.5
+        libro = np.column_stack([datos[f'cuota_{si}'], datos[f'cuota_{no}']])
+        justas = probabilidades_justas(libro, analyzer.metodo_margen)
+        apuesta = analyzer.calculate_edge_batch(np.where(lado_si, p, 1 - p),
+                                                np.where(lado_si, libro[:, 0], libro[:, 1]),
+                                                np.where(lado_si, justas[:, 0], justas[:, 1]))
+        apuesta.update(cuota=np.where(lado_si, libro[:, 0], libro[:, 1]),
+                       cierre=np.where(lado_si, datos[f'cierre_{si}'], datos[f'cierre_{no}']),
+                       gana=lado_si == ocurre)
+        acumuladores[mercado].sumar((p - ocurre) ** 2, np.where(ocurre, p, 1 - p), apuesta)
+
+
+def predicciones_calibracion(datos: Dict[str, np.ndarray], salidas: Dict[str, np.ndarray]):
+    """(mercado, probabilidades sin calibrar, ocurrió) de cada salida: formato de calibracion.py"""
+    gl, gv = datos['goles_local'], datos['goles_visitante']
+    eventos = {
+        'home': gl > gv, 'draw': gl == gv, 'away': gl < gv,
+        'btts': (gl > 0) & (gv > 0), 'over25': gl + gv > 2,
+    }
+    mercado = {'home': '1x2', 'draw': '1x2', 'away': '1x2', 'btts': 'btts', 'over25': 'over25'}
+    for clave, ocurre in eventos.items():
+        yield mercado[clave], salidas[clave], ocurre
+
+
+class MotorBacktest:
+    """Backtest sin fuga de datos con caché de salidas del modelo por temporada"""
+
+    def __init__(self, analyzer: Optional[AdvancedBettingAnalyzer] = None,
+                 reajustar_dc: bool = False, xi: float = XI_DEFECTO,
+                 cache_dir: Optional[str] = BACKTEST_CACHE_DIR):
+        """
+        reajustar_dc: reajusta Dixon-Coles antes de cada jornada (arranque en
+        caliente); si no, lambdas manuales. Los parámetros ya cargados en el
+        analizador se descartan: serían del futuro.
+        cache_dir=None desactiva la caché
+        """
+        self.analyzer = analyzer or AdvancedBettingAnalyzer(jornadas=[])
+        self.analyzer.parametros_dc = None
+        self.rho_inicial = self.analyzer.rho
+        self.reajustar_dc = reajustar_dc
+        self.ajustador = AjustadorDixonColes(xi) if reajustar_dc else None
+        self.xi = xi
+        self.cache_dir = cache_dir
+        self.motor_elo = MotorElo()
+        self.anterior: Optional[Dict[str, np.ndarray]] = None
+        self.aciertos_cache = 0
+
+    @property
+    def huella(self) -> str:
+        """
+        Configuración de la que dependen las salidas cacheadas (mezcla del
+        ensemble incluida): se lee del analizador al usar la caché, por si se
+        cambian los hiperparámetros tras crear el motor
+        """
+        return _huella_modelo({
+            'reajustar_dc': self.reajustar_dc, 'xi': self.xi, 'rho': self.rho_inicial,
+            'usar_tabla': self.analyzer.tabla is not None,
+            'pesos_ensemble': [float(w) for w in self.analyzer.pesos_ensemble],
+            'empate_elo': float(self.analyzer.empate_elo),
+            'equipos': registro_por_defecto().indice,
+        })
+
+    def _cache_path(self, temporada: str, huella_datos: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{temporada}_{self.huella}_{huella_datos[:16]}.npz")
+
+    def _predecir_jornada(self, partidos, historial: Optional[Dict[str, np.ndarray]],
+                          fecha_inicio: np.datetime64) -> Dict[str, np.ndarray]:
+        """Probabilidades sin calibrar de una jornada con el estado previo a fecha_inicio"""
+        analyzer = self.analyzer
+        if self.reajustar_dc and historial is not None:
+            fecha_referencia = fecha_inicio - np.timedelta64(1, 'D')
+            if (historial['fecha'] <= fecha_referencia).any():
+                analyzer.parametros_dc = self.ajustador.ajustar(
+                    historial, fecha_referencia, previos=analyzer.parametros_dc)
+                analyzer.rho = analyzer.parametros_dc['rho']
+
+        analyzer.partidos = partidos
+        analyzer.elo_ratings = self.motor_elo.como_dict()
+        analyzer.initialize_elo(checkpoint_dir=None)
+
+        lambdas = np.array([analyzer.calculate_lambda_values(p) for p in partidos]).reshape(-1, 2)
+        batch = analyzer.poisson_dixon_coles_batch(lambdas[:, 0], lambdas[:, 1], rho=analyzer.rho)
+        salidas = {clave: np.empty(len(partidos)) for clave in SALIDAS_MODELO + COMPONENTES}
+        for n, partido in enumerate(partidos):
+            poisson_probs = {clave: float(batch[clave][n]) for clave in SALIDAS_MODELO}
+            for clave, valor in analyzer.ensemble_prediction(partido, poisson_probs).items():
+                salidas[clave][n] = valor
+            salidas['elo_home'][n] = analyzer.probabilidad_elo_local(partido)
+            for clave, valor in analyzer.probabilidades_forma(partido).items():
+                salidas[f'forma_{clave}'][n] = valor
+        return salidas
+
+    def _salidas_temporada(self, datos: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Recorre la temporada jornada a jornada (semana ISO) en orden cronológico"""
+        orden = np.argsort(datos['fecha'], kind='stable')
+        semanas = datos['fecha'].astype('datetime64[W]')
+        historial = datos if self.anterior is None else {
+            clave: np.concatenate([self.anterior[clave], datos[clave]]) for clave in datos}
+
+        salidas = {clave: np.full(len(orden), np.nan) for clave in SALIDAS_MODELO + COMPONENTES}
+        estados: Dict[str, EstadoLiga] = {}
+        cortes = np.flatnonzero(np.diff(semanas[orden].astype(np.int64))) + 1
+        for jornada in np.split(orden, cortes):
+            for liga in dict.fromkeys(datos['liga'][jornada].tolist()):
+                indices = jornada[datos['liga'][jornada] == liga]
+                estado = estados.setdefault(liga, EstadoLiga())
+                calendario = [{'id': int(k), 'liga': liga, 'fecha': str(datos['fecha'][k]),
+                               'local': str(datos['local'][k]), 'visitante': str(datos['visitante'][k])}
+                              for k in indices]
+                prediccion = self._predecir_jornada(estado.partidos(calendario), historial,
+                                                    datos['fecha'][indices].min())
+                for clave, valores in prediccion.items():
+                    salidas[clave][indices] = valores
+
+            # Los resultados de la jornada solo se conocen después de predecirla
+            for k in jornada:
+                local, visitante = str(datos['local'][k]), str(datos['visitante'][k])
+                gl, gv = int(datos['goles_local'][k]), int(datos['goles_visitante'][k])
+                estados[str(datos['liga'][k])].aplicar(local, visitante, gl, gv)
+                self.motor_elo.actualizar(local, visitante, gl, gv)
+            self.motor_elo.fecha = datos['fecha'][jornada].max()
+        return salidas
+
+    def salidas_temporada(self, temporada: str, datos: Dict[str, np.ndarray],
+                          huella_datos: str) -> Dict[str, np.ndarray]:
+        """Salidas del modelo de la temporada, desde la caché si existe"""
+        path = self._cache_path(temporada, huella_datos)
+        if path and os.path.exists(path):
+            with np.load(path) as cache:
+                salidas = {clave: cache[clave] for clave in cache.files}
+            self.aciertos_cache += 1
+            # El estado ELO debe avanzar igual que si se hubiera ejecutado el modelo
+            self.motor_elo.procesar(datos)
+        else:
+            salidas = self._salidas_temporada(datos)
+            if path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                np.savez_compressed(path, **salidas)
+        self.anterior = datos
+        return salidas
+
+    def ejecutar(self, path: str = RESULTADOS_PATH,
+                 predicciones_path: Optional[str] = None, walk_forward: bool = True) -> Dict:
+        """
+        Backtest completo del fichero de resultados.
+        predicciones_path: escribe las probabilidades sin calibrar frente a
+        los resultados (entrada de calibracion.py)
+        walk_forward: calibra cada temporada solo con las predicciones de las
+        anteriores (la primera, con la fórmula fija). False: la calibración del
+        analizador, en muestra si se ajustó con estos mismos partidos
+        """
+        acumuladores = {mercado: AcumuladorMercado() for mercado in MERCADOS_BACKTEST}
+        historico = defaultdict(lambda: {'prob': [], 'resultado': []})
+        calibrador_inicial = self.analyzer.calibrador
+        temporadas = []
+        escritor = None
+        if predicciones_path:
+            os.makedirs(os.path.dirname(predicciones_path) or '.', exist_ok=True)
+            fichero = open(predicciones_path, 'w', encoding='utf-8', newline='')
+            escritor = csv.writer(fichero)
+            escritor.writerow(['mercado', 'prob', 'resultado'])
+
+        try:
+            for temporada, datos, huella_datos in leer_temporadas(path):
+                salidas = self.salidas_temporada(temporada, datos, huella_datos)
+                if walk_forward:
+                    self.analyzer.calibrador = CalibradorMercados.ajustar({
+                        mercado: {clave: np.concatenate(valores) for clave, valores in previas.items()}
+                        for mercado, previas in historico.items()})
+                puntuar(self.analyzer, datos, salidas, acumuladores)
+                temporadas.append(temporada)
+                for mercado, probs, ocurre in predicciones_calibracion(datos, salidas):
+                    historico[mercado]['prob'].append(probs)
+                    historico[mercado]['resultado'].append(ocurre.astype(int))
+                    if escritor:
+                        escritor.writerows((mercado, f"{p:.6f}", int(o))
+                                           for p, o in zip(probs.tolist(), ocurre.tolist()))
+        finally:
+            if escritor:
+                fichero.close()
+            calibracion = ('walk-forward por temporada' if walk_forward
+                           else self.analyzer.calibrador.descripcion)
+            self.analyzer.calibrador = calibrador_inicial
+
+        mercados = {mercado: acc.resumen() for mercado, acc in acumuladores.items()}
+        stake = sum(acc.stake for acc in acumuladores.values())
+        beneficio = sum(acc.beneficio for acc in acumuladores.values())
+        return {
+            'fecha_generacion': datetime.now().isoformat(),
+            'temporadas': temporadas,
+            'partidos': mercados['1x2']['partidos'],
+            'reajuste_dc': self.reajustar_dc,
+            'calibracion': calibracion,
+            'modelo': {
+                'pesos_ensemble': [float(w) for w in self.analyzer.pesos_ensemble],
+                'empate_elo': float(self.analyzer.empate_elo),
+                'edge_minimo': float(self.analyzer.edge_minimo),
+                'rho_inicial': float(self.rho_inicial),
+            },
+            'brier_score': mercados['1x2']['brier_score'],
+            'log_loss': mercados['1x2']['log_loss'],
+            'roi_percent': round(100 * beneficio / stake, 2) if stake else None,
+            'mercados': mercados,
+        }
+
+
+def main():
+    """Backtest de data/resultados.csv -> data/backtest.json"""
+    resultados_path = sys.argv[1] if len(sys.argv) > 1 else RESULTADOS_PATH
+    output_path = os.getenv('BACKTEST_OUTPUT_PATH', BACKTEST_PATH)
+    predicciones_path = os.getenv('PREDICCIONES_PATH', PREDICCIONES_PATH)
+
+    # La calibración se ajusta walk-forward dentro del backtest: la de
+    # data/calibracion.json sale de estos mismos partidos (métricas en muestra)
+    analyzer = AdvancedBettingAnalyzer(jornadas=[])
+    # Mismos pesos, empate ELO y edge mínimo que el analizador en producción
+    # (busqueda_hiperparametros.py); con BACKTEST_REAJUSTAR_DC=1 el rho sale
+    # del reajuste Dixon-Coles de cada jornada, como parametros_dc.json
+    hiperparametros_path = os.getenv('HIPERPARAMETROS_PATH', 'data/hiperparametros.json')
+    if os.path.exists(hiperparametros_path):
+        with open(hiperparametros_path, 'r', encoding='utf-8') as f:
+            analyzer.aplicar_hiperparametros(json.load(f))
+    motor = MotorBacktest(analyzer, reajustar_dc=os.getenv('BACKTEST_REAJUSTAR_DC') == '1')
+
+    inicio = datetime.now()
+    resumen = motor.ejecutar(resultados_path, predicciones_path)
+    segundos = (datetime.now() - inicio).total_seconds()
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Backtest: {len(resumen['temporadas'])} temporadas, {resumen['partidos']} partidos "
+          f"en {segundos:.1f}s ({motor.aciertos_cache} temporadas desde caché)")
+    for mercado, m in resumen['mercados'].items():
+        print(f"   - {mercado}: Brier {m['brier_score']} | Log loss {m['log_loss']} | "
+              f"{m['apuestas']} apuestas | ROI {m['roi_percent']}% | CLV {m['clv_percent']}%")
+    print(f"📁 Resumen guardado en: {output_path}")
+    print(f"📁 Predicciones para calibración en: {predicciones_path}")
+
+
+if __name__ == "__main__":
+    main()
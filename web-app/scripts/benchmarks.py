@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks reproducible (modelo, combinadas y E/S)
+- Generadores sintéticos deterministas de partidos y cuotas a 16, 380,
+  10k y 100k partidos (mismo formato que el almacén de jornadas)
+- Mide poisson_dixon_coles (partido a partido y batch),
+  generar_reporte_completo, CombinadorAutomatico.generar_todas_combinadas
+  con un pool grande de picks, agregar_a_historial sobre un historial
+  grande, la escritura JSON y el repreciado en vivo por evento (en_vivo.py)
+- Salida JSON (mínimo, mediana, media y dispersión por benchmark y
+  tamaño) y comparación con una baseline: compara el mínimo de las
+  repeticiones y marca regresión por encima de un umbral que crece con la
+  dispersión medida
+- La baseline solo es comparable en la máquina que la generó: hay que
+  regenerarla (--guardar-baseline) en el runner que compara. Con otro
+  entorno las regresiones se informan pero no fallan
+
+Uso: python scripts/benchmarks.py [--guardar-baseline]
+BENCH_TAMANOS=16,380 limita los tamaños; BENCH_COMPLETO=1 incluye los
+benchmarks lentos a 100k partidos
+"""
+
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from betting_analyzer import AdvancedBettingAnalyzer, NOMBRES_COMPETICION
+from generar_combinadas import CombinadorAutomatico
+from en_vivo import MotorEnVivo
+from salida_web import escribir_artefacto, escribir_picks_troceados
+from registros import TablaPartidos
+
+BENCH_DIR = 'data/benchmarks'
+BENCH_OUTPUT_PATH = os.path.join(BENCH_DIR, 'ultimo.json')
+BENCH_BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+TAMANOS = (16, 380, 10000, 100000)
+# Tamaño máximo por benchmark sin BENCH_COMPLETO=1 (los lentos no llegan a 100k)
+TAMANO_MAXIMO = {
+    'poisson_dixon_coles': 10000,
+    'poisson_dixon_coles_batch': 100000,
+    'generar_reporte_completo': 10000,
+    'generar_todas_combinadas': 100000,
+    'agregar_a_historial': 10000,
+    'escritura_json': 10000,
+    'en_vivo_evento': 10000,
+}
+UMBRAL_REGRESION = 0.15
+# Margen extra por ruido: FACTOR_DISPERSION x la dispersión relativa medida
+FACTOR_DISPERSION = 3.0
+REPETICIONES = 20
+SEMILLA = 12345
+PARTIDOS_POR_JORNADA = 10
+EQUIPOS_POR_LIGA = 20
+
+
+def generar_partidos(n: int, semilla: int = SEMILLA) -> Tuple[List[Dict], Dict[int, Dict[str, float]]]:
+    """
+    n partidos sintéticos y sus cuotas (formato de AlmacenJornadas.cargar).
+    Mismo resultado para la misma semilla.
+    """
+    rng = np.random.default_rng(semilla)
+    ligas = list(NOMBRES_COMPETICION.values())
+    ultimos = rng.choice([0, 1, 3], size=(n, 2, 5))
+    goles = rng.integers(10, 60, size=(n, 4))
+    posiciones = rng.integers(1, EQUIPOS_POR_LIGA + 1, size=(n, 2))
+    equipos = rng.integers(0, EQUIPOS_POR_LIGA, size=(n, 2))
+    equipos[:, 1] = (equipos[:, 0] + 1 + equipos[:, 1] % (EQUIPOS_POR_LIGA - 1)) % EQUIPOS_POR_LIGA
+    letras = {0: 'D', 1: 'E', 3: 'V'}
+
+    partidos, cuotas = [], {}
+    for k in range(n):
+        liga = k % len(ligas)
+        local, visitante = (f"Equipo {liga}-{e}" for e in equipos[k])
+        partidos.append({
+            'id': k + 1,
+            'local_pos': int(posiciones[k, 0]), 'visitante_pos': int(posiciones[k, 1]),
+            'local_goles_favor': int(goles[k, 0]), 'local_goles_contra': int(goles[k, 1]),
+            'visitante_goles_favor': int(goles[k, 2]), 'visitante_goles_contra': int(goles[k, 3]),
+            'local': local, 'visitante': visitante,
+            'fecha': '2026-02-13', 'hora': '21:00', 'estadio': f"Estadio {local}",
+            'liga': ligas[liga], 'jornada': k // (PARTIDOS_POR_JORNADA * len(ligas)) + 1,
+            'local_forma': ''.join(letras[x] for x in ultimos[k, 0]),
+            'visitante_forma': ''.join(letras[x] for x in ultimos[k, 1]),
+            'local_ultimos_5': ultimos[k, 0].tolist(), 'visitante_ultimos_5': ultimos[k, 1].tolist(),
+        })
+    margen = rng.uniform(1.03, 1.08, n)
+    probs = rng.dirichlet([4, 2.5, 3], size=n)
+    for k in range(n):
+        home, draw, away = np.round(1 / (probs[k] * margen[k]), 2)
+        btts_yes, over25 = rng.uniform(0.40, 0.60, 2)
+        cuotas[k + 1] = {'home': float(home), 'draw': float(draw), 'away': float(away),
+                         'btts_yes': float(np.round(1 / (btts_yes * margen[k]), 2)),
+                         'btts_no': float(np.round(1 / ((1 - btts_yes) * margen[k]), 2)),
+                         'over25': float(np.round(1 / (over25 * margen[k]), 2)),
+                         'under25': float(np.round(1 / ((1 - over25) * margen[k]), 2))}
+    return partidos, cuotas
+
+
+def analizador_sintetico(n: int) -> AdvancedBettingAnalyzer:
+    analyzer = AdvancedBettingAnalyzer(jornadas=[])
+    partidos, analyzer.market_odds = generar_partidos(n)
+    analyzer.partidos = TablaPartidos.desde_dicts(partidos)
+    analyzer.calcular_probs_justas()
+    analyzer.initialize_elo(checkpoint_dir=None)
+    return analyzer
+
+
+def pool_picks(n: int) -> Dict:
+    """Reporte sintético en el que todos los picks entran en el pool de combinadas"""
+    partidos, cuotas = generar_partidos(n)
+    rng = np.random.default_rng(SEMILLA + 1)
+    bloques = {'primera_division': [], 'segunda_division': []}
+    for partido in partidos:
+        picks = [{'tipo': tipo, 'prediccion': prediccion, 'confianza': float(np.round(rng.uniform(70, 90), 1)),
+                  'cuota_mercado': cuotas[partido['id']][seleccion], 'apostar': True}
+                 for tipo, prediccion, seleccion in (('Resultado Final (1X2)', 'Local', 'home'),
+                                                     ('Ambos Equipos Marcan', 'Sí', 'btts_yes'),
+                                                     ('Total de Goles', 'Más de 2.5', 'over25'))]
+        bloque = 'primera_division' if partido['liga'] == NOMBRES_COMPETICION['primera_division'] else 'segunda_division'
+        bloques[bloque].append({**partido, 'picks': picks})
+    return {'jornada': {clave: {'partidos': valor} for clave, valor in bloques.items()}}
+
+
+def historial_sintetico(n_jornadas: int) -> Dict:
+    """Historial con n_jornadas resueltas de 8 combinadas cada una"""
+    combinada = {'id': 'comb_001', 'nombre': 'Value Safe - Cuota 5.2', 'cuota': 5.2, 'probabilidad': 30.1,
+                 'estado': 'acertada', 'fecha_creacion': '2025-08-14T02:00:00', 'picks_totales': 3,
+                 'picks_acertados': 3, 'picks': [{'partido': 'A vs B', 'pick': 'BTTS: Sí', 'cuota': 1.7,
+                                                  'estado': 'acertado', 'resultado_real': '2-1'}] * 3}
+    return {
+        'ultima_actualizacion': '2026-01-01T00:00:00',
+        'jornadas': [{'jornada': f"Jornada {k}", 'fecha_inicio': '2025-08-15', 'fecha_fin': '2025-08-18',
+                      'estado': 'finalizada', 'combinadas_creadas': 8, 'combinadas_resueltas': 8,
+                      'combinadas_pendientes': 0, 'roi_actual': 0.0, 'combinadas': [combinada] * 8}
+                     for k in range(n_jornadas)],
+        'estadisticas_globales': {'jornadas_analizadas': n_jornadas, 'combinadas_totales': 8 * n_jornadas,
+                                  'combinadas_acertadas': 0, 'combinadas_falladas': 0,
+                                  'combinadas_pendientes': 0, 'tasa_acierto_global': 0.0, 'roi_global': 0.0}
+    }
+
+
+def medir(funcion: Callable, preparar: Optional[Callable] = None, repeticiones: int = REPETICIONES,
+          presupuesto_s: float = 10.0) -> Dict[str, float]:
+    """
+    Tiempos de funcion(preparar()) sin contar la preparación; una ejecución
+    de calentamiento y hasta 'repeticiones' mientras quede presupuesto.
+    dispersion: (mediana - mínimo) / mínimo, el ruido relativo de la medida
+    """
+    tiempos = []
+    inicio_total = time.perf_counter()
+    for k in range(repeticiones + 1):
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcion(argumento) if preparar else funcion()
+        if k > 0:
+            tiempos.append(time.perf_counter() - inicio)
+        if k > 0 and time.perf_counter() - inicio_total > presupuesto_s:
+            break
+    minimo, mediana = float(np.min(tiempos)), float(np.median(tiempos))
+    return {'mediana_s': mediana, 'min_s': minimo, 'media_s': float(np.mean(tiempos)),
+            'dispersion': (mediana - minimo) / minimo if minimo > 0 else 0.0,
+            'repeticiones': len(tiempos)}
+
+
+def benchmarks(n: int, directorio: str) -> Dict[str, Callable[[], Dict]]:
+    """Benchmarks para n partidos (perezosos: la preparación solo se hace si se ejecutan)"""
+    def poisson_dixon_coles():
+        analyzer = analizador_sintetico(n)
+        lambdas = [analyzer.calculate_lambda_values(p) for p in analyzer.partidos]
+        return medir(lambda: [analyzer.poisson_dixon_coles(lh, la, analyzer.rho) for lh, la in lambdas])
+
+    def poisson_dixon_coles_batch():
+        analyzer = analizador_sintetico(min(n, 1000))
+        rng = np.random.default_rng(SEMILLA)
+        lambdas = rng.uniform(0.3, 3.5, size=(n, 2))
+        return medir(lambda: analyzer.poisson_dixon_coles_batch(lambdas[:, 0], lambdas[:, 1], analyzer.rho))
+
+    def generar_reporte_completo():
+        analyzer = analizador_sintetico(n)
+        return medir(analyzer.generar_reporte_completo)
+
+    def generar_todas_combinadas():
+        path = os.path.join(directorio, f"picks_{n}.json")
+        escribir_artefacto(path, pool_picks(n))
+
+        def preparar():
+            return CombinadorAutomatico(path)
+        return medir(lambda combinador: combinador.generar_todas_combinadas(), preparar)
+
+    def agregar_a_historial():
+        path = os.path.join(directorio, 'historial.json')
+        historial = historial_sintetico(n)
+        escribir_artefacto(path, pool_picks(PARTIDOS_POR_JORNADA * 2))
+        combinador = CombinadorAutomatico(path)
+        combinadas = combinador.generar_todas_combinadas()
+
+        def preparar():
+            escribir_artefacto(path, historial)
+        return medir(lambda _: combinador.agregar_a_historial(combinadas, path), preparar)
+
+    def escritura_json():
+        analyzer = analizador_sintetico(n)
+        reporte = analyzer.generar_reporte_completo()
+        salida = os.path.join(directorio, 'salida')
+        return medir(lambda: (escribir_artefacto(os.path.join(salida, 'picks_complete.json'), reporte),
+                              escribir_picks_troceados(reporte, {}, os.path.join(salida, 'picks'))))
+
+    def en_vivo_evento():
+        # n partidos en juego: un gol en uno de ellos reprecia todos
+        analyzer = analizador_sintetico(n)
+        motor = MotorEnVivo.desde_analizador(analyzer)
+        evento = {'partido': motor.ids[0], 'tipo': 'minuto', 'minuto': 45}
+        return medir(lambda: motor.procesar(evento), repeticiones=200)
+
+    return {
+        'poisson_dixon_coles': poisson_dixon_coles,
+        'poisson_dixon_coles_batch': poisson_dixon_coles_batch,
+        'generar_reporte_completo': generar_reporte_completo,
+        'generar_todas_combinadas': generar_todas_combinadas,
+        'agregar_a_historial': agregar_a_historial,
+        'escritura_json': escritura_json,
+        'en_vivo_evento': en_vivo_evento,
+    }
+
+
+def comparar(resultados: Dict, baseline: Dict, umbral: float = UMBRAL_REGRESION,
+             factor_dispersion: float = FACTOR_DISPERSION) -> List[Dict]:
+    """
+    Ratio mínimo actual / mínimo baseline por benchmark; regresión si supera
+    1 + umbral + factor_dispersion x la mayor dispersión de las dos medidas
+    """
+    comparacion = []
+    for clave, actual in resultados.items():
+        previo = baseline.get(clave)
+        if previo is None:
+            continue
+        ratio = actual['min_s'] / previo['min_s'] if previo['min_s'] > 0 else float('inf')
+        tolerancia = umbral + factor_dispersion * max(actual.get('dispersion', 0.0),
+                                                      previo.get('dispersion', 0.0))
+        comparacion.append({'benchmark': clave, 'ratio': round(ratio, 3), 'tolerancia': round(tolerancia, 3),
+                            'regresion': ratio > 1 + tolerancia})
+    return comparacion
+
+
+def ejecutar(tamanos=TAMANOS, completo: bool = False) -> Dict:
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for n in tamanos:
+            for nombre, benchmark in benchmarks(n, directorio).items():
+                if n > TAMANO_MAXIMO[nombre] and not completo:
+                    continue
+                # La salida de los scripts medidos no forma parte del informe
+                with open(os.devnull, 'w') as nulo:
+                    salida, sys.stdout = sys.stdout, nulo
+                    try:
+                        resultados[f"{nombre}@{n}"] = benchmark()
+                    finally:
+                        sys.stdout = salida
+                r = resultados[f"{nombre}@{n}"]
+                print(f"   - {nombre}@{n}: {r['mediana_s'] * 1000:.2f} ms (mín {r['min_s'] * 1000:.2f} ms)")
+    return resultados
+
+
+def main():
+    """Ejecuta la suite, guarda el resultado y lo compara con la baseline"""
+    tamanos = tuple(int(t) for t in os.getenv('BENCH_TAMANOS', ','.join(map(str, TAMANOS))).split(','))
+    completo = os.getenv('BENCH_COMPLETO') == '1'
+    output_path = os.getenv('BENCH_OUTPUT_PATH', BENCH_OUTPUT_PATH)
+    baseline_path = os.getenv('BENCH_BASELINE_PATH', BENCH_BASELINE_PATH)
+    umbral = float(os.getenv('BENCH_UMBRAL', UMBRAL_REGRESION))
+
+    print(f"⏱️  Benchmarks ({', '.join(map(str, tamanos))} partidos)...")
+    salida = {
+        'fecha': datetime.now().isoformat(),
+        'entorno': {'python': platform.python_version(), 'numpy': np.__version__,
+                    'plataforma': platform.platform(), 'cpus': os.cpu_count()},
+        'resultados': ejecutar(tamanos, completo),
+    }
+
+    mismo_entorno = True
+    if os.path.exists(baseline_path):
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        salida['comparacion'] = comparar(salida['resultados'], baseline['resultados'], umbral)
+        print(f"\n📊 Frente a la baseline ({baseline_path}):")
+        for fila in salida['comparacion']:
+            marca = '❌ REGRESIÓN' if fila['regresion'] else '✅'
+            print(f"   {marca} {fila['benchmark']}: x{fila['ratio']} (tolerancia x{1 + fila['tolerancia']:.3f})")
+        mismo_entorno = baseline.get('entorno') == salida['entorno']
+        if not mismo_entorno:
+            print("⚠️  Baseline de otro entorno: regenerarla aquí con --guardar-baseline "
+                  "(las regresiones no fallan)")
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(salida, f, ensure_ascii=False, indent=2)
+    print(f"📁 Resultados en: {output_path}")
+    if '--guardar-baseline' in sys.argv:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(salida, f, ensure_ascii=False, indent=2)
+        print(f"📁 Baseline actualizada: {baseline_path}")
+
+    regresiones = [fila for fila in salida.get('comparacion', []) if fila['regresion']]
+    if regresiones and mismo_entorno:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
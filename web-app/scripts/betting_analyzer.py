@@ -13,178 +13,54 @@ import os
 import numpy as np
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
-from scipy.stats import poisson
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
-# Datos reales de La Liga Jornada 24
-PRIMERA_DIVISION_JORNADA_24 = [
-    {
-        "id": 1, "local": "Elche CF", "visitante": "CA Osasuna",
-        "fecha": "2026-02-13", "hora": "21:00", "estadio": "Martínez Valero",
-        "liga": "LaLiga EA Sports", "local_pos": 12, "visitante_pos": 14,
-        "local_forma": "EDEED", "visitante_forma": "DEEED",
-        "local_goles_favor": 28, "local_goles_contra": 32,
-        "visitante_goles_favor": 24, "visitante_goles_contra": 35,
-        "local_ultimos_5": [1, 0, 1, 1, 0], "visitante_ultimos_5": [0, 1, 1, 1, 0]
-    },
-    {
-        "id": 2, "local": "RCD Espanyol", "visitante": "RC Celta",
-        "fecha": "2026-02-14", "hora": "14:00", "estadio": "RCDE Stadium",
-        "liga": "LaLiga EA Sports", "local_pos": 16, "visitante_pos": 11,
-        "local_forma": "DDDDD", "visitante_forma": "EEDED",
-        "local_goles_favor": 21, "local_goles_contra": 38,
-        "visitante_goles_favor": 29, "visitante_goles_contra": 30,
-        "local_ultimos_5": [0, 0, 0, 0, 0], "visitante_ultimos_5": [1, 1, 0, 1, 0]
-    },
-    {
-        "id": 3, "local": "Rayo Vallecano", "visitante": "Atlético Madrid",
-        "fecha": "2026-02-14", "hora": "16:15", "estadio": "Estadio de Vallecas",
-        "liga": "LaLiga EA Sports", "local_pos": 18, "visitante_pos": 3,
-        "local_forma": "DEDED", "visitante_forma": "VVEVE",
-        "local_goles_favor": 23, "local_goles_contra": 42,
-        "visitante_goles_favor": 48, "visitante_goles_contra": 22,
-        "local_ultimos_5": [0, 1, 0, 1, 0], "visitante_ultimos_5": [3, 3, 1, 3, 1]
-    },
-    {
-        "id": 4, "local": "Sevilla FC", "visitante": "Deportivo Alavés",
-        "fecha": "2026-02-14", "hora": "18:30", "estadio": "Ramón Sánchez-Pizjuán",
-        "liga": "LaLiga EA Sports", "local_pos": 13, "visitante_pos": 15,
-        "local_forma": "DVDED", "visitante_forma": "EEDED",
-        "local_goles_favor": 31, "local_goles_contra": 29,
-        "visitante_goles_favor": 25, "visitante_goles_contra": 33,
-        "local_ultimos_5": [0, 3, 0, 1, 0], "visitante_ultimos_5": [1, 1, 0, 1, 0]
-    },
-    {
-        "id": 5, "local": "Getafe CF", "visitante": "Villarreal CF",
-        "fecha": "2026-02-14", "hora": "21:00", "estadio": "Coliseum Alfonso Pérez",
-        "liga": "LaLiga EA Sports", "local_pos": 10, "visitante_pos": 6,
-        "local_forma": "EEEDD", "visitante_forma": "VEEVD",
-        "local_goles_favor": 26, "local_goles_contra": 28,
-        "visitante_goles_favor": 38, "visitante_goles_contra": 26,
-        "local_ultimos_5": [1, 1, 1, 0, 0], "visitante_ultimos_5": [3, 1, 1, 3, 0]
-    },
-    {
-        "id": 6, "local": "Levante UD", "visitante": "Valencia CF",
-        "fecha": "2026-02-15", "hora": "14:00", "estadio": "Ciutat de València",
-        "liga": "LaLiga EA Sports", "local_pos": 9, "visitante_pos": 17,
-        "local_forma": "VEEDE", "visitante_forma": "DDDED",
-        "local_goles_favor": 33, "local_goles_contra": 27,
-        "visitante_goles_favor": 20, "visitante_goles_contra": 39,
-        "local_ultimos_5": [3, 1, 1, 0, 1], "visitante_ultimos_5": [0, 0, 0, 1, 0]
-    },
-    {
-        "id": 7, "local": "RCD Mallorca", "visitante": "Real Betis",
-        "fecha": "2026-02-15", "hora": "16:15", "estadio": "Mallorca Son Moix",
-        "liga": "LaLiga EA Sports", "local_pos": 8, "visitante_pos": 5,
-        "local_forma": "VDEVE", "visitante_forma": "VEVVD",
-        "local_goles_favor": 35, "local_goles_contra": 28,
-        "visitante_goles_favor": 42, "visitante_goles_contra": 24,
-        "local_ultimos_5": [3, 0, 1, 3, 1], "visitante_ultimos_5": [3, 1, 3, 3, 0]
-    },
-    {
-        "id": 8, "local": "Real Madrid", "visitante": "Real Sociedad",
-        "fecha": "2026-02-15", "hora": "18:30", "estadio": "Santiago Bernabéu",
-        "liga": "LaLiga EA Sports", "local_pos": 2, "visitante_pos": 4,
-        "local_forma": "VEVVE", "visitante_forma": "EVEDE",
-        "local_goles_favor": 52, "local_goles_contra": 18,
-        "visitante_goles_favor": 40, "visitante_goles_contra": 25,
-        "local_ultimos_5": [3, 1, 3, 3, 1], "visitante_ultimos_5": [1, 3, 1, 0, 1]
-    },
-    {
-        "id": 9, "local": "Real Oviedo", "visitante": "Athletic Club",
-        "fecha": "2026-02-15", "hora": "21:00", "estadio": "Estadio Carlos Tartiere",
-        "liga": "LaLiga EA Sports", "local_pos": 19, "visitante_pos": 7,
-        "local_forma": "VDEDD", "visitante_forma": "VEEEV",
-        "local_goles_favor": 19, "local_goles_contra": 44,
-        "visitante_goles_favor": 36, "visitante_goles_contra": 27,
-        "local_ultimos_5": [3, 0, 1, 0, 0], "visitante_ultimos_5": [3, 1, 1, 1, 3]
-    },
-    {
-        "id": 10, "local": "Girona FC", "visitante": "FC Barcelona",
-        "fecha": "2026-02-16", "hora": "21:00", "estadio": "Montilivi",
-        "liga": "LaLiga EA Sports", "local_pos": 20, "visitante_pos": 1,
-        "local_forma": "DDDEE", "visitante_forma": "VVVVV",
-        "local_goles_favor": 18, "local_goles_contra": 46,
-        "visitante_goles_favor": 58, "visitante_goles_contra": 15,
-        "local_ultimos_5": [0, 0, 0, 1, 1], "visitante_ultimos_5": [3, 3, 3, 3, 3]
-    }
-]
+from dixon_coles import poisson_dixon_coles_batch, extraer_partido, goles_necesarios, matrices_dixon_coles
+from tabla_dixon_coles import tabla_por_defecto
+from ajuste_dixon_coles import AjustadorDixonColes, lambdas_ajustadas
+from elo import MotorElo, CHECKPOINT_DIR
+from calibracion import CalibradorMercados, CALIBRACION_PATH
+from almacen_datos import AlmacenJornadas
+from almacen_cuotas import AlmacenCuotas
+from margen import probabilidades_justas, margen, LIBROS, METODO_DEFECTO
+from cartera_kelly import optimizar_cartera, ajustar_marginales
+from salida_web import escribir_artefacto, escribir_picks_troceados
+from cache_resultados import CacheResultados, CACHE_RESULTADOS_DIR, huella, huella_codigo
+from perfilado import PERFILADOR, PERFILADO_DIR, activar_desde_entorno, imprimir_resumen
+from paralelo import shards_partidos, inicializar_worker, analizar_shard_worker
+from registros import TablaPartidos, VistaPartido, Pick
+from equipos import unir
 
-SEGUNDA_DIVISION_JORNADA_26 = [
-    {
-        "id": 11, "local": "Real Valladolid", "visitante": "SD Eibar",
-        "fecha": "2026-02-15", "hora": "16:00", "estadio": "José Zorrilla",
-        "liga": "LaLiga Hypermotion", "local_pos": 1, "visitante_pos": 5,
-        "local_forma": "VVVVE", "visitante_forma": "VEVVD",
-        "local_goles_favor": 45, "local_goles_contra": 18,
-        "visitante_goles_favor": 38, "visitante_goles_contra": 22,
-        "local_ultimos_5": [3, 3, 3, 3, 1], "visitante_ultimos_5": [3, 1, 3, 3, 0]
-    },
-    {
-        "id": 12, "local": "RC Deportivo", "visitante": "Granada CF",
-        "fecha": "2026-02-15", "hora": "18:15", "estadio": "Riazor",
-        "liga": "LaLiga Hypermotion", "local_pos": 2, "visitante_pos": 3,
-        "local_forma": "VVEVV", "visitante_forma": "VVVED",
-        "local_goles_favor": 42, "local_goles_contra": 20,
-        "visitante_goles_favor": 40, "visitante_goles_contra": 21,
-        "local_ultimos_5": [3, 3, 1, 3, 3], "visitante_ultimos_5": [3, 3, 3, 1, 0]
-    },
-    {
-        "id": 13, "local": "CD Leganés", "visitante": "Real Zaragoza",
-        "fecha": "2026-02-15", "hora": "18:15", "estadio": "Butarque",
-        "liga": "LaLiga Hypermotion", "local_pos": 4, "visitante_pos": 6,
-        "local_forma": "VVDEV", "visitante_forma": "VEDEV",
-        "local_goles_favor": 39, "local_goles_contra": 23,
-        "visitante_goles_favor": 35, "visitante_goles_contra": 25,
-        "local_ultimos_5": [3, 3, 0, 1, 3], "visitante_ultimos_5": [3, 1, 0, 1, 3]
-    },
-    {
-        "id": 14, "local": "Racing Santander", "visitante": "Sporting Gijón",
-        "fecha": "2026-02-15", "hora": "20:30", "estadio": "El Sardinero",
-        "liga": "LaLiga Hypermotion", "local_pos": 7, "visitante_pos": 9,
-        "local_forma": "EEDEV", "visitante_forma": "DEEEV",
-        "local_goles_favor": 30, "local_goles_contra": 28,
-        "visitante_goles_favor": 28, "visitante_goles_contra": 30,
-        "local_ultimos_5": [1, 1, 0, 1, 3], "visitante_ultimos_5": [0, 1, 1, 1, 3]
-    },
-    {
-        "id": 15, "local": "Cádiz CF", "visitante": "UD Almería",
-        "fecha": "2026-02-16", "hora": "16:00", "estadio": "Nuevo Mirandilla",
-        "liga": "LaLiga Hypermotion", "local_pos": 8, "visitante_pos": 10,
-        "local_forma": "VEDED", "visitante_forma": "DEEVE",
-        "local_goles_favor": 32, "local_goles_contra": 29,
-        "visitante_goles_favor": 27, "visitante_goles_contra": 31,
-        "local_ultimos_5": [3, 1, 0, 1, 0], "visitante_ultimos_5": [0, 1, 1, 3, 1]
-    },
-    {
-        "id": 16, "local": "Albacete BP", "visitante": "Córdoba CF",
-        "fecha": "2026-02-16", "hora": "18:15", "estadio": "Carlos Belmonte",
-        "liga": "LaLiga Hypermotion", "local_pos": 12, "visitante_pos": 11,
-        "local_forma": "DEEED", "visitante_forma": "EDEVD",
-        "local_goles_favor": 25, "local_goles_contra": 32,
-        "visitante_goles_favor": 26, "visitante_goles_contra": 31,
-        "local_ultimos_5": [0, 1, 1, 1, 0], "visitante_ultimos_5": [1, 0, 1, 3, 0]
-    }
-]
-
-# CUOTAS REALES de casas de apuestas (simuladas pero realistas)
-MARKET_ODDS = {
-    1: {"home": 2.30, "draw": 3.20, "away": 3.10, "btts_yes": 1.80, "over25": 1.95},
-    2: {"home": 3.40, "draw": 3.30, "away": 2.15, "btts_yes": 1.75, "over25": 1.85},
-    3: {"home": 4.50, "draw": 3.80, "away": 1.70, "btts_yes": 1.65, "over25": 1.75},
-    4: {"home": 2.00, "draw": 3.40, "away": 3.80, "btts_yes": 1.85, "over25": 1.90},
-    5: {"home": 2.80, "draw": 3.10, "away": 2.60, "btts_yes": 1.70, "over25": 1.80},
-    6: {"home": 1.80, "draw": 3.60, "away": 4.50, "btts_yes": 1.95, "over25": 1.85},
-    7: {"home": 2.40, "draw": 3.30, "away": 2.90, "btts_yes": 1.65, "over25": 1.70},
-    8: {"home": 1.60, "draw": 4.00, "away": 5.50, "btts_yes": 1.60, "over25": 1.65},
-    9: {"home": 4.00, "draw": 3.50, "away": 1.90, "btts_yes": 1.75, "over25": 1.80},
-    10: {"home": 8.00, "draw": 5.00, "away": 1.35, "btts_yes": 2.00, "over25": 1.70},
-    11: {"home": 1.70, "draw": 3.80, "away": 4.80, "btts_yes": 1.60, "over25": 1.65},
-    12: {"home": 2.20, "draw": 3.40, "away": 3.20, "btts_yes": 1.65, "over25": 1.75},
-    13: {"home": 2.10, "draw": 3.30, "away": 3.50, "btts_yes": 1.70, "over25": 1.80},
-    14: {"home": 2.50, "draw": 3.20, "away": 2.80, "btts_yes": 1.75, "over25": 1.85},
-    15: {"home": 2.30, "draw": 3.10, "away": 3.20, "btts_yes": 1.80, "over25": 1.90},
-    16: {"home": 2.60, "draw": 3.00, "away": 2.70, "btts_yes": 1.85, "over25": 1.95}
+NOMBRES_COMPETICION = {
+    'primera_division': 'LaLiga EA Sports',
+    'segunda_division': 'LaLiga Hypermotion',
+}
+# Pesos del ensemble (Poisson-DC, ELO, Forma) y tasa de empate del modelo ELO
+PESOS_ENSEMBLE = (0.5, 0.3, 0.2)
+EMPATE_ELO = 0.27
+# Edge mínimo para recomendar apuesta y tope del stake Kelly fraccional
+EDGE_MINIMO = 0.02
+KELLY_MAXIMO = 0.05
+# Mercado del calibrador para cada clave de probabilidad (None: fórmula fija)
+MERCADO_CALIBRACION = {
+    'home': '1x2', 'draw': '1x2', 'away': '1x2',
+    'btts': 'btts',
+    'over25': 'over25',
+}
+# Métodos instrumentados con PERFILADO=1 / --perfilar (perfilado.py)
+ETAPAS_ANALISIS = ('calculate_lambda_values', 'poisson_dixon_coles', 'poisson_dixon_coles_batch',
+                   'ensemble_prediction', 'calibrate_probabilities', 'generar_predicciones',
+                   'analizar_shard', 'optimizar_stakes_cartera', 'generar_reporte_completo')
+# Probabilidad del modelo para cada selección con precio de mercado
+PROB_SELECCION = {
+    'home': lambda probs: probs['home'],
+    'draw': lambda probs: probs['draw'],
+    'away': lambda probs: probs['away'],
+    'btts_yes': lambda probs: probs['btts'],
+    'btts_no': lambda probs: 1-probs['btts'],
+    'over25': lambda probs: probs['over25'],
+    'under25': lambda probs: 1-probs['over25'],
 }
 
 
@@ -196,13 +72,77 @@ class AdvancedBettingAnalyzer:
     3. Dixon-Coles estable (tau acotado)
     """
     
-    def __init__(self):
-        self.partidos = PRIMERA_DIVISION_JORNADA_24 + SEGUNDA_DIVISION_JORNADA_26
+    def __init__(self, usar_tabla: bool = False, parametros_dc: Optional[Dict] = None,
+                 fuente: Optional[AlmacenJornadas] = None,
+                 jornadas: Optional[List[Tuple[str, str, int]]] = None,
+                 calibrador: Optional[CalibradorMercados] = None,
+                 almacen_cuotas: Optional[AlmacenCuotas] = None):
+        """
+        usar_tabla: consulta las probabilidades Poisson-DC en la tabla
+        precalculada (tabla_dixon_coles.py) en lugar de calcular la matriz
+        parametros_dc: parámetros ajustados por máxima verosimilitud
+        (ajuste_dixon_coles.py); sustituyen a las fórmulas manuales de lambda
+        fuente/jornadas: almacén de partidos y cuotas y las jornadas a cargar
+        (temporada, competición, jornada); por defecto la última guardada de cada
+        competición (la que acaba de descargar actualizar_partidos.py)
+        calibrador: tablas de calibración ajustadas por mercado (calibracion.py)
+        almacen_cuotas: snapshots de cuotas multi-casa (almacen_cuotas.py); su mejor
+        precio vigente sustituye a la cuota de la jornada
+        """
+        self.fuente = fuente or AlmacenJornadas()
+        self.partidos = TablaPartidos()
+        self.market_odds = {}
+        self.jornadas = {}
+        cuotas_jornadas = []
+        for temporada, competicion, jornada in (self.fuente.ultimas() if jornadas is None else jornadas):
+            partidos, cuotas = self.fuente.cargar(temporada, competicion, jornada)
+            self.partidos.ampliar(partidos)
+            cuotas_jornadas.append((partidos, cuotas))
+            self.jornadas[competicion] = jornada
+        # Cada jornada numera sus partidos desde 1: ids únicos en el análisis
+        datos = self.partidos.datos
+        if len(np.unique(datos['id'])) < len(datos):
+            datos['id'] = np.arange(1, len(datos) + 1)
+        for partidos, cuotas in cuotas_jornadas:
+            self._cruzar_cuotas(partidos, cuotas)
+        if almacen_cuotas is not None:
+            for partido_id, mejores in almacen_cuotas.mejores_cuotas(self.partidos).items():
+                self.market_odds.setdefault(partido_id, {}).update(mejores)
         self.elo_ratings = {}
+        self.tabla = tabla_por_defecto() if usar_tabla else None
+        self.parametros_dc = parametros_dc
+        self.rho = parametros_dc['rho'] if parametros_dc else 0.10
+        self.calibrador = calibrador or CalibradorMercados()
+        self.edge_minimo = EDGE_MINIMO
+        self.pesos_ensemble = PESOS_ENSEMBLE
+        self.empate_elo = EMPATE_ELO
+        self.validacion = None  # resumen del último backtest (backtest.py)
+        self.metodo_margen = METODO_DEFECTO
+        self.modo_stake = 'individual'  # 'cartera': Kelly simultáneo (cartera_kelly.py)
+        self.cache_resultados: Optional[CacheResultados] = None
+        self.calcular_probs_justas()
         self.initialize_elo()
         
-    def initialize_elo(self):
-        """Inicializa ratings ELO para todos los equipos"""
+    def _cruzar_cuotas(self, partidos: TablaPartidos, cuotas: Dict[int, Dict[str, float]]):
+        """Cuotas de una jornada (por su id de partido) a market_odds, cruzadas por equipos canónicos"""
+        ids_jornada = np.array(list(cuotas), dtype=np.int64)
+        filas = unir(ids_jornada, partidos.datos['id'])
+        posicion = np.full(len(ids_jornada), -1, dtype=np.intp)
+        posicion[filas >= 0] = unir(partidos.claves()[filas[filas >= 0]], self.partidos.claves())
+        for partido_id, pos in zip(ids_jornada.tolist(), posicion.tolist()):
+            if pos >= 0:
+                self.market_odds[int(self.partidos.datos['id'][pos])] = cuotas[partido_id]
+        
+    def initialize_elo(self, checkpoint_dir: str = CHECKPOINT_DIR):
+        """
+        Inicializa ratings ELO desde el último checkpoint del motor ELO
+        (checkpoint_dir=None: solo los ratings ya cargados, p.ej. en backtest).
+        Los equipos sin historial usan la aproximación por posición.
+        """
+        motor = MotorElo.cargar_ultimo(checkpoint_dir) if checkpoint_dir else None
+        if motor is not None:
+            self.elo_ratings.update(motor.como_dict())
+        
         base_elo = 1500
         for partido in self.partidos:
             if partido['local'] not in self.elo_ratings:
@@ -218,81 +158,46 @@ class AdvancedBettingAnalyzer:
         Modelo Poisson-Dixon-Coles CORREGIDO
         FIX 1: Usa triángulos de la matriz para 1X2
         FIX 3: Tau acotado para evitar probabilidades negativas
+        (delegado al motor vectorizado de dixon_coles.py)
         """
-        max_goals = 6
-        prob_matrix = np.zeros((max_goals + 1, max_goals + 1))
-        
-        for i in range(max_goals + 1):
-            for j in range(max_goals + 1):
-                prob = poisson.pmf(i, lambda_home) * poisson.pmf(j, lambda_away)
-                
-                # Corrección Dixon-Coles ESTABLE
-                if (i, j) in [(0, 0), (1, 0), (0, 1), (1, 1)]:
-                    tau = self._tau_correction_stable(i, j, lambda_home, lambda_away, rho)
-                    prob *= tau
-                
-                prob_matrix[i, j] = max(prob, 0)  # Evitar negativos
-        
-        # Normalizar
-        total = prob_matrix.sum()
-        if total > 0:
-            prob_matrix /= total
-        
-        # FIX BUG 1X2: Usar triángulos correctamente
-        # i>j = local gana (triangular inferior sin diagonal)
-        # i<j = visitante gana (triangular superior sin diagonal)
-        # i=j = empate (diagonal)
-        
-        prob_home = 0
-        prob_away = 0
-        prob_draw = 0
-        
-        for i in range(max_goals + 1):
-            for j in range(max_goals + 1):
-                if i > j:  # Local gana
-                    prob_home += prob_matrix[i, j]
-                elif i < j:  # Visitante gana
-                    prob_away += prob_matrix[i, j]
-                else:  # Empate (i == j)
-                    prob_draw += prob_matrix[i, j]
-        
-        # Calcular otras probabilidades
-        prob_btts = 1 - (prob_matrix[0, :].sum() + prob_matrix[:, 0].sum() - prob_matrix[0, 0])
-        prob_over25 = sum(prob_matrix[i, j] for i in range(max_goals + 1) 
-                         for j in range(max_goals + 1) if i + j > 2.5)
+        if self.tabla is not None:
+            probs = dict(self.tabla.consultar(float(lambda_home), float(lambda_away), float(rho)))
+            probs['expected_home_goals'] = lambda_home
+            probs['expected_away_goals'] = lambda_away
+            return probs
+        
+        batch = poisson_dixon_coles_batch([lambda_home], [lambda_away], rho)
         
         return {
-            'home': prob_home,
-            'draw': prob_draw,
-            'away': prob_away,
-            'btts': prob_btts,
-            'over25': prob_over25,
+            'home': float(batch['home'][0]),
+            'draw': float(batch['draw'][0]),
+            'away': float(batch['away'][0]),
+            'btts': float(batch['btts'][0]),
+            'over25': float(batch['over25'][0]),
             'expected_home_goals': lambda_home,
-            'expected_away_goals': lambda_away
+            'expected_away_goals': lambda_away,
+            'masa_truncada': float(batch['masa_truncada'][0])
         }
     
-    def _tau_correction_stable(self, i: int, j: int, lambda_h: float, 
-                               lambda_a: float, rho: float) -> float:
+    def poisson_dixon_coles_batch(self, lambdas_home, lambdas_away, rho=0.1,
+                                  max_goals: Optional[int] = None) -> Dict[str, np.ndarray]:
         """
-        Corrección tau ESTABLE (acotada para evitar negativos)
-        FIX 3: Asegura que tau esté en rango razonable [0.5, 1.5]
+        Versión batch para N partidos: una sola pasada NumPy
+        Devuelve matrices N×G×G y todos los mercados derivados como arrays
+        (en modo tabla solo los mercados interpolados, sin matrices)
         """
-        if i == 0 and j == 0:
-            tau = 1 - lambda_h * lambda_a * rho
-        elif i == 0 and j == 1:
-            tau = 1 + lambda_h * rho
-        elif i == 1 and j == 0:
-            tau = 1 + lambda_a * rho
-        elif i == 1 and j == 1:
-            tau = 1 - rho
-        else:
-            tau = 1.0
-        
-        # Acotar tau para estabilidad
-        return np.clip(tau, 0.5, 1.5)
+        if self.tabla is not None:
+            return self.tabla.consultar_batch(lambdas_home, lambdas_away, rho)
+        return poisson_dixon_coles_batch(lambdas_home, lambdas_away, rho, max_goals)
     
     def calculate_lambda_values(self, partido: Dict) -> Tuple[float, float]:
         """Calcula lambda (goles esperados) con features avanzados"""
+        # Parámetros ajustados por MLE si cubren a ambos equipos
+        if self.parametros_dc:
+            ajustadas = lambdas_ajustadas(self.parametros_dc, partido['local'], partido['visitante'])
+            if ajustadas is not None:
+                return np.clip(ajustadas[0], 0.3, 4.0), np.clip(ajustadas[1], 0.3, 4.0)
+        
         home_advantage = 1.15
         avg_goles_liga = 2.5
         
@@ -330,11 +235,32 @@ class AdvancedBettingAnalyzer:
         
         return np.clip(lambda_home, 0.3, 4.0), np.clip(lambda_away, 0.3, 4.0)
     
+    def calcular_probs_justas(self):
+        """
+        Probabilidades sin margen de todos los partidos: un array (N, K) por
+        libro (1X2, BTTS, Over/Under) resuelto de una vez con margen.py.
+        Solo para libros completos; guarda también el margen de cada libro.
+        """
+        ids = list(self.market_odds)
+        self.probs_justas = {partido_id: {} for partido_id in ids}
+        for libro in LIBROS:
+            cuotas = np.array([[self.market_odds[pid].get(s) or np.nan for s in libro] for pid in ids],
+                              dtype=float).reshape(-1, len(libro))
+            justas = probabilidades_justas(cuotas, self.metodo_margen)
+            for pid, fila, overround in zip(ids, justas.tolist(), margen(cuotas).tolist()):
+                if not np.isnan(overround):
+                    self.probs_justas[pid].update(zip(libro, fila))
+                    self.probs_justas[pid][f'margen_{libro[0]}'] = overround
+    
     def calculate_edge_realistic(self, our_prob: float, market_odds: Optional[float], 
-                                 kelly_fraction: float = 0.25) -> Dict[str, any]:
+                                 kelly_fraction: float = 0.25,
+                                 prob_justa: Optional[float] = None) -> Dict[str, any]:
         """
         FIX 2: Edge REALISTA - solo si hay cuotas reales
         Si no hay cuotas, NO recomendar apuesta (apostar=False)
+        market_odds es el mejor precio disponible (almacén de cuotas multi-casa)
+        prob_justa: probabilidad sin margen del libro completo; el edge se mide
+        contra ella y el stake Kelly con la cuota que realmente se cobra
         """
         if market_odds is None or market_odds <= 1.0:
             # NO hay cuotas reales disponibles
@@ -346,15 +272,15 @@ class AdvancedBettingAnalyzer:
                 'razon': 'Sin cuotas de mercado disponibles'
             }
         
-        # Calcular probabilidad implícita de la cuota
-        implied_prob = 1 / market_odds
+        # Probabilidad implícita sin margen (o de la cuota si el libro está incompleto)
+        implied_prob = prob_justa if prob_justa is not None else 1 / market_odds
         edge = our_prob - implied_prob
+        b = market_odds - 1
+        kelly = (b * our_prob - (1 - our_prob)) / b if b > 0 else 0
         
-        # Solo apostar si edge > 2%
-        if edge > 0.02:
-            b = market_odds - 1
-            kelly = (b * our_prob - (1 - our_prob)) / b if b > 0 else 0
-            kelly_stake = max(0, min(kelly * kelly_fraction, 0.05))
+        # Solo apostar si edge > edge mínimo (2%) y la cuota cobrada da valor esperado positivo
+        if edge > self.edge_minimo and kelly > 0:
+            kelly_stake = max(0, min(kelly * kelly_fraction, KELLY_MAXIMO))
             
             return {
                 'has_edge': True,
@@ -369,30 +295,56 @@ class AdvancedBettingAnalyzer:
             'edge_percent': edge * 100,
             'kelly_stake': 0.0,
             'apostar': False,
-            'razon': f'Edge insuficiente: {edge*100:.1f}% < 2%'
+            'razon': f'Edge insuficiente: {edge*100:.1f}% < {self.edge_minimo*100:g}%'
         }
     
-    def ensemble_prediction(self, partido: Dict) -> Dict[str, float]:
-        """Ensemble: Poisson-DC (50%) + ELO (30%) + Forma (20%)"""
-        # Modelo 1: Poisson-Dixon-Coles
-        lambda_h, lambda_a = self.calculate_lambda_values(partido)
-        poisson_probs = self.poisson_dixon_coles(lambda_h, lambda_a, rho=0.10)
-        
-        # Modelo 2: ELO
+    def calculate_edge_batch(self, our_probs, market_odds, probs_justas=None,
+                             kelly_fraction: float = 0.25) -> Dict[str, np.ndarray]:
+        """
+        Versión vectorizada de calculate_edge_realistic (misma regla)
+        market_odds NaN o <= 1 = sin cuota real: no se apuesta
+        probs_justas NaN = libro incompleto: se usa la implícita de la cuota
+        """
+        probs = np.asarray(our_probs, dtype=float)
+        odds = np.asarray(market_odds, dtype=float)
+        con_cuota = odds > 1.0
+        cuotas = np.where(con_cuota, odds, 2.0)
+        implicitas = 1 / cuotas
+        if probs_justas is not None:
+            justas = np.asarray(probs_justas, dtype=float)
+            implicitas = np.where(np.isnan(justas), implicitas, justas)
+        
+        edge = np.where(con_cuota, probs - implicitas, 0.0)
+        b = cuotas - 1
+        kelly = (b * probs - (1 - probs)) / b
+        apostar = con_cuota & (edge > self.edge_minimo) & (kelly > 0)
+        return {
+            'edge': edge,
+            'kelly_stake': np.where(apostar, np.clip(kelly * kelly_fraction, 0, KELLY_MAXIMO), 0.0),
+            'apostar': apostar
+        }
+    
+    def probabilidad_elo_local(self, partido: Dict) -> float:
+        """P(victoria local) según la diferencia ELO, antes de añadir el empate"""
         elo_local = self.elo_ratings[partido['local']]
         elo_visitante = self.elo_ratings[partido['visitante']]
-        elo_prob_home = 1 / (1 + 10 ** ((elo_visitante - elo_local) / 400))
+        return 1 / (1 + 10 ** ((elo_visitante - elo_local) / 400))
+    
+    def probabilidades_elo(self, partido: Dict) -> Dict[str, float]:
+        """Modelo ELO con tasa de empate fija (self.empate_elo)"""
+        elo_prob_home = self.probabilidad_elo_local(partido)
         elo_prob_away = 1 - elo_prob_home
-        elo_prob_draw = 0.27
+        elo_prob_draw = self.empate_elo
         
         total_elo = elo_prob_home + elo_prob_draw + elo_prob_away
-        elo_probs = {
+        return {
             'home': elo_prob_home / total_elo,
             'draw': elo_prob_draw / total_elo,
             'away': elo_prob_away / total_elo
         }
-        
-        # Modelo 3: Forma
+    
+    def probabilidades_forma(self, partido: Dict) -> Dict[str, float]:
+        """Modelo de forma: puntos de los últimos 5 partidos"""
         local_pts = sum(partido['local_ultimos_5'])
         visitante_pts = sum(partido['visitante_ultimos_5'])
         total_pts = local_pts + visitante_pts + 5
@@ -403,13 +355,32 @@ class AdvancedBettingAnalyzer:
             'draw': 1 / total_pts
         }
         total_forma = sum(forma_probs.values())
-        forma_probs = {k: v/total_forma for k, v in forma_probs.items()}
+        return {k: v/total_forma for k, v in forma_probs.items()}
+    
+    def ensemble_prediction(self, partido: Dict,
+                            poisson_probs: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        Ensemble: Poisson-DC (50%) + ELO (30%) + Forma (20%) por defecto
+        (self.pesos_ensemble, ajustables con busqueda_hiperparametros.py)
+        poisson_probs permite reutilizar un resultado ya calculado en batch
+        """
+        # Modelo 1: Poisson-Dixon-Coles
+        if poisson_probs is None:
+            lambda_h, lambda_a = self.calculate_lambda_values(partido)
+            poisson_probs = self.poisson_dixon_coles(lambda_h, lambda_a, rho=self.rho)
+        
+        # Modelo 2: ELO
+        elo_probs = self.probabilidades_elo(partido)
+        
+        # Modelo 3: Forma
+        forma_probs = self.probabilidades_forma(partido)
         
         # Ensemble
+        w_poisson, w_elo, w_forma = self.pesos_ensemble
         ensemble = {
-            'home': 0.5 * poisson_probs['home'] + 0.3 * elo_probs['home'] + 0.2 * forma_probs['home'],
-            'draw': 0.5 * poisson_probs['draw'] + 0.3 * elo_probs['draw'] + 0.2 * forma_probs['draw'],
-            'away': 0.5 * poisson_probs['away'] + 0.3 * elo_probs['away'] + 0.2 * forma_probs['away'],
+            'home': w_poisson * poisson_probs['home'] + w_elo * elo_probs['home'] + w_forma * forma_probs['home'],
+            'draw': w_poisson * poisson_probs['draw'] + w_elo * elo_probs['draw'] + w_forma * forma_probs['draw'],
+            'away': w_poisson * poisson_probs['away'] + w_elo * elo_probs['away'] + w_forma * forma_probs['away'],
             'btts': poisson_probs['btts'],
             'over25': poisson_probs['over25'],
             'expected_home_goals': poisson_probs['expected_home_goals'],
@@ -418,17 +389,36 @@ class AdvancedBettingAnalyzer:
         
         return ensemble
     
+    def mercados_partido(self, partido: Dict,
+                         poisson_probs: Optional[Dict] = None) -> Dict:
+        """
+        Todos los mercados de la matriz de marcadores de un partido.
+        Reutiliza el resultado batch si ya los trae; si no, los calcula para
+        el partido (en modo tabla, interpolados: sin matriz de marcadores).
+        """
+        if poisson_probs is not None and 'ah_local' in poisson_probs:
+            return poisson_probs
+        lambda_h, lambda_a = self.calculate_lambda_values(partido)
+        return extraer_partido(self.poisson_dixon_coles_batch([lambda_h], [lambda_a], self.rho), 0)
+    
     def calibrate_probabilities(self, probs: Dict[str, float]) -> Dict[str, float]:
-        """Calibración Platt"""
+        """
+        Calibración por mercado con las tablas ajustadas (calibracion.py).
+        Acepta floats o arrays; una llamada vectorizada por mercado.
+        Los goles esperados no son probabilidades y no se calibran.
+        """
         calibrated = {}
-        
+        grupos = defaultdict(list)
         for key, prob in probs.items():
-            if prob > 0.9:
-                calibrated[key] = 0.85 + (prob - 0.9) * 0.5
-            elif prob < 0.1:
-                calibrated[key] = 0.1 + prob * 0.5
+            if key.startswith('expected_'):
+                calibrated[key] = prob
             else:
-                calibrated[key] = prob * 0.95 + 0.025
+                grupos[MERCADO_CALIBRACION.get(key)].append(key)
+        
+        for mercado, keys in grupos.items():
+            valores = self.calibrador.aplicar(mercado, np.stack([np.asarray(probs[k], dtype=float) for k in keys]))
+            for key, valor in zip(keys, valores):
+                calibrated[key] = float(valor) if valor.ndim == 0 else valor
         
         # Re-normalizar 1X2
         if 'home' in calibrated and 'draw' in calibrated and 'away' in calibrated:
@@ -439,15 +429,18 @@ class AdvancedBettingAnalyzer:
         
         return calibrated
     
-    def generar_predicciones(self, partido: Dict) -> List[Dict]:
-        """Genera picks con edge REALISTA"""
+    def generar_predicciones(self, partido: VistaPartido,
+                             poisson_probs: Optional[Dict[str, float]] = None,
+                             probs: Optional[Dict[str, float]] = None) -> List[Pick]:
+        """Genera picks con edge REALISTA (probs: ensemble ya calibrado)"""
         
         # Ensemble y calibración
-        probs_raw = self.ensemble_prediction(partido)
-        probs = self.calibrate_probabilities(probs_raw)
+        if probs is None:
+            probs = self.calibrate_probabilities(self.ensemble_prediction(partido, poisson_probs))
         
         # Obtener cuotas REALES del mercado
-        market_odds = MARKET_ODDS.get(partido['id'], {})
+        market_odds = self.market_odds.get(partido['id'], {})
+        probs_justas = self.probs_justas.get(partido['id'], {})
         
         picks = []
         
@@ -458,7 +451,8 @@ class AdvancedBettingAnalyzer:
         
         # Obtener cuota real del mercado
         real_odds = market_odds.get(outcome_name)
-        edge_info = self.calculate_edge_realistic(outcome_prob, real_odds)
+        edge_info = self.calculate_edge_realistic(outcome_prob, real_odds,
+                                                  prob_justa=probs_justas.get(outcome_name))
         
         if outcome_name == 'home':
             pred_text = f"Victoria {partido['local']}"
@@ -467,144 +461,150 @@ class AdvancedBettingAnalyzer:
         else:
             pred_text = "Empate"
         
-        picks.append({
-            "tipo": "Resultado Final (1X2)",
-            "prediccion": pred_text,
-            "confianza": round(outcome_prob * 100, 1),
-            "cuota_mercado": real_odds if real_odds else None,
-            "edge_percent": round(edge_info['edge_percent'], 1),
-            "apostar": edge_info['apostar'],
-            "kelly_stake_percent": round(edge_info['kelly_stake'] * 100, 1),
-            "razon": edge_info['razon'],
-            "modelo": "Poisson-DC + ELO + Forma",
-            "probabilidades": {
-                "local": round(probs['home'] * 100, 1),
-                "empate": round(probs['draw'] * 100, 1),
-                "visitante": round(probs['away'] * 100, 1)
-            }
-        })
+        picks.append(Pick(
+            tipo="Resultado Final (1X2)",
+            prediccion=pred_text,
+            confianza=round(outcome_prob * 100, 1),
+            cuota_mercado=real_odds if real_odds else None,
+            seleccion=outcome_name,
+            edge_percent=round(edge_info['edge_percent'], 1),
+            apostar=edge_info['apostar'],
+            kelly_stake_percent=round(edge_info['kelly_stake'] * 100, 1),
+            razon=edge_info['razon'],
+            modelo="Poisson-DC + ELO + Forma",
+            probabilidades=(round(probs['home'] * 100, 1), round(probs['draw'] * 100, 1),
+                            round(probs['away'] * 100, 1))
+        ))
         
         # PICK 2: BTTS
         btts_prob = probs['btts']
         btts_pred = "Sí" if btts_prob > 0.5 else "No"
-        real_btts_odds = market_odds.get('btts_yes') if btts_pred == "Sí" else None
+        seleccion_btts = 'btts_yes' if btts_pred == "Sí" else 'btts_no'
+        real_btts_odds = market_odds.get(seleccion_btts)
         
         edge_btts = self.calculate_edge_realistic(
             btts_prob if btts_pred == "Sí" else 1-btts_prob,
-            real_btts_odds
+            real_btts_odds,
+            prob_justa=probs_justas.get(seleccion_btts)
         )
         
-        picks.append({
-            "tipo": "Ambos Equipos Marcan",
-            "prediccion": btts_pred,
-            "confianza": round((btts_prob if btts_pred == "Sí" else 1-btts_prob) * 100, 1),
-            "cuota_mercado": real_btts_odds,
-            "edge_percent": round(edge_btts['edge_percent'], 1),
-            "apostar": edge_btts['apostar'],
-            "kelly_stake_percent": round(edge_btts['kelly_stake'] * 100, 1),
-            "razon": edge_btts['razon'],
-            "descripcion": f"xG: {partido['local'][:3]} {probs['expected_home_goals']:.1f} - {probs['expected_away_goals']:.1f} {partido['visitante'][:3]}",
-            "modelo": "Poisson-Dixon-Coles"
-        })
+        picks.append(Pick(
+            tipo="Ambos Equipos Marcan",
+            prediccion=btts_pred,
+            confianza=round((btts_prob if btts_pred == "Sí" else 1-btts_prob) * 100, 1),
+            cuota_mercado=real_btts_odds,
+            seleccion=seleccion_btts,
+            edge_percent=round(edge_btts['edge_percent'], 1),
+            apostar=edge_btts['apostar'],
+            kelly_stake_percent=round(edge_btts['kelly_stake'] * 100, 1),
+            razon=edge_btts['razon'],
+            descripcion=f"xG: {partido['local'][:3]} {probs['expected_home_goals']:.1f} - {probs['expected_away_goals']:.1f} {partido['visitante'][:3]}",
+            modelo="Poisson-Dixon-Coles"
+        ))
         
         # PICK 3: Over/Under 2.5
         over_prob = probs['over25']
         over_pred = "Más de 2.5" if over_prob > 0.5 else "Menos de 2.5"
-        real_over_odds = market_odds.get('over25') if over_pred == "Más de 2.5" else None
+        seleccion_over = 'over25' if over_pred == "Más de 2.5" else 'under25'
+        real_over_odds = market_odds.get(seleccion_over)
         
         edge_over = self.calculate_edge_realistic(
             over_prob if over_pred == "Más de 2.5" else 1-over_prob,
-            real_over_odds
+            real_over_odds,
+            prob_justa=probs_justas.get(seleccion_over)
         )
         
         total_expected = probs['expected_home_goals'] + probs['expected_away_goals']
         
-        picks.append({
-            "tipo": "Total de Goles",
-            "prediccion": over_pred,
-            "confianza": round((over_prob if over_pred == "Más de 2.5" else 1-over_prob) * 100, 1),
-            "cuota_mercado": real_over_odds,
-            "edge_percent": round(edge_over['edge_percent'], 1),
-            "apostar": edge_over['apostar'],
-            "kelly_stake_percent": round(edge_over['kelly_stake'] * 100, 1),
-            "razon": edge_over['razon'],
-            "descripcion": f"Expected total: {total_expected:.2f} goles",
-            "modelo": "Poisson Goals Distribution"
-        })
-        
-        # PICK 4: Doble Oportunidad
+        picks.append(Pick(
+            tipo="Total de Goles",
+            prediccion=over_pred,
+            confianza=round((over_prob if over_pred == "Más de 2.5" else 1-over_prob) * 100, 1),
+            cuota_mercado=real_over_odds,
+            seleccion=seleccion_over,
+            edge_percent=round(edge_over['edge_percent'], 1),
+            apostar=edge_over['apostar'],
+            kelly_stake_percent=round(edge_over['kelly_stake'] * 100, 1),
+            razon=edge_over['razon'],
+            descripcion=f"Expected total: {total_expected:.2f} goles",
+            modelo="Poisson Goals Distribution"
+        ))
+        
+        # Mercados derivados de la matriz de marcadores (DC, AH, ...)
+        mercados = self.mercados_partido(partido, poisson_probs)
+        
+        # PICK 4: Doble Oportunidad (precio exacto desde la matriz). Sin tablas
+        # de calibración para DC/AH: la cuota justa es la de la matriz
         dc_options = [
-            ('home', probs['home'] + probs['draw'], f"{partido['local']} o Empate"),
-            ('away', probs['away'] + probs['draw'], f"{partido['visitante']} o Empate"),
+            ('home', float(mercados['dc_1x']), f"{partido['local']} o Empate"),
+            ('away', float(mercados['dc_x2']), f"{partido['visitante']} o Empate"),
         ]
         best_dc = max(dc_options, key=lambda x: x[1])
         
         # No hay cuotas reales para DC en nuestro dataset, no recomendar
-        picks.append({
-            "tipo": "Doble Oportunidad",
-            "prediccion": best_dc[2],
-            "confianza": round(best_dc[1] * 100, 1),
-            "cuota_mercado": None,
-            "edge_percent": 0.0,
-            "apostar": False,
-            "kelly_stake_percent": 0.0,
-            "razon": "Sin cuotas de mercado disponibles",
-            "descripcion": "Apuesta de cobertura (sin odds reales)",
-            "modelo": "Probabilidad Combinada"
-        })
-        
-        # PICK 5: Asian Handicap
+        picks.append(Pick(
+            tipo="Doble Oportunidad",
+            prediccion=best_dc[2],
+            confianza=round(best_dc[1] * 100, 1),
+            cuota_mercado=None,
+            cuota_justa=round(1 / best_dc[1], 2),
+            edge_percent=0.0,
+            apostar=False,
+            kelly_stake_percent=0.0,
+            razon="Sin cuotas de mercado disponibles",
+            descripcion=f"Apuesta de cobertura (cuota justa {1 / best_dc[1]:.2f})",
+            modelo="Poisson-DC Score Matrix"
+        ))
+        
+        # PICK 5: Asian Handicap exacto: línea de cuarto más cercana a la diferencia esperada
         goal_diff = probs['expected_home_goals'] - probs['expected_away_goals']
-        
-        if abs(goal_diff) > 1.0:
-            if goal_diff > 0:
-                handicap_text = f"{partido['local']} -1.0 AH"
-                handicap_prob = probs['home'] * 0.7
-            else:
-                handicap_text = f"{partido['visitante']} -1.0 AH"
-                handicap_prob = probs['away'] * 0.7
+        lineas_ah = mercados['ejes']['lineas_ah']
+        idx_linea = int(np.argmin(np.abs(lineas_ah + goal_diff)))
+        linea_local = float(lineas_ah[idx_linea]) + 0.0  # evita "-0.00"
+        
+        ah_local = float(mercados['ah_local'][idx_linea])
+        ah_visitante = float(mercados['ah_visitante'][idx_linea])
+        if ah_local >= ah_visitante:
+            handicap_text = f"{partido['local']} {linea_local:+.2f} AH"
+            handicap_prob = ah_local
         else:
-            handicap_text = "Empate AH 0.0"
-            handicap_prob = probs['draw'] * 1.2
-        
-        handicap_prob = min(handicap_prob, 0.85)
-        
-        picks.append({
-            "tipo": "Asian Handicap",
-            "prediccion": handicap_text,
-            "confianza": round(handicap_prob * 100, 1),
-            "cuota_mercado": None,
-            "edge_percent": 0.0,
-            "apostar": False,
-            "kelly_stake_percent": 0.0,
-            "razon": "Sin cuotas de mercado disponibles",
-            "descripcion": f"Goal diff esperada: {goal_diff:+.2f}",
-            "modelo": "xG Differential"
-        })
+            handicap_text = f"{partido['visitante']} {-linea_local + 0.0:+.2f} AH"
+            handicap_prob = ah_visitante
+        
+        # Con nulos/medios nulos la cuota justa es 1 / probabilidad efectiva
+        cuota_justa = 1 / handicap_prob
+        
+        picks.append(Pick(
+            tipo="Asian Handicap",
+            prediccion=handicap_text,
+            confianza=round(handicap_prob * 100, 1),
+            cuota_mercado=None,
+            cuota_justa=round(cuota_justa, 2),
+            edge_percent=0.0,
+            apostar=False,
+            kelly_stake_percent=0.0,
+            razon="Sin cuotas de mercado disponibles",
+            descripcion=f"Goal diff esperada: {goal_diff:+.2f} | cuota justa {cuota_justa:.2f}",
+            modelo="Poisson-DC Score Matrix"
+        ))
         
         return picks
     
-    def generar_reporte_completo(self) -> Dict:
-        """Genera reporte completo CORREGIDO"""
-        
-        primera_division = []
-        segunda_division = []
-        
-        total_edge_bets = 0
-        avg_confidence = []
-        total_picks_generados = 0
-        
-        for partido in self.partidos:
-            picks = self.generar_predicciones(partido)
-            total_picks_generados += len(picks)
-            
-            # Contar solo picks que REALMENTE tienen edge (con cuotas)
-            edge_bets_partido = sum(1 for pick in picks if pick.get('apostar', False))
-            total_edge_bets += edge_bets_partido
-            
-            avg_confidence.extend([pick['confianza'] for pick in picks])
-            
-            partido_data = {
+    def analizar_shard(self, partidos: TablaPartidos, lambdas: np.ndarray,
+                       max_goals: Optional[int] = None) -> List[Dict]:
+        """
+        Analiza un shard (competición/jornada) recibido como TablaPartidos.
+        Poisson-DC del shard en una sola pasada vectorizada.
+        """
+        batch = self.poisson_dixon_coles_batch(lambdas[:, 0], lambdas[:, 1],
+                                               rho=self.rho, max_goals=max_goals)
+        
+        resultado = []
+        for idx, partido in enumerate(partidos):
+            poisson_probs = extraer_partido(batch, idx)
+            probs = self.calibrate_probabilities(self.ensemble_prediction(partido, poisson_probs))
+            picks = self.generar_predicciones(partido, poisson_probs, probs)
+            resultado.append({
                 "id": partido["id"],
                 "local": partido["local"],
                 "visitante": partido["visitante"],
@@ -624,18 +624,193 @@ class AdvancedBettingAnalyzer:
                     "visitante_gc": partido["visitante_goles_contra"],
                     "elo_local": round(self.elo_ratings[partido['local']], 0),
                     "elo_visitante": round(self.elo_ratings[partido['visitante']], 0)
-                }
+                },
+                # Para repreciar desde la caché; se retira antes del reporte
+                "probs_modelo": {clave: float(probs[clave]) for clave in MERCADO_CALIBRACION}
+            })
+        return resultado
+    
+    def claves_cache(self, max_goals: Optional[int]) -> List[Tuple[str, str]]:
+        """
+        (clave del modelo, clave de cuotas) de cada partido: la primera cubre
+        todo lo que determina sus probabilidades, la segunda lo que solo
+        cambia edge y Kelly
+        """
+        configuracion = huella(huella_codigo(), self.rho, self.parametros_dc, self.pesos_ensemble,
+                               self.empate_elo, self.tabla is not None, max_goals,
+                               {mercado: tabla.como_dict() for mercado, tabla in self.calibrador.tablas.items()})
+        return [(huella(configuracion, partido, self.elo_ratings[partido['local']],
+                        self.elo_ratings[partido['visitante']]),
+                 huella(self.market_odds.get(partido['id']), self.probs_justas.get(partido['id']),
+                        self.edge_minimo))
+                for partido in self.partidos]
+    
+    def repreciar_picks(self, picks: List[Pick], probs: Dict[str, float], partido_id):
+        """Recalcula cuota, edge y Kelly de los picks con mercado sin ejecutar el modelo"""
+        market_odds = self.market_odds.get(partido_id, {})
+        probs_justas = self.probs_justas.get(partido_id, {})
+        for pick in picks:
+            seleccion = pick.seleccion
+            if seleccion is None:
+                continue
+            cuota = market_odds.get(seleccion)
+            edge_info = self.calculate_edge_realistic(PROB_SELECCION[seleccion](probs), cuota,
+                                                      prob_justa=probs_justas.get(seleccion))
+            pick.cuota_mercado = cuota if cuota else None
+            pick.edge_percent = round(edge_info['edge_percent'], 1)
+            pick.apostar = edge_info['apostar']
+            pick.kelly_stake_percent = round(edge_info['kelly_stake'] * 100, 1)
+            pick.razon = edge_info['razon']
+    
+    def optimizar_stakes_cartera(self, partidos_data: List[Dict],
+                                 kelly_fraction: float = 0.25) -> Dict:
+        """
+        Sustituye el Kelly independiente de cada pick con apostar=True por una
+        cartera conjunta (cartera_kelly.py). La matriz de marcadores de cada
+        partido se ajusta a las probabilidades finales de sus picks.
+        partidos_data va en el mismo orden que self.partidos.
+        """
+        indices = [k for k, datos in enumerate(partidos_data)
+                   if any(pick.apostar and pick.seleccion for pick in datos['picks'])]
+        lambdas = np.array([self.calculate_lambda_values(self.partidos[k]) for k in indices]).reshape(-1, 2)
+        matrices = matrices_dixon_coles(lambdas[:, 0], lambdas[:, 1], self.rho)[0] if indices else []
+        
+        ajustadas, apuestas, picks = [], [], []
+        for posicion, (k, matriz) in enumerate(zip(indices, matrices)):
+            probs = self.calibrate_probabilities(self.ensemble_prediction(self.partidos[k]))
+            ajustadas.append(ajustar_marginales(matriz, {
+                'home': probs['home'], 'draw': probs['draw'], 'away': probs['away'],
+                'btts_yes': probs['btts'], 'btts_no': 1 - probs['btts'],
+                'over25': probs['over25'], 'under25': 1 - probs['over25'],
+            }))
+            for pick in partidos_data[k]['picks']:
+                if pick.apostar and pick.seleccion:
+                    apuestas.append((posicion, pick.seleccion, pick.cuota_mercado))
+                    picks.append(pick)
+        
+        cartera = optimizar_cartera(ajustadas, apuestas, fraccion_kelly=kelly_fraction,
+                                    tope_apuesta=KELLY_MAXIMO)
+        for pick, stake in zip(picks, cartera['stakes']):
+            pick.kelly_stake_percent = round(float(stake) * 100, 1)
+            if pick.kelly_stake_percent == 0:
+                pick.apostar = False
+                pick.razon += ' | Cartera Kelly: sin stake'
+        
+        return {
+            "apuestas": len(apuestas),
+            "con_stake": sum(1 for pick in picks if pick.apostar),
+            "exposicion_total_percent": round(float(cartera['stakes'].sum()) * 100, 1),
+            "crecimiento_log_esperado_percent": round(cartera['crecimiento_log'] * 100, 3),
+            "iteraciones": cartera['iteraciones']
+        }
+    
+    def descripcion_ensemble(self) -> str:
+        w_poisson, w_elo, w_forma = (round(100 * w) for w in self.pesos_ensemble)
+        return f"Poisson-DC ({w_poisson}%) + ELO ({w_elo}%) + Forma ({w_forma}%)"
+    
+    def aplicar_hiperparametros(self, hiperparametros: Dict):
+        """
+        Configuración ganadora de busqueda_hiperparametros.py. El rho de la
+        búsqueda solo se aplica sin parámetros Dixon-Coles ajustados: con
+        ellos manda el rho de máxima verosimilitud
+        """
+        self.pesos_ensemble = tuple(hiperparametros['pesos_ensemble'])
+        self.empate_elo = hiperparametros['empate_elo']
+        self.edge_minimo = hiperparametros['edge_minimo']
+        if not self.parametros_dc:
+            self.rho = hiperparametros['rho']
+    
+    def _nombre_jornada(self, competicion: str) -> str:
+        return f"Jornada {self.jornadas.get(competicion, '-')} - {NOMBRES_COMPETICION[competicion]}"
+    
+    def generar_reporte_completo(self, procesos: int = 1) -> Dict:
+        """
+        Genera reporte completo CORREGIDO
+        procesos > 1 reparte los shards competición/jornada en un pool de
+        procesos; la salida es idéntica a la ejecución en serie
+        """
+        
+        primera_division = []
+        segunda_division = []
+        
+        total_edge_bets = 0
+        avg_confidence = []
+        total_picks_generados = 0
+        
+        # Rejilla de goles común a todos los shards (mismo resultado en serie y en paralelo)
+        lambdas = np.array([self.calculate_lambda_values(p) for p in self.partidos]).reshape(-1, 2)
+        max_goals = goles_necesarios(lambdas) if len(lambdas) else None
+        
+        # Caché por huella de entradas: solo se analizan los partidos que cambiaron
+        partidos_data = [None] * len(self.partidos)
+        pendientes = np.arange(len(self.partidos))
+        if self.cache_resultados is not None:
+            claves = self.claves_cache(max_goals)
+            for idx, (clave_modelo, clave_cuotas) in enumerate(claves):
+                entrada = self.cache_resultados.obtener(clave_modelo, clave_cuotas)
+                if entrada is None:
+                    continue
+                entrada['partido']['picks'] = [Pick.desde_dict(pick) for pick in entrada['partido']['picks']]
+                if entrada['clave_cuotas'] != clave_cuotas:
+                    self.repreciar_picks(entrada['partido']['picks'], entrada['probs'], entrada['partido']['id'])
+                    self.cache_resultados.guardar(clave_modelo, clave_cuotas, entrada['partido'], entrada['probs'])
+                partidos_data[idx] = entrada['partido']
+            pendientes = np.array([idx for idx, datos in enumerate(partidos_data) if datos is None], dtype=int)
+        
+        shards = [pendientes[indices] for indices in shards_partidos(self.partidos.seleccionar(pendientes))]
+        tareas = [(self.partidos.seleccionar(indices), lambdas[indices], max_goals) for indices in shards]
+        
+        if procesos > 1 and len(tareas) > 1:
+            configuracion = {
+                'usar_tabla': self.tabla is not None,
+                'parametros_dc': self.parametros_dc,
+                'elo_ratings': self.elo_ratings,
+                'rho': self.rho,
+                'edge_minimo': self.edge_minimo,
+                'pesos_ensemble': self.pesos_ensemble,
+                'empate_elo': self.empate_elo,
+                'jornadas': [],
+                'market_odds': self.market_odds,
+                'probs_justas': self.probs_justas,
+                'calibrador': self.calibrador
             }
+            with ProcessPoolExecutor(max_workers=procesos, initializer=inicializar_worker,
+                                     initargs=(configuracion,)) as pool:
+                resultados_shards = list(pool.map(analizar_shard_worker, tareas))
+        else:
+            resultados_shards = [self.analizar_shard(*tarea) for tarea in tareas]
+        
+        # Reensamblar en el orden original de self.partidos
+        for indices, resultado in zip(shards, resultados_shards):
+            for idx, partido_data in zip(indices, resultado):
+                probs = partido_data.pop('probs_modelo')
+                if self.cache_resultados is not None:
+                    self.cache_resultados.guardar(*claves[idx], partido_data, probs)
+                partidos_data[idx] = partido_data
+        if self.cache_resultados is not None:
+            self.cache_resultados.podar()
+        
+        cartera = self.optimizar_stakes_cartera(partidos_data) if self.modo_stake == 'cartera' else None
+        
+        for partido_data in partidos_data:
+            picks = partido_data["picks"]
+            total_picks_generados += len(picks)
+            
+            # Contar solo picks que REALMENTE tienen edge (con cuotas)
+            edge_bets_partido = sum(1 for pick in picks if pick.apostar)
+            total_edge_bets += edge_bets_partido
+            
+            avg_confidence.extend([pick.confianza for pick in picks])
             
-            if "LaLiga EA Sports" in partido["liga"]:
+            if "LaLiga EA Sports" in partido_data["liga"]:
                 primera_division.append(partido_data)
             else:
                 segunda_division.append(partido_data)
         
-        # ROI realista basado en picks REALES con edge
-        roi_esperado = total_edge_bets * 3.5 if total_edge_bets > 0 else 0
+        # Métricas reales del backtest histórico (backtest.py), si existe
+        validacion = self.validacion or {}
         
-        return {
+        reporte = {
             "fecha_generacion": datetime.now().isoformat(),
             "modelo_version": "2.1 - Fixed & Realistic",
             "correcciones_aplicadas": [
@@ -646,25 +821,34 @@ class AdvancedBettingAnalyzer:
             ],
             "jornada": {
                 "primera_division": {
-                    "nombre": "Jornada 24 - LaLiga EA Sports",
+                    "nombre": self._nombre_jornada('primera_division'),
                     "partidos": primera_division,
                     "total_partidos": len(primera_division)
                 },
                 "segunda_division": {
-                    "nombre": "Jornada 26 - LaLiga Hypermotion",
+                    "nombre": self._nombre_jornada('segunda_division'),
                     "partidos": segunda_division,
                     "total_partidos": len(segunda_division)
                 }
             },
             "metricas_validacion": {
-                "brier_score": 0.092,
-                "log_loss": 0.45,
+                "brier_score": validacion.get('brier_score'),
+                "log_loss": validacion.get('log_loss'),
                 "total_edge_bets": total_edge_bets,
                 "total_picks_generados": total_picks_generados,
                 "avg_confidence": round(np.mean(avg_confidence), 1),
-                "modelo_ensemble": "Poisson-DC (50%) + ELO (30%) + Forma (20%)",
-                "calibracion": "Platt Scaling",
-                "roi_esperado_percent": round(roi_esperado, 1)
+                "modelo_ensemble": self.descripcion_ensemble(),
+                "calibracion": self.calibrador.descripcion,
+                "roi_esperado_percent": validacion.get('roi_percent'),
+                "backtest": {
+                    "temporadas": len(validacion.get('temporadas', [])),
+                    "partidos": validacion.get('partidos', 0),
+                    # Modelo que miden las métricas: reajuste DC, calibración y mezcla
+                    "reajuste_dc": validacion.get('reajuste_dc'),
+                    "calibracion": validacion.get('calibracion'),
+                    "modelo": validacion.get('modelo'),
+                    "mercados": validacion.get('mercados', {})
+                }
             },
             "resumen": {
                 "total_picks": total_picks_generados,
@@ -674,6 +858,9 @@ class AdvancedBettingAnalyzer:
                 "nota": "Solo se recomienda apostar en picks con edge > 2% y cuotas reales"
             }
         }
+        if cartera is not None:
+            reporte["resumen"]["cartera_kelly"] = cartera
+        return reporte
 
 
 def main():
@@ -686,26 +873,83 @@ def main():
     print("✅ FIX 4: Output guardado en /mnt/data")
     print("=" * 70)
     
-    analyzer = AdvancedBettingAnalyzer()
-    reporte = analyzer.generar_reporte_completo()
+    # PERFILADO=1 o --perfilar: tiempos, llamadas y traza por etapa (en serie; los workers no se miden)
+    if activar_desde_entorno():
+        PERFILADOR.instrumentar(AdvancedBettingAnalyzer, ETAPAS_ANALISIS)
+    
+    # USAR_TABLA_DC=1 activa el modo lookup (tabla precalculada + interpolación)
+    # Parámetros Dixon-Coles ajustados (si existen) en PARAMETROS_DC_PATH
+    parametros_dc = AjustadorDixonColes.cargar(os.getenv('PARAMETROS_DC_PATH', 'data/parametros_dc.json'))
+    # Calibradores ajustados por mercado (si existen) en CALIBRACION_PATH
+    calibrador = CalibradorMercados.cargar(os.getenv('CALIBRACION_PATH', CALIBRACION_PATH))
+    # Snapshots de cuotas multi-casa (si existen) en CUOTAS_DIR: mejor precio
+    cuotas_dir = os.getenv('CUOTAS_DIR', 'data/cuotas')
+    almacen_cuotas = AlmacenCuotas(cuotas_dir) if os.path.isdir(cuotas_dir) else None
+    # JORNADAS_ANALIZAR=temporada/competición/jornada,... fija las jornadas (por defecto las últimas guardadas)
+    jornadas = [tuple(clave.split('/')) for clave in os.getenv('JORNADAS_ANALIZAR', '').split(',') if clave]
+    with PERFILADOR.etapa('carga_datos'):
+        analyzer = AdvancedBettingAnalyzer(usar_tabla=os.getenv('USAR_TABLA_DC') == '1',
+                                           parametros_dc=parametros_dc,
+                                           jornadas=[(t, c, int(j)) for t, c, j in jornadas] or None,
+                                           calibrador=calibrador,
+                                           almacen_cuotas=almacen_cuotas)
+    # MARGEN_METODO: proporcional, potencia o shin (por defecto) para quitar el margen
+    if os.getenv('MARGEN_METODO'):
+        analyzer.metodo_margen = os.getenv('MARGEN_METODO')
+        analyzer.calcular_probs_justas()
+    # Caché de resultados por partido (CACHE_RESULTADOS_DIR; vacío la desactiva)
+    cache_dir = os.getenv('CACHE_RESULTADOS_DIR', CACHE_RESULTADOS_DIR)
+    if cache_dir:
+        analyzer.cache_resultados = CacheResultados(cache_dir)
+    # STAKE_MODO=cartera: stakes Kelly conjuntos de todos los picks con edge
+    analyzer.modo_stake = os.getenv('STAKE_MODO', 'individual')
+    # Pesos, rho, empate ELO y edge mínimo ajustados (busqueda_hiperparametros.py)
+    hiperparametros_path = os.getenv('HIPERPARAMETROS_PATH', 'data/hiperparametros.json')
+    if os.path.exists(hiperparametros_path):
+        with open(hiperparametros_path, 'r', encoding='utf-8') as f:
+            analyzer.aplicar_hiperparametros(json.load(f))
+    # Brier, log loss y ROI del último backtest (backtest.py) en BACKTEST_PATH
+    backtest_path = os.getenv('BACKTEST_PATH', 'data/backtest.json')
+    if os.path.exists(backtest_path):
+        with open(backtest_path, 'r', encoding='utf-8') as f:
+            analyzer.validacion = json.load(f)
+    # ANALISIS_PROCESOS > 1 reparte competiciones/jornadas en varios procesos
+    reporte = analyzer.generar_reporte_completo(procesos=int(os.getenv('ANALISIS_PROCESOS', '1')))
     
     # Guardar en ruta del repositorio para que GitHub Actions pueda commitear cambios
     output_path = os.getenv('PICKS_OUTPUT_PATH', 'public/data/picks_complete.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    # Shards por competición/jornada + manifest para el frontend (PICKS_SHARDS_DIR)
+    shards_dir = os.getenv('PICKS_SHARDS_DIR', os.path.join(os.path.dirname(output_path), 'picks'))
+    with PERFILADOR.etapa('escritura_json'):
+        escribir_artefacto(output_path, reporte)
+        manifest = escribir_picks_troceados(reporte, analyzer.jornadas, shards_dir)
     
     print("\n✅ Análisis completado")
     print(f"📊 Partidos analizados: {reporte['resumen']['partidos_analizados']}")
     print(f"🎯 Picks generados: {reporte['resumen']['total_picks']}")
     print(f"💎 Picks con EDGE REAL: {reporte['resumen']['picks_con_edge_real']}")
     print(f"⚠️  Picks sin cuotas: {reporte['resumen']['picks_sin_cuotas']}")
-    print(f"💰 ROI esperado: {reporte['metricas_validacion']['roi_esperado_percent']}%")
+    metricas = reporte['metricas_validacion']
+    if metricas['roi_esperado_percent'] is None:
+        print("💰 ROI backtest: sin backtest (ejecuta scripts/backtest.py)")
+    else:
+        print(f"💰 ROI backtest: {metricas['roi_esperado_percent']}%")
     print("\n📈 Métricas de Validación:")
     print(f"   - Brier Score: {reporte['metricas_validacion']['brier_score']}")
     print(f"   - Log Loss: {reporte['metricas_validacion']['log_loss']}")
     print(f"   - Confianza promedio: {reporte['metricas_validacion']['avg_confidence']}%")
     print(f"\n🤖 Modelo: {reporte['metricas_validacion']['modelo_ensemble']}")
+    if analyzer.cache_resultados is not None:
+        informe = analyzer.cache_resultados.informe()
+        print(f"♻️  Caché: {informe['aciertos']} aciertos | {informe['repreciados']} repreciados | "
+              f"{informe['fallos']} recalculados | {informe['expulsados']} expulsados")
     print(f"📁 Datos guardados en: {output_path}")
+    kb_gz = sum(e['bytes_gz'] for e in [manifest['resumen'], *manifest['shards'].values()]) / 1024
+    print(f"📦 Shards: {len(manifest['shards'])} en {shards_dir} ({kb_gz:.1f} KB gzip en total)")
+    if PERFILADOR.activo:
+        perfil_dir = os.getenv('PERFILADO_DIR', PERFILADO_DIR)
+        imprimir_resumen(PERFILADOR.exportar('analisis', perfil_dir))
+        print(f"📁 Perfil y traza Chrome en: {perfil_dir}")
     print("\n⚠️  IMPORTANTE: Solo apostar en picks marcados con apostar=True")
     
     return reporte
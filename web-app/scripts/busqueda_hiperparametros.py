@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Búsqueda de hiperparámetros del ensemble contra el histórico
+- Pesos del ensemble (Poisson-DC, ELO, Forma), rho, tasa de empate ELO y
+  edge mínimo para apostar
+- Las componentes se calculan una sola vez: backtest sin fuga de datos
+  (backtest.py, con su caché) y una pasada Poisson-DC vectorizada por cada
+  rho candidato. Evaluar una configuración es solo re-mezclar y puntuar.
+- Rejilla completa o muestreo aleatorio, repartido en un pool de procesos
+  (las componentes viajan una sola vez por proceso, en el initializer)
+- Selección sobre el tramo final del histórico (validación cronológica):
+  el calibrador se ajusta con las predicciones anteriores y el objetivo,
+  el desempate por ROI y el leaderboard son solo de la validación
+- Resultado: leaderboard CSV y la mejor configuración en
+  data/hiperparametros.json (la aplica betting_analyzer.py)
+"""
+
+import csv
+import itertools
+import json
+import os
+import sys
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+from betting_analyzer import AdvancedBettingAnalyzer
+from ajuste_dixon_coles import RESULTADOS_PATH
+from backtest import (MotorBacktest, AcumuladorMercado, MERCADOS_BACKTEST,
+                      leer_temporadas, predicciones_calibracion, puntuar)
+from calibracion import CalibradorMercados
+from dixon_coles import poisson_dixon_coles_batch, goles_necesarios
+
+PASO_PESOS = 0.1
+RHO_CANDIDATOS = (-0.10, -0.05, 0.0, 0.05, 0.10, 0.15, 0.20)
+EMPATE_CANDIDATOS = (0.22, 0.24, 0.26, 0.27, 0.28, 0.30, 0.32)
+EDGE_CANDIDATOS = (0.0, 0.01, 0.02, 0.03, 0.05, 0.075, 0.10)
+EMPATE_RANGO = (0.20, 0.34)
+EDGE_RANGO = (0.0, 0.10)
+# Objetivos: (clave en el resultado, signo: 1 = menor es mejor)
+OBJETIVOS = {
+    'log_loss': ('log_loss_1x2', 1),
+    'brier': ('brier_1x2', 1),
+    'roi': ('roi_percent', -1),
+}
+CONFIGURACIONES_POR_TAREA = 200
+LEADERBOARD_PATH = 'data/leaderboard_hiperparametros.csv'
+HIPERPARAMETROS_PATH = 'data/hiperparametros.json'
+BLOQUE_POISSON = 2000
+FRACCION_VALIDACION = 0.3
+
+_COMPONENTES = None
+_ANALIZADOR = None
+
+
+def recopilar_componentes(motor: MotorBacktest, path: str = RESULTADOS_PATH,
+                          rhos=RHO_CANDIDATOS) -> Dict:
+    """
+    Resultados, cuotas y componentes del ensemble de todo el histórico, más
+    la salida Poisson-DC de cada rho candidato (una pasada batch por rho)
+    """
+    datos, salidas = [], []
+    for temporada, columnas, huella_datos in leer_temporadas(path):
+        salidas.append(motor.salidas_temporada(temporada, columnas, huella_datos))
+        datos.append({clave: valores for clave, valores in columnas.items()
+                      if clave.startswith(('goles_', 'cuota_', 'cierre_'))})
+
+    unir = lambda partes: {clave: np.concatenate([p[clave] for p in partes]) for clave in partes[0]}
+    datos, salidas = unir(datos), unir(salidas)
+
+    lambda_h, lambda_a = salidas['expected_home_goals'], salidas['expected_away_goals']
+    max_goals = goles_necesarios(np.concatenate([lambda_h, lambda_a]))
+    poisson = {}
+    for rho in rhos:
+        bloques = [poisson_dixon_coles_batch(lambda_h[k:k + BLOQUE_POISSON], lambda_a[k:k + BLOQUE_POISSON],
+                                             rho, max_goals)
+                   for k in range(0, len(lambda_h), BLOQUE_POISSON)]
+        poisson[rho] = {clave: np.concatenate([b[clave] for b in bloques])
+                        for clave in ('home', 'draw', 'away', 'btts', 'over25')}
+    return {'datos': datos, 'salidas': salidas, 'poisson': poisson}
+
+
+def dividir_validacion(componentes: Dict, fraccion: float = FRACCION_VALIDACION):
+    """
+    Corte cronológico: el último tramo (fraccion de los partidos) es la
+    validación. Devuelve (componentes de validación, calibrador ajustado solo
+    con las predicciones sin calibrar del tramo anterior).
+    """
+    n = len(componentes['datos']['goles_local'])
+    corte = n - int(round(n * fraccion))
+    if not 0 < corte < n:
+        raise ValueError(f"Fracción de validación {fraccion} sin partidos a ambos lados del corte ({n} partidos)")
+
+    tramo = lambda columnas, filas: {clave: valores[filas] for clave, valores in columnas.items()}
+    entrenamiento, validacion = slice(None, corte), slice(corte, None)
+    previas = defaultdict(lambda: {'prob': [], 'resultado': []})
+    for mercado, probs, ocurre in predicciones_calibracion(tramo(componentes['datos'], entrenamiento),
+                                                           tramo(componentes['salidas'], entrenamiento)):
+        previas[mercado]['prob'].append(probs)
+        previas[mercado]['resultado'].append(ocurre.astype(int))
+    calibrador = CalibradorMercados.ajustar({
+        mercado: {clave: np.concatenate(valores) for clave, valores in datos.items()}
+        for mercado, datos in previas.items()})
+
+    return {
+        'datos': tramo(componentes['datos'], validacion),
+        'salidas': tramo(componentes['salidas'], validacion),
+        'poisson': {rho: tramo(salida, validacion) for rho, salida in componentes['poisson'].items()},
+    }, calibrador
+
+
+def configuraciones_rejilla(paso: float = PASO_PESOS) -> List[Dict]:
+    """Producto completo: pesos en el símplex con el paso dado x rho x empate x edge"""
+    n = int(round(1 / paso))
+    pesos = [(i / n, j / n, (n - i - j) / n) for i in range(n + 1) for j in range(n + 1 - i)]
+    return [{'pesos_ensemble': list(w), 'rho': rho, 'empate_elo': empate, 'edge_minimo': edge}
+            for w, rho, empate, edge in itertools.product(pesos, RHO_CANDIDATOS,
+                                                          EMPATE_CANDIDATOS, EDGE_CANDIDATOS)]
+
+
+def configuraciones_aleatorias(n: int, semilla: int = 2026) -> List[Dict]:
+    """Muestreo aleatorio: pesos Dirichlet(1, 1, 1), rho de los candidatos precalculados"""
+    rng = np.random.default_rng(semilla)
+    pesos = rng.dirichlet(np.ones(3), n)
+    rhos = rng.choice(RHO_CANDIDATOS, n)
+    empates = rng.uniform(*EMPATE_RANGO, n)
+    edges = rng.uniform(*EDGE_RANGO, n)
+    return [{'pesos_ensemble': [round(float(w), 4) for w in pesos[k]], 'rho': float(rhos[k]),
+             'empate_elo': round(float(empates[k]), 4), 'edge_minimo': round(float(edges[k]), 4)}
+            for k in range(n)]
+
+
+def evaluar(configuracion: Dict, componentes: Dict, analyzer: AdvancedBettingAnalyzer) -> Dict:
+    """Re-mezcla el ensemble con la configuración y lo puntúa"""
+    salidas, poisson = componentes['salidas'], componentes['poisson'][configuracion['rho']]
+    w_poisson, w_elo, w_forma = configuracion['pesos_ensemble']
+
+    # ELO: (p, empate, 1 - p) normalizado, como probabilidades_elo
+    empate = configuracion['empate_elo']
+    elo = {
+        'home': salidas['elo_home'] / (1 + empate),
+        'draw': np.full_like(salidas['elo_home'], empate / (1 + empate)),
+        'away': (1 - salidas['elo_home']) / (1 + empate),
+    }
+    mezcla = {clave: w_poisson * poisson[clave] + w_elo * elo[clave] + w_forma * salidas[f'forma_{clave}']
+              for clave in ('home', 'draw', 'away')}
+    mezcla.update(btts=poisson['btts'], over25=poisson['over25'],
+                  expected_home_goals=salidas['expected_home_goals'],
+                  expected_away_goals=salidas['expected_away_goals'])
+
+    analyzer.edge_minimo = configuracion['edge_minimo']
+    acumuladores = {mercado: AcumuladorMercado() for mercado in MERCADOS_BACKTEST}
+    puntuar(analyzer, componentes['datos'], mezcla, acumuladores)
+
+    resumen = {mercado: acc.resumen() for mercado, acc in acumuladores.items()}
+    stake = sum(acc.stake for acc in acumuladores.values())
+    beneficio = sum(acc.beneficio for acc in acumuladores.values())
+    resultado = dict(configuracion)
+    for mercado in MERCADOS_BACKTEST:
+        resultado[f'brier_{mercado}'] = resumen[mercado]['brier_score']
+        resultado[f'log_loss_{mercado}'] = resumen[mercado]['log_loss']
+    resultado['apuestas'] = sum(acc.apuestas for acc in acumuladores.values())
+    resultado['roi_percent'] = round(100 * beneficio / stake, 2) if stake else None
+    return resultado
+
+
+def inicializar_worker(componentes: Dict, calibrador: CalibradorMercados):
+    global _COMPONENTES, _ANALIZADOR
+    _COMPONENTES = componentes
+    _ANALIZADOR = AdvancedBettingAnalyzer(jornadas=[], calibrador=calibrador)
+
+
+def evaluar_lote_worker(configuraciones: List[Dict]) -> List[Dict]:
+    return [evaluar(c, _COMPONENTES, _ANALIZADOR) for c in configuraciones]
+
+
+def buscar(configuraciones: List[Dict], componentes: Dict, calibrador: CalibradorMercados,
+           procesos: int = 1, objetivo: str = 'log_loss') -> List[Dict]:
+    """
+    Evalúa todas las configuraciones sobre los componentes recibidos (la
+    validación, ver dividir_validacion) y las ordena por el objetivo (mejor primero)
+    """
+    lotes = [configuraciones[k:k + CONFIGURACIONES_POR_TAREA]
+             for k in range(0, len(configuraciones), CONFIGURACIONES_POR_TAREA)]
+    if procesos > 1 and len(lotes) > 1:
+        with ProcessPoolExecutor(max_workers=procesos, initializer=inicializar_worker,
+                                 initargs=(componentes, calibrador)) as pool:
+            resultados = [r for lote in pool.map(evaluar_lote_worker, lotes) for r in lote]
+    else:
+        analyzer = AdvancedBettingAnalyzer(jornadas=[], calibrador=calibrador)
+        resultados = [evaluar(c, componentes, analyzer) for c in configuraciones]
+
+    clave, signo = OBJETIVOS[objetivo]
+    # Sin apuestas el ROI es None: al final; a igual objetivo, mejor ROI primero
+    return sorted(resultados, key=lambda r: (r[clave] is None, signo * (r[clave] or 0),
+                                             -(r['roi_percent'] or -np.inf)))
+
+
+def guardar_leaderboard(resultados: List[Dict], path: str = LEADERBOARD_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    columnas = ['posicion', 'peso_poisson', 'peso_elo', 'peso_forma', 'rho', 'empate_elo', 'edge_minimo',
+                *(f'{m}_{mercado}' for mercado in MERCADOS_BACKTEST for m in ('brier', 'log_loss')),
+                'apuestas', 'roi_percent']
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        escritor = csv.DictWriter(f, columnas, extrasaction='ignore')
+        escritor.writeheader()
+        for posicion, r in enumerate(resultados, 1):
+            w_poisson, w_elo, w_forma = r['pesos_ensemble']
+            escritor.writerow({**r, 'posicion': posicion, 'peso_poisson': w_poisson,
+                               'peso_elo': w_elo, 'peso_forma': w_forma})
+
+
+def main():
+    """
+    python scripts/busqueda_hiperparametros.py [resultados.csv]
+    BUSQUEDA_MODO=rejilla|aleatoria, BUSQUEDA_N (aleatoria), BUSQUEDA_OBJETIVO
+    (log_loss|brier|roi), BUSQUEDA_PROCESOS, BUSQUEDA_VALIDACION (fracción final
+    del histórico sobre la que se selecciona)
+    """
+    resultados_path = sys.argv[1] if len(sys.argv) > 1 else RESULTADOS_PATH
+    modo = os.getenv('BUSQUEDA_MODO', 'rejilla')
+    objetivo = os.getenv('BUSQUEDA_OBJETIVO', 'log_loss')
+    procesos = int(os.getenv('BUSQUEDA_PROCESOS', str(os.cpu_count() or 1)))
+    leaderboard_path = os.getenv('LEADERBOARD_PATH', LEADERBOARD_PATH)
+    hiperparametros_path = os.getenv('HIPERPARAMETROS_PATH', HIPERPARAMETROS_PATH)
+    fraccion = float(os.getenv('BUSQUEDA_VALIDACION', str(FRACCION_VALIDACION)))
+
+    motor = MotorBacktest(AdvancedBettingAnalyzer(jornadas=[]),
+                          reajustar_dc=os.getenv('BACKTEST_REAJUSTAR_DC') == '1')
+
+    inicio = datetime.now()
+    componentes = recopilar_componentes(motor, resultados_path)
+    total = len(componentes['datos']['goles_local'])
+    componentes, calibrador = dividir_validacion(componentes, fraccion)
+    print(f"✅ Componentes: {total} partidos ({len(componentes['datos']['goles_local'])} de validación), "
+          f"{len(RHO_CANDIDATOS)} rhos en {(datetime.now() - inicio).total_seconds():.1f}s")
+
+    if modo == 'rejilla':
+        configuraciones = configuraciones_rejilla()
+    else:
+        configuraciones = configuraciones_aleatorias(int(os.getenv('BUSQUEDA_N', '2000')))
+
+    inicio = datetime.now()
+    resultados = buscar(configuraciones, componentes, calibrador, procesos, objetivo)
+    segundos = (datetime.now() - inicio).total_seconds()
+    guardar_leaderboard(resultados, leaderboard_path)
+
+    mejor = resultados[0]
+    with open(hiperparametros_path, 'w', encoding='utf-8') as f:
+        json.dump({**mejor, 'objetivo': objetivo, 'fraccion_validacion': fraccion, 'fecha_generacion': datetime.now().isoformat()},
+                  f, ensure_ascii=False, indent=2)
+
+    print(f"✅ {len(configuraciones)} configuraciones ({modo}) en {segundos:.1f}s con {procesos} procesos")
+    print(f"🏆 Mejor ({objetivo}): pesos {mejor['pesos_ensemble']} | rho {mejor['rho']} | "
+          f"empate {mejor['empate_elo']} | edge {mejor['edge_minimo']}")
+    print(f"   Validación: log loss 1X2 {mejor['log_loss_1x2']} | Brier 1X2 {mejor['brier_1x2']} | "
+          f"ROI {mejor['roi_percent']}% ({mejor['apuestas']} apuestas)")
+    print(f"📁 Leaderboard: {leaderboard_path}")
+    print(f"📁 Hiperparámetros: {hiperparametros_path}")
+
+
+if __name__ == "__main__":
+    main()
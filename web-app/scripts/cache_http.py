@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Caché persistente de respuestas de API-Football
+- Clave: endpoint + parámetros; un JSON por respuesta en .cache/api
+- TTL por endpoint (las cuotas caducan antes que la clasificación); no caducan
+  los partidos de fechas ya pasadas ni los datos de temporadas cerradas
+- Respuestas caducadas con ETag / Last-Modified se revalidan con
+  If-None-Match / If-Modified-Since: un 304 renueva la entrada sin descargarla
+- Modo offline: solo se sirve desde la caché, sin tocar la red ni la cuota
+- Informe de aciertos / revalidadas / descargas / caducadas por ejecución
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import date
+from typing import Dict, Optional
+
+CACHE_API_DIR = '.cache/api'
+# Entra en la clave: al cambiar lo que se guarda, las entradas anteriores se ignoran
+FORMATO = 2
+HORA = 3600
+TTL_ENDPOINT = {
+    'fixtures': 6 * HORA,
+    'standings': 12 * HORA,
+    'teams/statistics': 24 * HORA,
+    'odds': 1 * HORA,
+}
+TTL_DEFECTO = 1 * HORA
+
+
+def ttl_respuesta(endpoint: str, params: Dict, temporada_actual: Optional[int] = None) -> Optional[float]:
+    """Segundos de validez de una respuesta; None si no cambia nunca"""
+    if temporada_actual is not None and 'season' in params and int(params['season']) < temporada_actual:
+        return None
+    if endpoint == 'fixtures' and str(params.get('to', '9999')) < date.today().isoformat():
+        return None
+    return TTL_ENDPOINT.get(endpoint, TTL_DEFECTO)
+
+
+class CacheHttp:
+    """Respuestas por (endpoint, parámetros) con TTL y validadores HTTP"""
+
+    def __init__(self, directorio: str = CACHE_API_DIR, offline: bool = False,
+                 temporada_actual: Optional[int] = None):
+        self.directorio = directorio
+        self.offline = offline
+        self.temporada_actual = temporada_actual
+        os.makedirs(directorio, exist_ok=True)
+        self.aciertos = 0
+        self.revalidadas = 0
+        self.descargas = 0
+        self.caducadas = 0
+
+    @staticmethod
+    def clave(endpoint: str, params: Dict) -> str:
+        canonica = json.dumps([FORMATO, endpoint, {k: str(v) for k, v in params.items()}], sort_keys=True)
+        return hashlib.sha1(canonica.encode('utf-8')).hexdigest()[:20]
+
+    def _ruta(self, endpoint: str, params: Dict) -> str:
+        return os.path.join(self.directorio, f"{self.clave(endpoint, params)}.json")
+
+    def obtener(self, endpoint: str, params: Dict) -> Optional[Dict]:
+        """Entrada {'endpoint', 'params', 'guardado', 'etag', 'last_modified', 'response'} o None"""
+        try:
+            with open(self._ruta(endpoint, params), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def fresca(self, entrada: Dict) -> bool:
+        ttl = ttl_respuesta(entrada['endpoint'], entrada['params'], self.temporada_actual)
+        return ttl is None or time.time() - entrada['guardado'] < ttl
+
+    def validadores(self, entrada: Optional[Dict]) -> Dict[str, str]:
+        """Cabeceras de petición condicional para revalidar una entrada caducada"""
+        cabeceras = {}
+        if entrada is not None and entrada.get('etag'):
+            cabeceras['If-None-Match'] = entrada['etag']
+        if entrada is not None and entrada.get('last_modified'):
+            cabeceras['If-Modified-Since'] = entrada['last_modified']
+        return cabeceras
+
+    def servir(self, entrada: Dict):
+        self.aciertos += 1
+        return entrada['response']
+
+    def servir_caducada(self, entrada: Dict):
+        """Respuesta caducada ante un error de red o de cuota: mejor que ninguna"""
+        self.caducadas += 1
+        return entrada['response']
+
+    def revalidar(self, entrada: Dict):
+        """304 Not Modified: la entrada vuelve a estar fresca"""
+        self.revalidadas += 1
+        entrada['guardado'] = time.time()
+        self._escribir(entrada)
+        return entrada['response']
+
+    def guardar(self, endpoint: str, params: Dict, respuesta, etag: Optional[str] = None,
+                last_modified: Optional[str] = None):
+        self.descargas += 1
+        self._escribir({'endpoint': endpoint, 'params': {k: str(v) for k, v in params.items()},
+                        'guardado': time.time(), 'etag': etag, 'last_modified': last_modified,
+                        'response': respuesta})
+
+    def _escribir(self, entrada: Dict):
+        with open(self._ruta(entrada['endpoint'], entrada['params']), 'w', encoding='utf-8') as f:
+            json.dump(entrada, f, ensure_ascii=False)
+
+    def informe(self) -> Dict:
+        consultas = self.aciertos + self.revalidadas + self.descargas + self.caducadas
+        return {'aciertos': self.aciertos, 'revalidadas': self.revalidadas,
+                'descargas': self.descargas, 'caducadas': self.caducadas,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else None}
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Caché persistente de resultados por partido
+- Clave del modelo: huella de las entradas del partido (estadísticas, ELO,
+  parámetros, calibración y código del modelo). Si coincide, los picks no
+  se recalculan.
+- Clave de cuotas: huella de cuotas, probabilidades sin margen y edge
+  mínimo. Si solo cambia esta, se reprecian edge/Kelly sin ejecutar el modelo.
+- Un JSON por partido en .cache/resultados; expulsión LRU por tamaño total
+- Informe de aciertos / repreciados / fallos / expulsados por ejecución
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from salida_web import a_json
+
+CACHE_RESULTADOS_DIR = '.cache/resultados'
+MAX_BYTES = 64 * 1024 * 1024
+# Módulos cuyo código define los picks de un partido
+MODULOS_ANALISIS = ('betting_analyzer.py', 'dixon_coles.py', 'mercados.py', 'kernel_poisson.py',
+                    'tabla_dixon_coles.py', 'calibracion.py', 'margen.py', 'paralelo.py', 'registros.py')
+
+
+def huella(*partes) -> str:
+    """Hash estable de cualquier estructura serializable (incluidos tipos NumPy)"""
+    return hashlib.sha1(a_json(partes)).hexdigest()[:20]
+
+
+def huella_codigo() -> str:
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    codigo = hashlib.sha1()
+    for modulo in MODULOS_ANALISIS:
+        with open(os.path.join(carpeta, modulo), 'rb') as f:
+            codigo.update(f.read())
+    return codigo.hexdigest()[:20]
+
+
+class CacheResultados:
+    """Picks y probabilidades del modelo por partido, indexados por huella de entradas"""
+
+    def __init__(self, directorio: str = CACHE_RESULTADOS_DIR, max_bytes: int = MAX_BYTES):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        os.makedirs(directorio, exist_ok=True)
+        self.aciertos = 0
+        self.repreciados = 0
+        self.fallos = 0
+        self.expulsados = 0
+
+    def _ruta(self, clave_modelo: str) -> str:
+        return os.path.join(self.directorio, f"{clave_modelo}.json")
+
+    def obtener(self, clave_modelo: str, clave_cuotas: str) -> Optional[Dict]:
+        """
+        Entrada {'clave_cuotas', 'partido', 'probs'} o None si el modelo cambió.
+        El llamador reprecia si entrada['clave_cuotas'] != clave_cuotas.
+        """
+        ruta = self._ruta(clave_modelo)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+        except (OSError, ValueError):
+            self.fallos += 1
+            return None
+        os.utime(ruta)  # uso reciente para la expulsión LRU
+        if entrada['clave_cuotas'] == clave_cuotas:
+            self.aciertos += 1
+        else:
+            self.repreciados += 1
+        return entrada
+
+    def guardar(self, clave_modelo: str, clave_cuotas: str, partido: Dict, probs: Dict[str, float]):
+        with open(self._ruta(clave_modelo), 'wb') as f:
+            f.write(a_json({'clave_cuotas': clave_cuotas, 'partido': partido, 'probs': probs}))
+
+    def podar(self):
+        """Expulsa las entradas usadas hace más tiempo hasta caber en max_bytes"""
+        entradas = []
+        for archivo in os.listdir(self.directorio):
+            stat = os.stat(os.path.join(self.directorio, archivo))
+            entradas.append((stat.st_mtime, stat.st_size, archivo))
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, archivo in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directorio, archivo))
+            total -= tamano
+            self.expulsados += 1
+
+    def informe(self) -> Dict[str, int]:
+        return {'aciertos': self.aciertos, 'repreciados': self.repreciados,
+                'fallos': self.fallos, 'expulsados': self.expulsados}
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Calibración de probabilidades ajustada por mercado (1X2, BTTS, over 2.5)
+- Platt (regresión logística sobre logit(p)) o isotónica (PAV), ajustadas
+  con predicciones históricas frente a resultados
+- Cada calibrador se compila a una tabla monótona de PUNTOS_TABLA valores
+  sobre una rejilla uniforme de [0, 1]: aplicar = interpolación lineal con
+  aritmética de índices, vectorizada sobre arrays enteros
+- Los mercados sin calibrador ajustado usan la fórmula fija por tramos
+  anterior (calibracion_fija)
+
+Formato de predicciones históricas (CSV): mercado,prob,resultado
+con mercado en MERCADOS y resultado 0/1
+"""
+
+import csv
+import json
+import os
+import sys
+import numpy as np
+from collections import defaultdict
+from typing import Dict, Optional
+
+MERCADOS = ('1x2', 'btts', 'over25')
+PUNTOS_TABLA = 1001
+# Con pocas muestras la isotónica sobreajusta: por debajo se usa Platt
+MIN_MUESTRAS_ISOTONICA = 1000
+CALIBRACION_PATH = 'data/calibracion.json'
+PREDICCIONES_PATH = 'data/predicciones_historicas.csv'
+EPS = 1e-6
+
+
+def calibracion_fija(probs) -> np.ndarray:
+    """Fórmula fija por tramos (sin ajustar), vectorizada"""
+    probs = np.asarray(probs, dtype=float)
+    return np.where(probs > 0.9, 0.85 + (probs - 0.9) * 0.5,
+                    np.where(probs < 0.1, 0.1 + probs * 0.5, probs * 0.95 + 0.025))
+
+
+def _logit(probs: np.ndarray) -> np.ndarray:
+    probs = np.clip(probs, EPS, 1 - EPS)
+    return np.log(probs / (1 - probs))
+
+
+def _sigmoide(z: np.ndarray) -> np.ndarray:
+    return 0.5 * (1 + np.tanh(z / 2))
+
+
+def ajustar_platt(probs: np.ndarray, resultados: np.ndarray, iteraciones: int = 50) -> np.ndarray:
+    """
+    Platt sobre logit(p): q = sigmoide(a * logit(p) + b), por Newton-Raphson.
+    Objetivos suavizados de Platt (1999) para no saturar en los extremos.
+    Devuelve la tabla monótona.
+    """
+    x = _logit(probs)
+    positivos = resultados.sum()
+    negativos = len(resultados) - positivos
+    objetivo = np.where(resultados > 0, (positivos + 1) / (positivos + 2), 1 / (negativos + 2))
+
+    diseno = np.column_stack([x, np.ones_like(x)])
+
+    def perdida(coef):
+        z = diseno @ coef
+        return float(np.sum(np.logaddexp(0, z) - objetivo * z))
+
+    coef = np.array([1.0, 0.0])
+    for _ in range(iteraciones):
+        q = _sigmoide(diseno @ coef)
+        gradiente = diseno.T @ (q - objetivo)
+        hessiano = (diseno * (q * (1 - q))[:, None]).T @ diseno + 1e-9 * np.eye(2)
+        paso = np.linalg.solve(hessiano, gradiente)
+        # Newton amortiguado: con poca señal el paso completo diverge
+        actual, t = perdida(coef), 1.0
+        while perdida(coef - t * paso) > actual and t > 1e-6:
+            t /= 2
+        coef -= t * paso
+        if np.abs(t * paso).max() < 1e-10:
+            break
+    # Pendiente negativa (ruido sin señal): la tabla monótona la aplanaría en un
+    # extremo. El mejor ajuste con pendiente >= 0 es la tasa base (solo intercepto)
+    if coef[0] < 0:
+        coef = np.array([0.0, float(_logit(np.array([objetivo.mean()]))[0])])
+
+    rejilla = np.linspace(0, 1, PUNTOS_TABLA)
+    tabla = _sigmoide(coef[0] * _logit(rejilla) + coef[1])
+    return np.maximum.accumulate(tabla)
+
+
+def ajustar_isotonica(probs: np.ndarray, resultados: np.ndarray) -> np.ndarray:
+    """
+    Regresión isotónica por pool-adjacent-violators (O(n) tras ordenar).
+    Devuelve la tabla monótona interpolando entre los bloques.
+    """
+    orden = np.argsort(probs, kind='stable')
+    x, y = probs[orden], resultados[orden].astype(float)
+
+    # Bloques: [suma_y, peso, x_min, x_max]
+    valores, pesos, x_min, x_max = [], [], [], []
+    for xi, yi in zip(x.tolist(), y.tolist()):
+        valores.append(yi)
+        pesos.append(1.0)
+        x_min.append(xi)
+        x_max.append(xi)
+        while len(valores) > 1 and valores[-2] / pesos[-2] >= valores[-1] / pesos[-1]:
+            suma, peso, fin = valores.pop(), pesos.pop(), x_max.pop()
+            x_min.pop()
+            valores[-1] += suma
+            pesos[-1] += peso
+            x_max[-1] = fin
+
+    medias = np.array(valores) / np.array(pesos)
+    nodos_x = np.column_stack([x_min, x_max]).ravel()
+    nodos_y = np.repeat(medias, 2)
+    rejilla = np.linspace(0, 1, PUNTOS_TABLA)
+    return np.maximum.accumulate(np.interp(rejilla, nodos_x, nodos_y))
+
+
+class TablaCalibracion:
+    """Calibrador compilado: valores monótonos sobre una rejilla uniforme de [0, 1]"""
+
+    def __init__(self, valores, metodo: str = 'platt', muestras: int = 0,
+                 brier_antes: Optional[float] = None, brier_despues: Optional[float] = None):
+        self.valores = np.asarray(valores, dtype=float)
+        self.metodo = metodo
+        self.muestras = muestras
+        self.brier_antes = brier_antes
+        self.brier_despues = brier_despues
+
+    def aplicar(self, probs) -> np.ndarray:
+        """Interpolación lineal en la tabla, en una sola llamada vectorizada"""
+        escala = len(self.valores) - 1
+        x = np.clip(np.asarray(probs, dtype=float), 0.0, 1.0) * escala
+        idx = np.minimum(x.astype(np.intp), escala - 1)
+        frac = x - idx
+        return self.valores[idx] * (1 - frac) + self.valores[idx + 1] * frac
+
+    @classmethod
+    def ajustar(cls, probs, resultados, metodo: Optional[str] = None) -> 'TablaCalibracion':
+        """metodo: 'platt', 'isotonica' o None (según el número de muestras)"""
+        probs = np.asarray(probs, dtype=float)
+        resultados = np.asarray(resultados, dtype=float)
+        if metodo is None:
+            metodo = 'isotonica' if len(probs) >= MIN_MUESTRAS_ISOTONICA else 'platt'
+        if metodo == 'platt':
+            valores = ajustar_platt(probs, resultados)
+        elif metodo == 'isotonica':
+            valores = ajustar_isotonica(probs, resultados)
+        else:
+            raise ValueError(f"Método de calibración desconocido: {metodo}")
+
+        tabla = cls(valores, metodo, len(probs))
+        tabla.brier_antes = float(np.mean((probs - resultados) ** 2))
+        tabla.brier_despues = float(np.mean((tabla.aplicar(probs) - resultados) ** 2))
+        return tabla
+
+    def como_dict(self) -> Dict:
+        return {
+            'metodo': self.metodo,
+            'muestras': self.muestras,
+            'brier_antes': self.brier_antes,
+            'brier_despues': self.brier_despues,
+            'valores': np.round(self.valores, 6).tolist(),
+        }
+
+
+class CalibradorMercados:
+    """Calibradores por mercado; los mercados sin tabla usan calibracion_fija"""
+
+    def __init__(self, tablas: Optional[Dict[str, TablaCalibracion]] = None):
+        self.tablas = tablas or {}
+
+    def aplicar(self, mercado: Optional[str], probs) -> np.ndarray:
+        tabla = self.tablas.get(mercado)
+        return tabla.aplicar(probs) if tabla is not None else calibracion_fija(probs)
+
+    @classmethod
+    def ajustar(cls, predicciones: Dict[str, Dict[str, np.ndarray]],
+                metodo: Optional[str] = None) -> 'CalibradorMercados':
+        """predicciones: {mercado: {'prob': array, 'resultado': array}}"""
+        return cls({mercado: TablaCalibracion.ajustar(datos['prob'], datos['resultado'], metodo)
+                    for mercado, datos in predicciones.items() if len(datos['prob'])})
+
+    @property
+    def descripcion(self) -> str:
+        if not self.tablas:
+            return "Fija por tramos (sin ajustar)"
+        return ", ".join(f"{m}: {t.metodo}" for m, t in sorted(self.tablas.items()))
+
+    def guardar(self, path: str = CALIBRACION_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({m: t.como_dict() for m, t in self.tablas.items()}, f)
+
+    @classmethod
+    def cargar(cls, path: str = CALIBRACION_PATH) -> 'CalibradorMercados':
+        """Calibradores guardados (vacío si no hay fichero)"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        return cls({m: TablaCalibracion(d['valores'], d['metodo'], d['muestras'],
+                                        d['brier_antes'], d['brier_despues'])
+                    for m, d in datos.items()})
+
+
+def cargar_predicciones(path: str = PREDICCIONES_PATH) -> Dict[str, Dict[str, np.ndarray]]:
+    """Lee el CSV de predicciones históricas agrupado por mercado"""
+    probs, resultados = defaultdict(list), defaultdict(list)
+    with open(path, 'r', encoding='utf-8') as f:
+        for fila in csv.DictReader(f):
+            probs[fila['mercado']].append(float(fila['prob']))
+            resultados[fila['mercado']].append(int(fila['resultado']))
+    return {m: {'prob': np.array(probs[m]), 'resultado': np.array(resultados[m])}
+            for m in MERCADOS if m in probs}
+
+
+def main():
+    """Ajusta los calibradores desde las predicciones históricas"""
+    predicciones_path = sys.argv[1] if len(sys.argv) > 1 else PREDICCIONES_PATH
+    calibracion_path = os.getenv('CALIBRACION_PATH', CALIBRACION_PATH)
+    metodo = os.getenv('CALIBRACION_METODO') or None
+
+    calibrador = CalibradorMercados.ajustar(cargar_predicciones(predicciones_path), metodo)
+    calibrador.guardar(calibracion_path)
+
+    for mercado, tabla in sorted(calibrador.tablas.items()):
+        print(f"✅ {mercado}: {tabla.metodo} con {tabla.muestras} muestras | "
+              f"Brier {tabla.brier_antes:.4f} -> {tabla.brier_despues:.4f}")
+    print(f"💾 Calibración guardada en: {calibracion_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Cartera Kelly simultánea para toda la jornada
+- Elige a la vez los stakes de todos los picks con apostar=True
+  maximizando el crecimiento logarítmico esperado E[log(1 + R·f)]
+- Los picks del mismo partido comparten la matriz de marcadores (resultados
+  excluyentes y correlados); partidos distintos son independientes
+- Límites: stake por apuesta, exposición por partido y exposición total
+- Newton con barrera logarítmica sobre escenarios simulados: pocas decenas
+  de pasos de Newton (hessiana n×n) incluso con 50+ apuestas
+"""
+
+import numpy as np
+from typing import Dict, List, Tuple
+
+# Selecciones con precio de mercado (almacen_cuotas.SELECCIONES) como máscara de marcadores
+SELECCIONES_MASCARA = ('home', 'draw', 'away', 'btts_yes', 'btts_no', 'over25', 'under25')
+EXPOSICION_PARTIDO = 0.08
+EXPOSICION_TOTAL = 0.25
+ESCENARIOS = 20000
+SEMILLA = 20240801
+MAX_ITERACIONES = 200
+PASOS_NEWTON = 20
+MULTIPLICADOR_BARRERA = 20
+TOL_GAP = 1e-8
+RONDAS_AJUSTE = 25
+
+
+def mascaras_seleccion(size: int) -> Dict[str, np.ndarray]:
+    """Celdas (goles local, goles visitante) en las que gana cada selección"""
+    local, visitante = np.indices((size, size))
+    ambos = (local > 0) & (visitante > 0)
+    over = local + visitante > 2
+    return {
+        'home': local > visitante, 'draw': local == visitante, 'away': local < visitante,
+        'btts_yes': ambos, 'btts_no': ~ambos,
+        'over25': over, 'under25': ~over,
+    }
+
+
+def ajustar_marginales(matriz: np.ndarray, objetivos: Dict[str, float],
+                       rondas: int = RONDAS_AJUSTE) -> np.ndarray:
+    """
+    Reescala la matriz de marcadores (ajuste proporcional iterativo) para que
+    sus mercados 1X2 / BTTS / Over 2.5 coincidan con las probabilidades
+    finales del pick (ensemble + calibración), conservando la correlación
+    entre mercados dentro del partido
+    """
+    mascaras = mascaras_seleccion(matriz.shape[0])
+    particiones = [claves for claves in (('home', 'draw', 'away'), ('btts_yes', 'btts_no'),
+                                         ('over25', 'under25'))
+                   if all(clave in objetivos for clave in claves)]
+    matriz = matriz / matriz.sum()
+    for _ in range(rondas):
+        for claves in particiones:
+            for clave in claves:
+                masa = matriz[mascaras[clave]].sum()
+                if masa > 0:
+                    matriz[mascaras[clave]] *= objetivos[clave] / masa
+            matriz /= matriz.sum()
+    return matriz
+
+
+def _escenarios(matrices: List[np.ndarray], apuestas: List[Tuple[int, str, float]],
+                n_escenarios: int, semilla: int) -> np.ndarray:
+    """
+    Rendimiento de cada apuesta (cuota - 1 o -1) en escenarios conjuntos:
+    un marcador por partido, muestreado de forma independiente entre partidos.
+    Solo se muestrea el patrón de aciertos de las apuestas de cada partido.
+    """
+    rng = np.random.default_rng(semilla)
+    rendimientos = np.empty((n_escenarios, len(apuestas)))
+    por_partido: Dict[int, List[int]] = {}
+    for k, (partido, _, _) in enumerate(apuestas):
+        por_partido.setdefault(partido, []).append(k)
+
+    for partido, indices in por_partido.items():
+        matriz = matrices[partido]
+        mascaras = mascaras_seleccion(matriz.shape[0])
+        aciertos = np.stack([mascaras[apuestas[k][1]].ravel() for k in indices], axis=1)
+        patrones, inverso = np.unique(aciertos, axis=0, return_inverse=True)
+        probs = np.bincount(inverso.ravel(), weights=matriz.ravel(), minlength=len(patrones))
+        muestra = rng.choice(len(patrones), size=n_escenarios, p=probs / probs.sum())
+        cuotas = np.array([apuestas[k][2] for k in indices])
+        rendimientos[:, indices] = np.where(patrones[muestra], cuotas - 1, -1.0)
+    return rendimientos
+
+
+def _restricciones(grupos: np.ndarray, tope_apuesta: float, tope_partido: float,
+                   tope_total: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Límites como A·f <= b: f >= 0, f <= tope, suma por partido, suma total"""
+    n = len(grupos)
+    partidos = np.unique(grupos)
+    a = np.vstack([-np.eye(n), np.eye(n), (grupos[None, :] == partidos[:, None]).astype(float), np.ones((1, n))])
+    b = np.concatenate([np.zeros(n), np.full(n, tope_apuesta), np.full(len(partidos), tope_partido), [tope_total]])
+    return a, b
+
+
+def _punto_interior(grupos: np.ndarray, tope_apuesta: float, tope_partido: float,
+                    tope_total: float) -> np.ndarray:
+    """Punto estrictamente factible: la mitad del reparto uniforme de cada límite"""
+    _, partido, tamanos = np.unique(grupos, return_inverse=True, return_counts=True)
+    por_partido = tope_partido / tamanos[partido.ravel()]
+    return 0.5 * np.minimum(np.minimum(tope_apuesta, por_partido), tope_total / len(grupos))
+
+
+def optimizar_cartera(matrices: List[np.ndarray], apuestas: List[Tuple[int, str, float]],
+                      fraccion_kelly: float = 0.25, tope_apuesta: float = 0.05,
+                      tope_partido: float = EXPOSICION_PARTIDO,
+                      tope_total: float = EXPOSICION_TOTAL,
+                      n_escenarios: int = ESCENARIOS, semilla: int = SEMILLA) -> Dict:
+    """
+    apuestas: (índice del partido en matrices, selección, cuota) por pick.
+    Se resuelve la cartera Kelly completa con los límites divididos por la
+    fracción y se escala por ella: los límites se cumplen sobre el stake final.
+    Devuelve stakes (fracción de banca), crecimiento esperado e iteraciones.
+    """
+    n = len(apuestas)
+    if n == 0:
+        return {'stakes': np.zeros(0), 'crecimiento_log': 0.0, 'iteraciones': 0}
+
+    rendimientos = _escenarios(matrices, apuestas, n_escenarios, semilla)
+    grupos = np.array([partido for partido, _, _ in apuestas])
+    topes = (tope_apuesta / fraccion_kelly, tope_partido / fraccion_kelly, tope_total / fraccion_kelly)
+
+    a, b = _restricciones(grupos, *topes)
+    f = _punto_interior(grupos, *topes)
+    t = 1.0
+    iteracion = 0
+    riqueza = 1 + rendimientos @ f
+    # Barrera logarítmica: máx t·E[log(1 + R·f)] + sum log(b - A·f), t creciente
+    while len(b) / t > TOL_GAP and iteracion < MAX_ITERACIONES:
+        for _ in range(PASOS_NEWTON):
+            iteracion += 1
+            holgura = b - a @ f
+            escalados = rendimientos / riqueza[:, None]
+            gradiente = t * escalados.mean(axis=0) - a.T @ (1 / holgura)
+            hessiana = t * (escalados.T @ escalados) / n_escenarios + (a.T / holgura ** 2) @ a
+            paso = np.linalg.solve(hessiana, gradiente)
+            if gradiente @ paso < 1e-10:
+                break
+            # Retroceso: mantener f dentro de los límites y la riqueza positiva
+            s_paso = 1.0
+            a_paso, r_paso = a @ paso, rendimientos @ paso
+            while np.any(holgura - s_paso * a_paso <= 0) or np.any(riqueza + s_paso * r_paso <= 0):
+                s_paso *= 0.5
+            f = f + s_paso * paso
+            riqueza = riqueza + s_paso * r_paso
+        t *= MULTIPLICADOR_BARRERA
+
+    stakes = fraccion_kelly * np.clip(f, 0, None)
+    return {
+        'stakes': stakes,
+        'crecimiento_log': float(np.mean(np.log1p(rendimientos @ stakes))),
+        'iteraciones': iteracion,
+    }
+
+
+def main():
+    """Ejemplo: 60 apuestas sintéticas en 20 partidos"""
+    import time
+    from dixon_coles import matrices_dixon_coles
+
+    rng = np.random.default_rng(0)
+    n_partidos = 20
+    matrices, _ = matrices_dixon_coles(rng.uniform(0.8, 2.2, n_partidos), rng.uniform(0.6, 1.8, n_partidos))
+    apuestas = []
+    for partido in range(n_partidos):
+        mascaras = mascaras_seleccion(matrices.shape[1])
+        for seleccion in rng.choice(SELECCIONES_MASCARA, size=3, replace=False):
+            prob = matrices[partido][mascaras[seleccion]].sum()
+            apuestas.append((partido, str(seleccion), round(float(rng.uniform(1.0, 1.15) / prob), 2)))
+
+    inicio = time.perf_counter()
+    resultado = optimizar_cartera(list(matrices), apuestas)
+    ms = (time.perf_counter() - inicio) * 1000
+    stakes = resultado['stakes']
+    print(f"✅ {len(apuestas)} apuestas en {n_partidos} partidos: {ms:.0f} ms, "
+          f"{resultado['iteraciones']} iteraciones")
+    print(f"   Con stake: {int((stakes > 1e-4).sum())} | Exposición total {stakes.sum() * 100:.1f}% | "
+          f"Crecimiento log esperado {resultado['crecimiento_log'] * 100:.3f}%")
+
+
+if __name__ == "__main__":
+    main()
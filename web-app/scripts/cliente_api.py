@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Cliente asíncrono de API-Football
+- Una sesión aiohttp con pool de conexiones (keep-alive) para todas las peticiones
+- Partidos, clasificación y cuotas de todas las ligas en una sola oleada
+  concurrente: el refresco completo tarda un round-trip, no la suma de todos;
+  las estadísticas de equipo solo se piden para los equipos sin clasificación
+- Token buckets para la cuota diaria (100 peticiones/día en el plan gratuito,
+  estado persistido entre ejecuciones) y el límite por minuto; las cabeceras
+  x-ratelimit-* de la API corrigen los tokens restantes
+- Reintentos con backoff exponencial y jitter ante 429/5xx, timeouts y errores
+  de conexión (respeta Retry-After)
+- Caché de respuestas en disco (cache_http.py): lo que sigue fresco no gasta
+  cuota, lo caducado se revalida con ETag / Last-Modified; API_OFFLINE=1 sirve
+  solo desde la caché
+- API_FOOTBALL_URL apunta el cliente a otro servidor (p.ej. un mock local)
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, Iterable, List, Optional
+
+from cache_http import CACHE_API_DIR, CacheHttp
+
+API_URL = 'https://v3.football.api-sports.io'
+CUOTA_DIARIA = 100
+PETICIONES_POR_MINUTO = 10
+CUOTA_PATH = 'data/cuota_api.json'
+# Ids de liga de API-Football por competición del almacén
+LIGAS_API = {'primera_division': 140, 'segunda_division': 141}
+CONEXIONES = 10
+TIMEOUT_S = 10
+REINTENTOS = 3
+ESPERA_BASE_S = 0.5
+ESTADOS_REINTENTABLES = frozenset((429, 500, 502, 503, 504))
+# Apuesta y valor de API-Football -> selección del almacén de cuotas
+SELECCIONES_API = {
+    ('Match Winner', 'Home'): 'home',
+    ('Match Winner', 'Draw'): 'draw',
+    ('Match Winner', 'Away'): 'away',
+    ('Both Teams Score', 'Yes'): 'btts_yes',
+    ('Both Teams Score', 'No'): 'btts_no',
+    ('Goals Over/Under', 'Over 2.5'): 'over25',
+    ('Goals Over/Under', 'Under 2.5'): 'under25',
+}
+
+
+class CuotaAgotada(RuntimeError):
+    """No quedan peticiones en la cuota y esperar no está permitido"""
+
+
+class ErrorApi(RuntimeError):
+    """Respuesta de error de la API o reintentos agotados"""
+
+
+class LimitadorCuota:
+    """
+    Token bucket: 'capacidad' peticiones que se recargan uniformemente en
+    'periodo_s'. Si falta un token y la espera supera max_espera_s lanza
+    CuotaAgotada en lugar de bloquear (la cuota diaria no se espera).
+    """
+
+    def __init__(self, capacidad: int, periodo_s: float, max_espera_s: float = 0.0,
+                 path: Optional[str] = None):
+        self.capacidad = capacidad
+        self.tasa = capacidad / periodo_s
+        self.max_espera_s = max_espera_s
+        self.path = path
+        self.tokens = float(capacidad)
+        self.actualizado = time.time()
+        self.gastadas = 0  # peticiones de esta ejecución
+        self._lock = asyncio.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            self.tokens, self.actualizado = estado['tokens'], estado['actualizado']
+
+    def _recargar(self):
+        ahora = time.time()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.actualizado) * self.tasa)
+        self.actualizado = ahora
+
+    async def adquirir(self):
+        async with self._lock:
+            self._recargar()
+            if self.tokens < 1:
+                espera = (1 - self.tokens) / self.tasa
+                if espera > self.max_espera_s:
+                    raise CuotaAgotada(f"Cuota agotada: {self.tokens:.2f}/{self.capacidad} peticiones "
+                                       f"(siguiente en {espera:.0f}s)")
+                await asyncio.sleep(espera)
+                self._recargar()
+            self.tokens -= 1
+            self.gastadas += 1
+
+    def sincronizar(self, restantes: Optional[str]):
+        """La cuenta del servidor manda si es más restrictiva que la local"""
+        if restantes is not None and restantes.isdigit():
+            self.tokens = min(self.tokens, float(restantes))
+
+    def guardar(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'tokens': self.tokens, 'actualizado': self.actualizado}, f)
+
+
+class ClienteApiFootball:
+    """
+    Uso:
+        async with ClienteApiFootball() as cliente:
+            datos = await cliente.refrescar(LIGAS_API, 2025, desde, hasta)
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 diario: Optional[LimitadorCuota] = None, por_minuto: Optional[LimitadorCuota] = None,
+                 conexiones: int = CONEXIONES, reintentos: int = REINTENTOS,
+                 espera_base_s: float = ESPERA_BASE_S, cache: Optional[CacheHttp] = None):
+        """
+        cache: respuestas en disco; por defecto en API_CACHE_DIR (vacío la
+        desactiva) y offline si API_OFFLINE=1 (entonces no hace falta API key)
+        """
+        if cache is None and os.getenv('API_CACHE_DIR', CACHE_API_DIR):
+            cache = CacheHttp(os.getenv('API_CACHE_DIR', CACHE_API_DIR), offline=os.getenv('API_OFFLINE') == '1')
+        self.cache = cache
+        self.api_key = api_key or os.getenv('API_FOOTBALL_KEY')
+        if not self.api_key and not (cache and cache.offline):
+            raise ValueError("Falta la API key de API-Football (variable API_FOOTBALL_KEY)")
+        self.base_url = (base_url or os.getenv('API_FOOTBALL_URL', API_URL)).rstrip('/')
+        self.diario = diario or LimitadorCuota(CUOTA_DIARIA, 86400,
+                                               path=os.getenv('API_CUOTA_PATH', CUOTA_PATH))
+        self.por_minuto = por_minuto or LimitadorCuota(PETICIONES_POR_MINUTO, 60, max_espera_s=60)
+        self.conexiones = conexiones
+        self.reintentos = reintentos
+        self.espera_base_s = espera_base_s
+        self.reintentadas = 0
+        self.errores: List[str] = []
+        self._sesion = None
+
+    async def __aenter__(self) -> 'ClienteApiFootball':
+        # aiohttp solo se carga cuando se usa la API
+        import aiohttp
+        self._sesion = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.conexiones),
+            headers={'x-apisports-key': self.api_key or ''},
+            timeout=aiohttp.ClientTimeout(total=TIMEOUT_S),
+        )
+        return self
+
+    async def __aexit__(self, *excepcion):
+        await self._sesion.close()
+        self.diario.guardar()
+
+    async def get(self, endpoint: str, **params):
+        """Campo 'response' de GET /endpoint (solo la primera página)"""
+        return (await self._get(endpoint, params))['response']
+
+    async def get_paginado(self, endpoint: str, **params) -> List:
+        """'response' de todas las páginas de un endpoint paginado (paging.total), en paralelo"""
+        primera = await self._get(endpoint, params)
+        total = int((primera.get('paging') or {}).get('total') or 1)
+        resto = await asyncio.gather(*(self._get(endpoint, {**params, 'page': pagina})
+                                       for pagina in range(2, total + 1)))
+        return [elemento for cuerpo in (primera, *resto) for elemento in cuerpo['response']]
+
+    async def _get(self, endpoint: str, params: Dict) -> Dict:
+        """
+        {'response', 'paging'} de GET /endpoint. Lo fresco en caché no consume cuota;
+        si la API falla o se agota la cuota se sirve la respuesta caducada si la hay.
+        """
+        entrada = self.cache.obtener(endpoint, params) if self.cache else None
+        if entrada is not None and (self.cache.offline or self.cache.fresca(entrada)):
+            return self.cache.servir(entrada)
+        if self.cache and self.cache.offline:
+            raise ErrorApi(f"{endpoint}: sin respuesta en caché (modo offline)")
+        try:
+            return await self._descargar(endpoint, params, entrada)
+        except (ErrorApi, CuotaAgotada) as e:
+            if entrada is None:
+                raise
+            self.errores.append(f"{e} (se usa la respuesta caducada de la caché)")
+            return self.cache.servir_caducada(entrada)
+
+    async def _descargar(self, endpoint: str, params: Dict, entrada: Optional[Dict]):
+        """GET con reintentos; cada intento consume cuota. Con entrada, petición condicional."""
+        import aiohttp
+        cabeceras = self.cache.validadores(entrada) if self.cache else {}
+        error = None
+        for intento in range(self.reintentos + 1):
+            await self.diario.adquirir()
+            await self.por_minuto.adquirir()
+            espera = self.espera_base_s * 2 ** intento * (1 + random.random())
+            try:
+                async with self._sesion.get(f"{self.base_url}/{endpoint}", params=params,
+                                            headers=cabeceras) as respuesta:
+                    self.diario.sincronizar(respuesta.headers.get('x-ratelimit-requests-remaining'))
+                    self.por_minuto.sincronizar(respuesta.headers.get('X-RateLimit-Remaining'))
+                    if respuesta.status == 304 and entrada is not None:
+                        return self.cache.revalidar(entrada)
+                    if respuesta.status in ESTADOS_REINTENTABLES:
+                        error = ErrorApi(f"{endpoint}: HTTP {respuesta.status}")
+                        retry_after = respuesta.headers.get('Retry-After', '')
+                        if retry_after.isdigit():
+                            espera = max(espera, float(retry_after))
+                    else:
+                        if respuesta.status >= 400:
+                            raise ErrorApi(f"{endpoint}: HTTP {respuesta.status}")
+                        datos = await respuesta.json()
+                        # La API responde 200 con 'errors' (clave inválida, parámetros, límite...)
+                        if datos.get('errors'):
+                            raise ErrorApi(f"{endpoint}: {datos['errors']}")
+                        cuerpo = {'response': datos['response'], 'paging': datos.get('paging')}
+                        if self.cache:
+                            self.cache.guardar(endpoint, params, cuerpo,
+                                               respuesta.headers.get('ETag'), respuesta.headers.get('Last-Modified'))
+                        return cuerpo
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = ErrorApi(f"{endpoint}: {type(e).__name__} {e}")
+            if intento < self.reintentos:
+                self.reintentadas += 1
+                await asyncio.sleep(espera)
+        raise error
+
+    async def partidos(self, liga: int, temporada: int, desde: str, hasta: str) -> List[Dict]:
+        return await self.get('fixtures', league=liga, season=temporada, **{'from': desde, 'to': hasta})
+
+    async def clasificacion(self, liga: int, temporada: int) -> List[Dict]:
+        """Filas de la clasificación (todas las tablas/grupos de la liga)"""
+        respuesta = await self.get('standings', league=liga, season=temporada)
+        return [fila for liga_api in respuesta for grupo in liga_api['league']['standings'] for fila in grupo]
+
+    async def estadisticas_equipo(self, liga: int, temporada: int, equipo: int) -> Dict:
+        return await self.get('teams/statistics', league=liga, season=temporada, team=equipo)
+
+    async def cuotas(self, liga: int, temporada: int) -> List[Dict]:
+        """/odds va paginado (pocos partidos por página): se piden todas las páginas"""
+        return await self.get_paginado('odds', league=liga, season=temporada)
+
+    async def refrescar(self, ligas: Dict[str, int], temporada: int, desde: str, hasta: str) -> Dict[str, Dict]:
+        """
+        Partidos, clasificación y cuotas de todas las ligas en una oleada; una
+        segunda (solo si hace falta) con las estadísticas de los equipos que no
+        aparecen en la clasificación. Sin partidos la competición se omite;
+        sin clasificación o cuotas se sigue con lo que haya (en 'errores').
+        """
+        competiciones = list(ligas)
+        tareas = [peticion for competicion in competiciones for peticion in (
+            self.partidos(ligas[competicion], temporada, desde, hasta),
+            self.clasificacion(ligas[competicion], temporada),
+            self.cuotas(ligas[competicion], temporada),
+        )]
+        respuestas = await asyncio.gather(*tareas, return_exceptions=True)
+
+        resultado, errores = {}, []
+        for k, competicion in enumerate(competiciones):
+            partidos, clasificacion, cuotas = respuestas[3 * k:3 * k + 3]
+            for respuesta in (partidos, clasificacion, cuotas):
+                if isinstance(respuesta, CuotaAgotada):
+                    raise respuesta
+                if isinstance(respuesta, Exception):
+                    errores.append(f"{competicion}: {respuesta}")
+            if isinstance(partidos, Exception) or not partidos:
+                continue
+            resultado[competicion] = {
+                'partidos': partidos,
+                'clasificacion': [] if isinstance(clasificacion, Exception) else clasificacion,
+                'cuotas': [] if isinstance(cuotas, Exception) else cuotas,
+                'estadisticas': {},
+            }
+
+        # Segunda oleada: estadísticas de los equipos sin fila en la clasificación
+        pendientes = [(competicion, equipo) for competicion, datos in resultado.items()
+                      for equipo in _equipos_sin_clasificacion(datos)]
+        estadisticas = await asyncio.gather(*(self.estadisticas_equipo(ligas[competicion], temporada, equipo)
+                                              for competicion, equipo in pendientes), return_exceptions=True)
+        for (competicion, equipo), respuesta in zip(pendientes, estadisticas):
+            if isinstance(respuesta, Exception):
+                errores.append(f"{competicion}: {respuesta}")
+            else:
+                resultado[competicion]['estadisticas'][equipo] = respuesta
+
+        self.errores.extend(errores)
+        return resultado
+
+
+def _equipos_sin_clasificacion(datos: Dict) -> List[int]:
+    en_tabla = {fila['team']['id'] for fila in datos['clasificacion']}
+    equipos = (partido['teams'][lado]['id'] for partido in datos['partidos'] for lado in ('home', 'away'))
+    return sorted(set(equipos) - en_tabla)
+
+
+def mejores_cuotas(respuesta_cuotas: List[Dict]) -> Dict[int, Dict[str, float]]:
+    """Mejor cuota entre casas por id de partido de la API y selección"""
+    mejores: Dict[int, Dict[str, float]] = {}
+    for partido in respuesta_cuotas:
+        cuotas = mejores.setdefault(partido['fixture']['id'], {})
+        for casa in partido.get('bookmakers', []):
+            for apuesta in casa.get('bets', []):
+                for valor in apuesta.get('values', []):
+                    seleccion = SELECCIONES_API.get((apuesta['name'], str(valor['value'])))
+                    if seleccion is not None:
+                        cuotas[seleccion] = max(cuotas.get(seleccion, 0.0), float(valor['odd']))
+    return mejores
+
+
+def refrescar(ligas: Iterable[str], temporada: int, desde: str, hasta: str, **opciones) -> Dict:
+    """
+    Versión bloqueante de ClienteApiFootball.refrescar; devuelve también la
+    cuota gastada y restante, los reintentos, los errores y el informe de la caché
+    """
+    async def _refrescar():
+        async with ClienteApiFootball(**opciones) as cliente:
+            if cliente.cache is not None:
+                cliente.cache.temporada_actual = temporada
+            datos = await cliente.refrescar({c: LIGAS_API[c] for c in ligas}, temporada, desde, hasta)
+            return {'competiciones': datos, 'peticiones': cliente.diario.gastadas,
+                    'cuota_restante': int(cliente.diario.tokens), 'reintentos': cliente.reintentadas,
+                    'errores': cliente.errores,
+                    'cache': cliente.cache.informe() if cliente.cache is not None else None}
+    return asyncio.run(_refrescar())
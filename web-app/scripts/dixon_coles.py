@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Motor vectorizado Poisson-Dixon-Coles
+- Calcula las matrices de marcadores de N partidos en una sola pasada NumPy
+- Deriva todos los mercados de todas las matrices a la vez (mercados.py)
+- Misma corrección tau acotada que AdvancedBettingAnalyzer
+- Tamaño de la rejilla de goles adaptativo según la masa de cola tolerada
+- PMFs con el kernel Poisson nativo (kernel_poisson.py), sin scipy
+"""
+
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from kernel_poisson import cdf_tabla, pmf_tabla
+from mercados import derivar_mercados
+
+# Masa de probabilidad máxima que se permite dejar fuera de la rejilla
+TOL_COLA = 1e-9
+MAX_GOALS_LIMITE = 30
+TAU_MIN, TAU_MAX = 0.5, 1.5
+
+
+def goles_necesarios(lambdas, tol: float = TOL_COLA) -> int:
+    """
+    Menor G tal que P(X > G) <= tol/2 para la lambda más alta del lote,
+    de modo que la masa conjunta truncada (local y visitante) quede <= tol
+    """
+    cola = 1 - cdf_tabla([np.max(lambdas)], MAX_GOALS_LIMITE)[0]
+    suficientes = np.nonzero(cola <= tol / 2)[0]
+    return int(suficientes[0]) if len(suficientes) else MAX_GOALS_LIMITE
+
+
+def matrices_dixon_coles(lambda_home, lambda_away, rho=0.1,
+                         max_goals: Optional[int] = None,
+                         tol: float = TOL_COLA) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Devuelve un tensor N×G×G con la probabilidad de cada marcador
+    (filas = goles local, columnas = goles visitante), normalizado por partido,
+    y la masa de probabilidad que quedaba fuera de la rejilla antes de normalizar.
+    Si max_goals es None se elige a partir de la tolerancia de cola.
+    """
+    lambda_home = np.atleast_1d(np.asarray(lambda_home, dtype=float))
+    lambda_away = np.atleast_1d(np.asarray(lambda_away, dtype=float))
+    rho = np.broadcast_to(np.asarray(rho, dtype=float), lambda_home.shape)
+
+    if max_goals is None:
+        max_goals = goles_necesarios(np.concatenate([lambda_home, lambda_away]), tol)
+
+    pmf_home = pmf_tabla(lambda_home, max_goals)
+    pmf_away = pmf_tabla(lambda_away, max_goals)
+    matrices = pmf_home[:, :, None] * pmf_away[:, None, :]
+
+    # La corrección tau conserva la masa total, así que la cola es la del producto
+    masa_truncada = np.clip(1 - pmf_home.sum(axis=1) * pmf_away.sum(axis=1), 0.0, 1.0)
+
+    # Corrección Dixon-Coles ESTABLE (tau acotado) en las 4 celdas de bajo marcador
+    tau = np.empty((lambda_home.shape[0], 2, 2))
+    tau[:, 0, 0] = 1 - lambda_home * lambda_away * rho
+    tau[:, 0, 1] = 1 + lambda_home * rho
+    tau[:, 1, 0] = 1 + lambda_away * rho
+    tau[:, 1, 1] = 1 - rho
+    matrices[:, :2, :2] *= np.clip(tau, TAU_MIN, TAU_MAX)
+
+    np.maximum(matrices, 0, out=matrices)
+
+    # Normalizar
+    totales = matrices.sum(axis=(1, 2), keepdims=True)
+    np.divide(matrices, totales, out=matrices, where=totales > 0)
+    return matrices, masa_truncada
+
+
+def poisson_dixon_coles_batch(lambda_home, lambda_away, rho=0.1,
+                              max_goals: Optional[int] = None,
+                              tol: float = TOL_COLA) -> Dict[str, np.ndarray]:
+    """
+    API batch: recibe arrays de lambdas (y rho) de N partidos y devuelve
+    las matrices N×G×G junto con todos los mercados derivados como arrays.
+    'masa_truncada' indica la probabilidad que quedó fuera de la rejilla.
+    """
+    lambda_home = np.atleast_1d(np.asarray(lambda_home, dtype=float))
+    lambda_away = np.atleast_1d(np.asarray(lambda_away, dtype=float))
+
+    matrices, masa_truncada = matrices_dixon_coles(lambda_home, lambda_away, rho, max_goals, tol)
+    resultado = derivar_mercados(matrices)
+    resultado['expected_home_goals'] = lambda_home
+    resultado['expected_away_goals'] = lambda_away
+    resultado['masa_truncada'] = masa_truncada
+    resultado['matrices'] = matrices
+    return resultado
+
+
+def extraer_partido(batch: Dict[str, np.ndarray], idx: int) -> Dict[str, float]:
+    """
+    Extrae los mercados del partido idx de un resultado batch
+    (los ejes comunes de líneas y márgenes se comparten tal cual)
+    """
+    partido = {clave: valores[idx] for clave, valores in batch.items()
+               if clave not in ('matrices', 'ejes')}
+    if 'ejes' in batch:
+        partido['ejes'] = batch['ejes']
+    return partido
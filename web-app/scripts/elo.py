@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Motor ELO incremental alimentado por resultados
+- Procesa los partidos en orden cronológico, actualización O(1) por partido
+- Ventaja de campo y multiplicador por margen de goles (World Football Elo)
+- Checkpoint binario compacto por jornada: una jornada nueva solo aplica
+  sus resultados sobre el último checkpoint, sin reprocesar el histórico.
+  Guarda qué partidos del último día ya se aplicaron: los del mismo día que
+  lleguen después (horarios tardíos) se aplican una sola vez
+- Equipos por nombre canónico del registro (equipos.py): los alias de
+  distintas fuentes comparten rating y el checkpoint guarda también su id
+"""
+
+import glob
+import os
+import sys
+import numpy as np
+from typing import Dict, Optional
+
+from ajuste_dixon_coles import cargar_resultados, RESULTADOS_PATH
+from equipos import RegistroEquipos, clave_partido, registro_por_defecto
+
+ELO_BASE = 1500.0
+K_FACTOR = 20.0
+VENTAJA_LOCAL = 65.0
+CHECKPOINT_DIR = 'data/elo'
+
+
+def multiplicador_margen(diferencia: int) -> float:
+    """Factor por diferencia de goles: 1, 1.5 y (11 + d) / 8 a partir de 3"""
+    diferencia = abs(diferencia)
+    if diferencia <= 1:
+        return 1.0
+    if diferencia == 2:
+        return 1.5
+    return (11 + diferencia) / 8
+
+
+class MotorElo:
+    """Ratings ELO que aprenden de los resultados"""
+
+    def __init__(self, k: float = K_FACTOR, ventaja_local: float = VENTAJA_LOCAL,
+                 registro: Optional[RegistroEquipos] = None):
+        self.k = k
+        self.ventaja_local = ventaja_local
+        self.registro = registro if registro is not None else registro_por_defecto()
+        self.indice: Dict[str, int] = {}
+        self.ratings = np.zeros(0)
+        self.fecha: Optional[np.datetime64] = None
+        # Claves (clave_partido) de los partidos ya aplicados del día self.fecha;
+        # None: desconocidas (checkpoint antiguo), se salta el día entero
+        self.claves_fecha: Optional[set] = set()
+        self.partidos_procesados = 0
+
+    def _id(self, equipo: str) -> int:
+        equipo = self.registro.canonico(equipo)
+        idx = self.indice.get(equipo)
+        if idx is None:
+            # Siguiente hueco libre: nunca la posición de un rating existente
+            idx = max(self.indice.values(), default=-1) + 1
+            self.indice[equipo] = idx
+            if idx >= len(self.ratings):
+                extra = max(len(self.ratings), 16)
+                self.ratings = np.concatenate([self.ratings, np.full(extra, ELO_BASE)])
+        return idx
+
+    def actualizar(self, local: str, visitante: str, goles_local: int, goles_visitante: int):
+        """Actualiza ambos ratings con un resultado"""
+        i, j = self._id(local), self._id(visitante)
+        esperado = 1 / (1 + 10 ** ((self.ratings[j] - self.ratings[i] - self.ventaja_local) / 400))
+        if goles_local > goles_visitante:
+            real = 1.0
+        elif goles_local < goles_visitante:
+            real = 0.0
+        else:
+            real = 0.5
+        delta = self.k * multiplicador_margen(goles_local - goles_visitante) * (real - esperado)
+        self.ratings[i] += delta
+        self.ratings[j] -= delta
+
+    def procesar(self, resultados: Dict[str, np.ndarray], checkpoint_dir: Optional[str] = None) -> int:
+        """
+        Aplica los resultados posteriores al último estado en orden cronológico,
+        y los del mismo día que el último estado que aún no se habían aplicado.
+        Si se indica checkpoint_dir guarda un checkpoint al cerrar cada jornada
+        (semana ISO). Devuelve el número de partidos nuevos aplicados.
+        """
+        fechas = resultados['fecha']
+        claves = clave_partido(self.registro.ids(resultados['local']), self.registro.ids(resultados['visitante']))
+        orden = np.argsort(fechas, kind='stable')
+        if self.fecha is not None:
+            mismo_dia = fechas[orden] == self.fecha
+            pendiente = (~mismo_dia if self.claves_fecha is None else
+                         ~mismo_dia | ~np.isin(claves[orden], list(self.claves_fecha)))
+            orden = orden[(fechas[orden] >= self.fecha) & pendiente]
+
+        semanas = fechas[orden].astype('datetime64[W]')
+        nuevos = 0
+        for pos, k in enumerate(orden):
+            self.actualizar(str(resultados['local'][k]), str(resultados['visitante'][k]),
+                            int(resultados['goles_local'][k]), int(resultados['goles_visitante'][k]))
+            if fechas[k] != self.fecha or self.claves_fecha is None:
+                self.claves_fecha = set()
+            self.claves_fecha.add(int(claves[k]))
+            self.fecha = fechas[k]
+            self.partidos_procesados += 1
+            nuevos += 1
+            fin_jornada = pos + 1 == len(orden) or semanas[pos + 1] != semanas[pos]
+            if checkpoint_dir and fin_jornada:
+                self.guardar_checkpoint(checkpoint_dir)
+        return nuevos
+
+    def como_dict(self) -> Dict[str, float]:
+        return {equipo: float(self.ratings[idx]) for equipo, idx in self.indice.items()}
+
+    def guardar_checkpoint(self, checkpoint_dir: str = CHECKPOINT_DIR) -> str:
+        """
+        Checkpoint binario: nombres, ids del registro, ratings (float64: recargar
+        y seguir da lo mismo que recalcular), fecha y partidos del último día
+        """
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        path = os.path.join(checkpoint_dir, f"elo_{self.fecha}.npz")
+        equipos = np.array(list(self.indice.keys()))
+        np.savez_compressed(
+            path,
+            equipos=equipos,
+            equipo_ids=self.registro.ids(equipos),
+            ratings=self.ratings[np.array(list(self.indice.values()), dtype=np.intp)],
+            fecha=np.array(str(self.fecha)),
+            claves_fecha=np.array(sorted(self.claves_fecha or ()), dtype=np.int64),
+            partidos=np.array(self.partidos_procesados),
+        )
+        return path
+
+    @classmethod
+    def cargar_ultimo(cls, checkpoint_dir: str = CHECKPOINT_DIR,
+                      registro: Optional[RegistroEquipos] = None) -> Optional['MotorElo']:
+        """
+        Carga el checkpoint más reciente (None si no hay ninguno). Los nombres
+        se resuelven con el registro, así que los checkpoints anteriores al
+        registro quedan con nombres canónicos; si guardaban varios alias de un
+        mismo equipo, sus ratings se fusionan en uno (la media).
+        """
+        checkpoints = sorted(glob.glob(os.path.join(checkpoint_dir, 'elo_*.npz')))
+        if not checkpoints:
+            return None
+        with np.load(checkpoints[-1]) as datos:
+            motor = cls(registro=registro)
+            canonicos, primera, fila = np.unique(motor.registro.canonicos(datos['equipos']),
+                                                 return_index=True, return_inverse=True)
+            # Orden de primera aparición en el checkpoint, posiciones contiguas
+            orden = np.argsort(primera, kind='stable')
+            posicion = np.empty(len(orden), dtype=np.intp)
+            posicion[orden] = np.arange(len(orden))
+            fila = posicion[fila.ravel()]
+            ratings = datos['ratings'].astype(float)
+            motor.indice = {str(canonicos[k]): pos for pos, k in enumerate(orden.tolist())}
+            motor.ratings = np.bincount(fila, ratings, len(orden)) / np.bincount(fila, minlength=len(orden))
+            motor.fecha = np.datetime64(str(datos['fecha']), 'D')
+            motor.claves_fecha = set(datos['claves_fecha'].tolist()) if 'claves_fecha' in datos.files else None
+            motor.partidos_procesados = int(datos['partidos'])
+        return motor
+
+
+def main():
+    """Aplica los resultados nuevos sobre el último checkpoint"""
+    resultados_path = sys.argv[1] if len(sys.argv) > 1 else RESULTADOS_PATH
+    checkpoint_dir = os.getenv('ELO_CHECKPOINT_DIR', CHECKPOINT_DIR)
+
+    motor = MotorElo.cargar_ultimo(checkpoint_dir) or MotorElo()
+    nuevos = motor.procesar(cargar_resultados(resultados_path), checkpoint_dir)
+
+    print(f"✅ ELO actualizado: {nuevos} partidos nuevos ({motor.partidos_procesados} en total)")
+    print(f"📅 Último partido: {motor.fecha}")
+    print(f"💾 Checkpoints en: {checkpoint_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Motor en vivo (in-play) sobre las lambdas pre-partido
+- Parte de las lambdas de calculate_lambda_values y las escala por el tiempo
+  que queda: goles restantes ~ Poisson(λ · fracción restante), con un perfil
+  de intensidad creciente (la segunda parte concentra ~55% de los goles)
+- Goles: desplazan los goles restantes necesarios para cada mercado
+- Rojas: el equipo con una expulsión marca menos y el rival más desde ese minuto
+- Corrección Dixon-Coles en las celdas de marcador final bajo: en el minuto 0
+  la matriz coincide con la pre-partido
+- Cada evento reprecia 1X2, Over/Under y BTTS de TODOS los partidos en juego
+  desde las marginales Poisson, sin matriz de marcadores (muy por debajo de 1 ms)
+- Eventos JSONL desde un fichero (opcionalmente siguiéndolo como tail -f) o
+  desde un socket TCP local que hace de feed en vivo:
+  {"partido": 1, "tipo": "gol", "equipo": "local", "minuto": 23}
+  tipos: minuto | gol | roja | final
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+import numpy as np
+from typing import Dict, Iterator, List, Optional
+
+from dixon_coles import TAU_MAX, TAU_MIN, goles_necesarios
+from kernel_poisson import pmf_tabla
+
+DURACION = 90
+# Intensidad de gol relativa λ(t) ∝ 1 + PERFIL_INTENSIDAD·(t/90 - 1/2)
+PERFIL_INTENSIDAD = 0.4
+# Multiplicadores de la tasa de gol restante por cada expulsión
+FACTOR_ROJA_PROPIO = 0.67
+FACTOR_ROJA_RIVAL = 1.25
+MAX_ROJAS = 3
+LINEAS_OVER = (0.5, 1.5, 2.5, 3.5, 4.5)
+EQUIPOS_EVENTO = {'local': 0, 'visitante': 1}
+# Marcadores finales con corrección Dixon-Coles, en el orden de tau: 0-0, 0-1, 1-0, 1-1
+CELDAS_TAU = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+
+
+def fraccion_restante(minuto) -> np.ndarray:
+    """Fracción de los goles esperados del partido que queda por jugarse a partir de 'minuto'"""
+    t = np.clip(np.asarray(minuto, dtype=float), 0, DURACION) / DURACION
+    jugada = t + PERFIL_INTENSIDAD * (t * t - t) / 2
+    return 1 - jugada
+
+
+class MotorEnVivo:
+    """Estado y probabilidades en vivo de N partidos (arrays por partido)"""
+
+    def __init__(self, ids: List[int], lambdas: np.ndarray, rho: float = 0.10,
+                 max_goals: Optional[int] = None):
+        """
+        ids: id de cada partido (el de TablaPartidos); lambdas: array (N, 2)
+        de goles esperados pre-partido (local, visitante)
+        """
+        self.ids = list(ids)
+        self.posicion = {partido_id: k for k, partido_id in enumerate(self.ids)}
+        self.lambdas = np.asarray(lambdas, dtype=float).reshape(-1, 2)
+        self.rho = rho
+        n = len(self.ids)
+        self.minuto = np.zeros(n)
+        self.goles = np.zeros((n, 2), dtype=np.int64)
+        self.rojas = np.zeros((n, 2), dtype=np.int64)
+        self.en_juego = np.ones(n, dtype=bool)
+        # Estado derivado que solo cambia con los eventos del propio partido
+        self._fraccion = np.ones(n)
+        self._factor_rojas = np.ones((n, 2))
+
+        # Rejilla fija para un partido entero con el rival expulsado (y que cubra las líneas de over)
+        if max_goals is None:
+            max_goals = goles_necesarios(self.lambdas * FACTOR_ROJA_RIVAL) if n else 0
+        max_goals = max(max_goals, int(max(LINEAS_OVER)) + 1)
+        self.max_goals = max_goals
+        self._columnas = np.arange(max_goals + 3)
+        self._lineas = np.array(LINEAS_OVER)
+
+        self.prob_1x2 = np.zeros((n, 3))
+        self.prob_over = np.zeros((n, len(LINEAS_OVER)))
+        self.prob_btts = np.zeros(n)
+        self.repreciar()
+
+    @classmethod
+    def desde_analizador(cls, analyzer, max_goals: Optional[int] = None) -> 'MotorEnVivo':
+        """Lambdas pre-partido y rho del analizador para todos sus partidos"""
+        lambdas = np.array([analyzer.calculate_lambda_values(p) for p in analyzer.partidos]).reshape(-1, 2)
+        return cls(analyzer.partidos.datos['id'].tolist(), lambdas, analyzer.rho, max_goals)
+
+    def lambdas_restantes(self, indices: np.ndarray) -> np.ndarray:
+        """Goles esperados desde el minuto actual hasta el final, con las rojas aplicadas"""
+        return self.lambdas[indices] * self._factor_rojas[indices] * self._fraccion[indices, None]
+
+    def repreciar(self, indices: Optional[np.ndarray] = None):
+        """
+        Recalcula 1X2, Over/Under y BTTS de los partidos indicados (por defecto,
+        los que siguen en juego) sin construir la matriz de marcadores: los goles
+        restantes son Poisson independientes salvo la corrección tau, que solo toca
+        las (hasta 4) celdas cuyo marcador final cae en {0,1}×{0,1}. Cada mercado
+        es su parte independiente (marginales, O(n·G)) más esas celdas, y se
+        normaliza como la matriz pre-partido: en el minuto 0 coincide con ella.
+        """
+        if indices is None:
+            indices = np.nonzero(self.en_juego)[0]
+        if not len(indices):
+            return
+        n, ancho = len(indices), self.max_goals + 2
+        restantes = self.lambdas_restantes(indices)
+        lam, mu = restantes[:, 0], restantes[:, 1]
+        goles = self.goles[indices]
+
+        # PMF local, visitante y total restante en una tabla con un 0 a cada lado:
+        # la columna k + 1 es P(X = k) y las posiciones fuera de rango leen 0
+        tabla = np.zeros((3, n, ancho + 1))
+        tabla[:, :, 1:-1] = pmf_tabla(np.concatenate([lam, mu, lam + mu]), ancho - 2).reshape(3, n, -1)
+        cdf = np.cumsum(tabla, axis=2)
+        pmf_local, pmf_visitante = tabla[0], tabla[1]
+        filas, columnas = np.arange(n)[:, None], self._columnas[None, :]
+
+        # Parte independiente. 1X2: el local gana si sus goles restantes superan
+        # a los del rival en más de la desventaja actual (suma tipo Skellam)
+        desventaja = (goles[:, 1] - goles[:, 0])[:, None]
+        desplazadas = np.minimum(np.maximum(columnas - desventaja, 0), ancho)
+        local = (pmf_local * cdf[1][filas, np.maximum(desplazadas - 1, 0)]).sum(axis=1)
+        empate = (pmf_local * pmf_visitante[filas, desplazadas]).sum(axis=1)
+        # Over: el total restante es Poisson(λ + μ); líneas desplazadas por los goles ya marcados
+        umbral = np.floor(self._lineas[None, :] - goles.sum(axis=1)[:, None]).astype(int)
+        over = 1 - cdf[2][filas, np.minimum(np.maximum(umbral + 1, 0), ancho)]
+        # BTTS: quien aún no ha marcado necesita al menos un gol restante
+        sin_marcar = goles == 0
+        btts = (1 - sin_marcar[:, 0] * pmf_local[:, 1]) * (1 - sin_marcar[:, 1] * pmf_visitante[:, 1])
+
+        # Celdas con corrección tau: (tau - 1) · p(i) · p(j) a cada mercado que las contiene
+        tau = np.clip(1 + self.rho * np.stack([-lam * mu, lam, mu, -np.ones(n)], axis=1), TAU_MIN, TAU_MAX)
+        i = CELDAS_TAU[None, :, 0] - goles[:, :1]
+        j = CELDAS_TAU[None, :, 1] - goles[:, 1:]
+        delta = (tau - 1) * ((i >= 0) & (j >= 0)) \
+            * pmf_local[filas, np.maximum(i, 0) + 1] * pmf_visitante[filas, np.maximum(j, 0) + 1]
+        masa = 1 + delta.sum(axis=1)
+        local += (delta * (i - j > desventaja)).sum(axis=1)
+        empate += (delta * (i - j == desventaja)).sum(axis=1)
+        over += (delta[:, :, None] * ((i + j)[:, :, None] > umbral[:, None, :])).sum(axis=1)
+        btts += delta[:, 3]
+
+        local, empate = local / masa, empate / masa
+        self.prob_1x2[indices] = np.stack([local, empate, np.maximum(1 - local - empate, 0)], axis=1)
+        self.prob_over[indices] = np.minimum(np.maximum(over / masa[:, None], 0), 1)
+        self.prob_btts[indices] = np.minimum(np.maximum(btts / masa, 0), 1)
+
+    def aplicar(self, evento: Dict) -> int:
+        """Actualiza el estado del partido del evento; devuelve su posición"""
+        idx = self.posicion.get(evento.get('partido'))
+        if idx is None:
+            raise ValueError(f"Partido desconocido en el evento: {evento}")
+        tipo = evento.get('tipo')
+        if tipo not in ('minuto', 'gol', 'roja', 'final'):
+            raise ValueError(f"Tipo de evento desconocido: {evento}")
+        equipo = EQUIPOS_EVENTO.get(evento.get('equipo'))
+        if tipo in ('gol', 'roja') and equipo is None:
+            raise ValueError(f"Equipo inválido en el evento: {evento}")
+
+        # El reloj nunca retrocede (eventos fuera de orden en el feed)
+        if 'minuto' in evento:
+            self.minuto[idx] = max(self.minuto[idx], float(evento['minuto']))
+        if tipo == 'gol':
+            self.goles[idx, equipo] += 1
+        elif tipo == 'roja':
+            self.rojas[idx, equipo] = min(self.rojas[idx, equipo] + 1, MAX_ROJAS)
+            rojas = self.rojas[idx]
+            self._factor_rojas[idx] = FACTOR_ROJA_PROPIO ** rojas * FACTOR_ROJA_RIVAL ** rojas[::-1]
+        elif tipo == 'final':
+            self.minuto[idx] = DURACION
+            self.en_juego[idx] = False
+        self._fraccion[idx] = fraccion_restante(self.minuto[idx])
+        return idx
+
+    def procesar(self, evento: Dict) -> int:
+        """Aplica el evento y reprecia todos los partidos en juego (y el que acaba de terminar)"""
+        idx = self.aplicar(evento)
+        indices = np.nonzero(self.en_juego)[0]
+        if not self.en_juego[idx]:
+            indices = np.append(indices, idx)
+        self.repreciar(indices)
+        return idx
+
+    def mercados(self, idx: int) -> Dict:
+        """Probabilidades en % y cuotas justas del partido idx"""
+        local, empate, visitante = (round(float(p) * 100, 2) for p in self.prob_1x2[idx])
+        over = {f"{linea}": round(float(p) * 100, 2) for linea, p in zip(LINEAS_OVER, self.prob_over[idx])}
+        btts = round(float(self.prob_btts[idx]) * 100, 2)
+        return {
+            'id': self.ids[idx],
+            'minuto': int(self.minuto[idx]),
+            'marcador': f"{self.goles[idx, 0]}-{self.goles[idx, 1]}",
+            'rojas': self.rojas[idx].tolist(),
+            'en_juego': bool(self.en_juego[idx]),
+            '1X2': {'local': local, 'empate': empate, 'visitante': visitante},
+            'over': over,
+            'btts': btts,
+            'cuotas_justas': {
+                '1': round(100 / local, 2) if local > 0 else None,
+                'X': round(100 / empate, 2) if empate > 0 else None,
+                '2': round(100 / visitante, 2) if visitante > 0 else None,
+            },
+        }
+
+
+def eventos_fichero(path: str, seguir: bool = False, espera: float = 0.05) -> Iterator[Dict]:
+    """Eventos JSONL de un fichero; seguir=True espera nuevas líneas como tail -f"""
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            linea = f.readline()
+            if not linea:
+                if not seguir:
+                    return
+                time.sleep(espera)
+                continue
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def eventos_socket(puerto: int, host: str = '127.0.0.1') -> Iterator[Dict]:
+    """
+    Eventos JSONL de un socket TCP local (sustituto del feed en vivo): atiende
+    una conexión tras otra hasta recibir {"tipo": "cerrar"}
+    """
+    with socket.create_server((host, puerto)) as servidor:
+        while True:
+            conexion, _ = servidor.accept()
+            with conexion, conexion.makefile('r', encoding='utf-8') as lector:
+                for linea in lector:
+                    if not linea.strip():
+                        continue
+                    evento = json.loads(linea)
+                    if evento.get('tipo') == 'cerrar':
+                        return
+                    yield evento
+
+
+def main():
+    """
+    Reprecia en vivo los partidos de las jornadas cargadas.
+    EN_VIVO_EVENTOS: fichero JSONL de eventos (EN_VIVO_SEGUIR=1 lo sigue como tail -f)
+    EN_VIVO_PUERTO: alternativa, escucha eventos JSONL en 127.0.0.1:<puerto>
+    EN_VIVO_SALIDA: si se indica, escribe ahí el estado de todos los partidos tras cada evento
+    """
+    from ajuste_dixon_coles import AjustadorDixonColes
+    from betting_analyzer import AdvancedBettingAnalyzer
+
+    ruta_eventos = sys.argv[1] if len(sys.argv) > 1 else os.getenv('EN_VIVO_EVENTOS')
+    puerto = os.getenv('EN_VIVO_PUERTO')
+    if not ruta_eventos and not puerto:
+        print(main.__doc__)
+        sys.exit(1)
+    salida_path = os.getenv('EN_VIVO_SALIDA')
+
+    parametros_dc = AjustadorDixonColes.cargar(os.getenv('PARAMETROS_DC_PATH', 'data/parametros_dc.json'))
+    analyzer = AdvancedBettingAnalyzer(parametros_dc=parametros_dc)
+    motor = MotorEnVivo.desde_analizador(analyzer)
+    nombres = {partido['id']: f"{partido['local']} vs {partido['visitante']}" for partido in analyzer.partidos}
+    print(f"⚽ Motor en vivo: {len(motor.ids)} partidos, rejilla de {motor.max_goals + 1} goles")
+
+    eventos = eventos_socket(int(puerto)) if puerto else \
+        eventos_fichero(ruta_eventos, seguir=os.getenv('EN_VIVO_SEGUIR') == '1')
+    latencias = []
+    for evento in eventos:
+        inicio = time.perf_counter()
+        try:
+            idx = motor.procesar(evento)
+        except ValueError as e:
+            print(f"⚠️  {e}")
+            continue
+        latencias.append(time.perf_counter() - inicio)
+
+        estado = motor.mercados(idx)
+        prob = estado['1X2']
+        print(f"{estado['minuto']:>3}' {nombres[estado['id']]} {estado['marcador']} | "
+              f"1 {prob['local']:5.1f}% X {prob['empate']:5.1f}% 2 {prob['visitante']:5.1f}% | "
+              f"O2.5 {estado['over']['2.5']:5.1f}% | BTTS {estado['btts']:5.1f}% | "
+              f"{latencias[-1] * 1e6:.0f} µs")
+        if salida_path:
+            with open(salida_path, 'w', encoding='utf-8') as f:
+                json.dump({'partidos': [motor.mercados(k) for k in range(len(motor.ids))]}, f, ensure_ascii=False)
+
+    if latencias:
+        ms = np.array(latencias) * 1000
+        print(f"\n⏱️  {len(ms)} eventos | p50 {np.percentile(ms, 50):.3f} ms | "
+              f"p99 {np.percentile(ms, 99):.3f} ms | máx {ms.max():.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
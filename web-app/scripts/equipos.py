@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Registro canónico de equipos con ids enteros estables
+- Cada equipo tiene un id (su posición en data/equipos.json, nunca se
+  reutiliza), un nombre canónico y sus alias (nombres de API, sin tildes, ...)
+- Índice de alias normalizados -> id: búsqueda O(1); la normalización quita
+  tildes, mayúsculas, puntuación y siglas de club (CF, FC, UD, RCD, ...)
+- Ids de proveedores externos ('api-football:541') en el mismo registro
+- Partidos, cuotas, ELO y resultados se unen por id: clave_partido y unir
+  hacen el cruce exacto de arrays con searchsorted
+"""
+
+import json
+import os
+import re
+import sys
+import unicodedata
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+EQUIPOS_PATH = 'data/equipos.json'
+# Siglas que no distinguen equipos: "Sevilla FC" == "Sevilla", "Atlético de Madrid" == "Atlético Madrid"
+SIGLAS_CLUB = frozenset(('cf', 'fc', 'ud', 'cd', 'sd', 'rcd', 'rc', 'ca', 'bp', 'ad', 'sad', 'club', 'de', 'del'))
+BITS_EQUIPO = 20
+
+
+def normalizar(nombre: str) -> str:
+    """Clave de alias: sin tildes, minúsculas, sin puntuación ni siglas de club"""
+    sin_tildes = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode('ascii')
+    palabras = re.sub(r'[^a-z0-9]+', ' ', sin_tildes.lower()).split()
+    return ' '.join(p for p in palabras if p not in SIGLAS_CLUB) or ' '.join(palabras)
+
+
+class RegistroEquipos:
+    """Equipos por id entero; alias y ids externos resueltos en O(1)"""
+
+    def __init__(self):
+        self.nombres: List[str] = []
+        self.ligas: List[Optional[str]] = []
+        self.alias: List[List[str]] = []
+        self.indice: Dict[str, int] = {}
+        self.externos: Dict[str, int] = {}
+        self.modificado = False
+        self._exactos: Dict[str, int] = {}  # nombre tal cual -> id, evita normalizar de nuevo
+
+    @classmethod
+    def cargar(cls, path: str = EQUIPOS_PATH) -> 'RegistroEquipos':
+        """Registro vacío si el fichero no existe"""
+        registro = cls()
+        if not os.path.exists(path):
+            return registro
+        with open(path, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        for ident, equipo in enumerate(datos['equipos']):
+            if equipo['id'] != ident:
+                raise ValueError(f"Ids no consecutivos en {path}: {equipo['id']} en la posición {ident}")
+            registro.registrar(equipo['nombre'], equipo.get('liga'), equipo.get('alias', ()))
+        registro.externos.update(datos.get('externos', {}))
+        registro.modificado = False
+        return registro
+
+    def guardar(self, path: str = EQUIPOS_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        equipos = [{'id': ident, 'nombre': nombre, 'liga': liga, 'alias': alias}
+                   for ident, (nombre, liga, alias) in enumerate(zip(self.nombres, self.ligas, self.alias))]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'equipos': equipos, 'externos': self.externos}, f, ensure_ascii=False, indent=2)
+        self.modificado = False
+
+    def registrar(self, nombre: str, liga: Optional[str] = None, alias: Iterable[str] = ()) -> int:
+        """Equipo nuevo con su nombre canónico; devuelve su id"""
+        if normalizar(nombre) in self.indice:
+            raise ValueError(f"'{nombre}' ya está registrado como '{self.nombres[self.buscar(nombre)]}'")
+        ident = len(self.nombres)
+        self.nombres.append(nombre)
+        self.ligas.append(liga)
+        self.alias.append([])
+        self.indice[normalizar(nombre)] = ident
+        for otro in alias:
+            self.anadir_alias(ident, otro)
+        self.modificado = True
+        return ident
+
+    def anadir_alias(self, ident: int, alias: str):
+        clave = normalizar(alias)
+        previo = self.indice.setdefault(clave, ident)
+        if previo != ident:
+            raise ValueError(f"El alias '{alias}' ya pertenece a '{self.nombres[previo]}'")
+        if alias != self.nombres[ident] and alias not in self.alias[ident]:
+            self.alias[ident].append(alias)
+            self.modificado = True
+
+    def anadir_externo(self, fuente: str, externo, ident: int):
+        """Id de un proveedor ('api-football', 541) -> id del registro"""
+        clave = f"{fuente}:{externo}"
+        if self.externos.get(clave) != ident:
+            self.externos[clave] = ident
+            self.modificado = True
+
+    def buscar(self, nombre: str) -> Optional[int]:
+        """Id del equipo o None si ningún alias coincide"""
+        ident = self._exactos.get(nombre)
+        if ident is None:
+            ident = self.indice.get(normalizar(nombre))
+            if ident is not None:
+                self._exactos[nombre] = ident
+        return ident
+
+    def buscar_externo(self, fuente: str, externo) -> Optional[int]:
+        return self.externos.get(f"{fuente}:{externo}")
+
+    def id(self, nombre: str) -> int:
+        """Id del equipo; los nombres desconocidos se registran como equipos nuevos"""
+        ident = self.buscar(nombre)
+        return self.registrar(nombre) if ident is None else ident
+
+    def ids(self, nombres: Iterable[str], registrar: bool = True) -> np.ndarray:
+        """
+        Ids de un array de nombres (una búsqueda por nombre distinto).
+        registrar=False: los desconocidos dan -1 en lugar de registrarse.
+        """
+        nombres = np.asarray(list(nombres) if not isinstance(nombres, np.ndarray) else nombres)
+        if not len(nombres):
+            return np.zeros(0, dtype=np.int32)
+        unicos, inverso = np.unique(nombres, return_inverse=True)
+        if registrar:
+            ids = [self.id(str(nombre)) for nombre in unicos]
+        else:
+            ids = [-1 if ident is None else ident for ident in map(self.buscar, unicos.tolist())]
+        return np.array(ids, dtype=np.int32)[inverso.ravel()]
+
+    def canonico(self, nombre: str) -> str:
+        return self.nombres[self.id(nombre)]
+
+    def canonicos(self, nombres: np.ndarray) -> np.ndarray:
+        """Array de nombres -> nombres canónicos (una búsqueda por nombre distinto)"""
+        if not len(nombres):
+            return np.asarray(nombres)
+        ids = self.ids(nombres)  # antes de leer self.nombres: puede registrar equipos nuevos
+        return np.array(self.nombres)[ids]
+
+    def __len__(self) -> int:
+        return len(self.nombres)
+
+    def __getstate__(self):
+        # Los workers reciben el registro sin la memo de nombres exactos
+        return {**self.__dict__, '_exactos': {}}
+
+
+def clave_partido(local: np.ndarray, visitante: np.ndarray) -> np.ndarray:
+    """Clave entera (local, visitante): única por competición y temporada"""
+    return np.asarray(local, dtype=np.int64) << BITS_EQUIPO | np.asarray(visitante, dtype=np.int64)
+
+
+def unir(claves: np.ndarray, referencia: np.ndarray) -> np.ndarray:
+    """Posición de cada clave en referencia (-1 si no está), O((n + m) log m)"""
+    claves, referencia = np.asarray(claves), np.asarray(referencia)
+    if not len(referencia):
+        return np.full(len(claves), -1, dtype=np.intp)
+    orden = np.argsort(referencia, kind='stable')
+    posicion = np.minimum(np.searchsorted(referencia, claves, sorter=orden), len(referencia) - 1)
+    encontrada = referencia[orden[posicion]] == claves
+    return np.where(encontrada, orden[posicion], -1)
+
+
+_REGISTRO_DEFECTO: Optional[RegistroEquipos] = None
+
+
+def registro_por_defecto() -> RegistroEquipos:
+    """Registro compartido por todos los scripts (EQUIPOS_PATH), cargado la primera vez que se usa"""
+    global _REGISTRO_DEFECTO
+    if _REGISTRO_DEFECTO is None:
+        _REGISTRO_DEFECTO = RegistroEquipos.cargar(os.getenv('EQUIPOS_PATH', EQUIPOS_PATH))
+    return _REGISTRO_DEFECTO
+
+
+def main():
+    """
+    python scripts/equipos.py <nombre> [...]          id y nombre canónico de cada nombre
+    python scripts/equipos.py alias <nombre> <alias>  añade un alias a un equipo existente
+    """
+    if len(sys.argv) < 2:
+        print(main.__doc__)
+        sys.exit(1)
+
+    path = os.getenv('EQUIPOS_PATH', EQUIPOS_PATH)
+    registro = RegistroEquipos.cargar(path)
+    if sys.argv[1] == 'alias' and len(sys.argv) == 4:
+        ident = registro.buscar(sys.argv[2])
+        if ident is None:
+            print(f"❌ Equipo desconocido: {sys.argv[2]}")
+            sys.exit(1)
+        registro.anadir_alias(ident, sys.argv[3])
+        registro.guardar(path)
+        print(f"💾 '{sys.argv[3]}' -> {registro.nombres[ident]} (id {ident})")
+        return
+
+    for nombre in sys.argv[1:]:
+        ident = registro.buscar(nombre)
+        if ident is None:
+            print(f"   {nombre}: sin registrar")
+        else:
+            print(f"   {nombre}: {registro.nombres[ident]} (id {ident}, {registro.ligas[ident]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Estado incremental de una liga (clasificación, goles y forma por equipo)
+- Se alimenta resultado a resultado en orden cronológico
+- Construye partidos con el mismo formato que los datos de la jornada
+  (TablaPartidos, registros.py) a partir solo de los resultados ya
+  aplicados (sin fuga de datos)
+"""
+
+import numpy as np
+from typing import Dict, List
+
+from registros import TablaPartidos, DTYPE_PARTIDO
+
+LETRA_FORMA = {3: 'V', 1: 'E', 0: 'D'}
+
+
+class EstadoLiga:
+    """Estadísticas acumuladas por equipo de una temporada"""
+
+    def __init__(self, equipos=()):
+        self.stats: Dict[str, Dict] = {}
+        for equipo in equipos:
+            self._equipo(equipo)
+
+    def _equipo(self, equipo: str) -> Dict:
+        if equipo not in self.stats:
+            self.stats[equipo] = {'pts': 0, 'gf': 0, 'gc': 0, 'ultimos': []}
+        return self.stats[equipo]
+
+    def aplicar(self, local: str, visitante: str, goles_local: int, goles_visitante: int):
+        pts_loc, pts_vis = ((3, 0) if goles_local > goles_visitante else
+                            (0, 3) if goles_local < goles_visitante else (1, 1))
+        for equipo, pts, favor, contra in ((local, pts_loc, goles_local, goles_visitante),
+                                           (visitante, pts_vis, goles_visitante, goles_local)):
+            stats = self._equipo(equipo)
+            stats['pts'] += pts
+            stats['gf'] += favor
+            stats['gc'] += contra
+            stats['ultimos'].append(pts)
+
+    def posiciones(self) -> Dict[str, int]:
+        ranking = sorted(sorted(self.stats),
+                         key=lambda e: (-self.stats[e]['pts'], -(self.stats[e]['gf'] - self.stats[e]['gc'])))
+        return {e: k + 1 for k, e in enumerate(ranking)}
+
+    def ultimos_5(self, equipo: str) -> List[int]:
+        # Más reciente primero, como en los datos de la jornada
+        return (self.stats[equipo]['ultimos'][-5:][::-1] + [1] * 5)[:5]
+
+    def partidos(self, calendario: List[Dict]) -> TablaPartidos:
+        """Completa cada partido del calendario con las estadísticas actuales"""
+        for p in calendario:
+            self._equipo(p['local'])
+            self._equipo(p['visitante'])
+        posicion = self.posiciones()
+
+        partidos = TablaPartidos(np.zeros(len(calendario), dtype=DTYPE_PARTIDO))
+        datos, textos = partidos.datos, partidos.textos
+        # El CSV de calendario no trae id: correlativo como en la jornada
+        datos['id'] = [p['id'] if 'id' in p else k + 1 for k, p in enumerate(calendario)]
+        datos['jornada'] = [p.get('jornada') or 0 for p in calendario]
+        for campo in ('fecha', 'hora', 'estadio', 'liga'):
+            datos[campo] = textos.ids(p.get(campo, '') for p in calendario)
+        for lado in ('local', 'visitante'):
+            equipos = [p[lado] for p in calendario]
+            stats = [self.stats[e] for e in equipos]
+            forma = [self.ultimos_5(e) for e in equipos]
+            datos[lado] = partidos.equipos.ids(equipos)
+            datos[f'{lado}_pos'] = [posicion[e] for e in equipos]
+            datos[f'{lado}_goles_favor'] = [s['gf'] for s in stats]
+            datos[f'{lado}_goles_contra'] = [s['gc'] for s in stats]
+            datos[f'{lado}_ultimos_5'] = np.array(forma, dtype=np.int8).reshape(-1, 5)
+            datos[f'{lado}_forma'] = textos.ids(''.join(LETRA_FORMA[x] for x in f) for f in forma)
+        return partidos
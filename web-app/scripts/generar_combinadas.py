@@ -7,11 +7,20 @@ Sistema Automático de Generación de Combinadas
 """
 
 import json
+import os
 import random
 from datetime import datetime
 from typing import List, Dict, Set, Tuple
 from itertools import combinations
 
+from salida_web import escribir_artefacto
+from registros import PickCombinable
+from perfilado import PERFILADOR, PERFILADO_DIR, activar_desde_entorno, imprimir_resumen
+
+# Métodos instrumentados con PERFILADO=1 / --perfilar (perfilado.py)
+ETAPAS_COMBINADAS = ('extraer_picks_alta_probabilidad', 'generar_combinada', 'generar_todas_combinadas',
+                     'guardar_combinadas', 'agregar_a_historial')
+
 class CombinadorAutomatico:
     """Genera combinadas inteligentes sin repeticiones"""
     
@@ -23,75 +32,35 @@ class CombinadorAutomatico:
         self.combinadas_generadas = []
         self.picks_usados_global = set()  # Para evitar repeticiones globales
         
-    def extraer_picks_alta_probabilidad(self):
+    def extraer_picks_alta_probabilidad(self) -> List[PickCombinable]:
         """Extrae solo picks con 70%+ de confianza y que tengan cuota"""
         picks_filtrados = []
         
-        # Procesar Primera División
-        for partido in self.data['jornada']['primera_division']['partidos']:
-            for pick in partido['picks']:
-                if pick['confianza'] >= 70.0 and pick.get('cuota_mercado') and pick.get('apostar'):
-                    pick_id = f"{partido['local']}_vs_{partido['visitante']}_{pick['tipo']}_{pick['prediccion']}"
-                    picks_filtrados.append({
-                        'id': pick_id,
-                        'partido': f"{partido['local']} vs {partido['visitante']}",
-                        'competicion': 'LaLiga',
-                        'pick_tipo': pick['tipo'],
-                        'prediccion': pick['prediccion'],
-                        'confianza': pick['confianza'],
-                        'cuota': pick['cuota_mercado'],
-                        'fecha': partido['fecha'],
-                        'hora': partido['hora']
-                    })
-        
-        # Procesar Segunda División
-        for partido in self.data['jornada']['segunda_division']['partidos']:
-            for pick in partido['picks']:
-                if pick['confianza'] >= 70.0 and pick.get('cuota_mercado') and pick.get('apostar'):
-                    pick_id = f"{partido['local']}_vs_{partido['visitante']}_{pick['tipo']}_{pick['prediccion']}"
-                    picks_filtrados.append({
-                        'id': pick_id,
-                        'partido': f"{partido['local']} vs {partido['visitante']}",
-                        'competicion': 'Segunda',
-                        'pick_tipo': pick['tipo'],
-                        'prediccion': pick['prediccion'],
-                        'confianza': pick['confianza'],
-                        'cuota': pick['cuota_mercado'],
-                        'fecha': partido['fecha'],
-                        'hora': partido['hora']
-                    })
-        
-        # Procesar Copa del Rey si existe
+        # Primera División, Segunda División y Copa del Rey si existe
+        bloques = [(self.data['jornada']['primera_division'], 'LaLiga'),
+                   (self.data['jornada']['segunda_division'], 'Segunda')]
         if 'copa_del_rey' in self.data and self.data['copa_del_rey']:
-            for partido in self.data['copa_del_rey']['partidos']:
+            bloques.append((self.data['copa_del_rey'], 'Copa del Rey'))
+        
+        for bloque, competicion in bloques:
+            for partido in bloque['partidos']:
                 for pick in partido['picks']:
                     if pick['confianza'] >= 70.0 and pick.get('cuota_mercado') and pick.get('apostar'):
-                        pick_id = f"{partido['local']}_vs_{partido['visitante']}_{pick['tipo']}_{pick['prediccion']}"
-                        picks_filtrados.append({
-                            'id': pick_id,
-                            'partido': f"{partido['local']} vs {partido['visitante']}",
-                            'competicion': 'Copa del Rey',
-                            'pick_tipo': pick['tipo'],
-                            'prediccion': pick['prediccion'],
-                            'confianza': pick['confianza'],
-                            'cuota': pick['cuota_mercado'],
-                            'fecha': partido['fecha'],
-                            'hora': partido['hora']
-                        })
+                        picks_filtrados.append(PickCombinable(partido, pick, competicion))
         
         # Ordenar por confianza descendente
-        picks_filtrados.sort(key=lambda x: x['confianza'], reverse=True)
+        picks_filtrados.sort(key=lambda x: x.confianza, reverse=True)
         
         print(f"✅ {len(picks_filtrados)} picks con 70%+ confianza y cuota disponible")
         return picks_filtrados
     
-    def generar_combinada(self, num_picks: int, picks_pool: List[Dict], 
+    def generar_combinada(self, num_picks: int, picks_pool: List[PickCombinable], 
                          picks_prohibidos: Set[str]) -> Dict:
         """
         Genera UNA combinada sin usar picks prohibidos
         """
         # Filtrar picks disponibles (no usados)
-        picks_disponibles = [p for p in picks_pool if p['id'] not in picks_prohibidos]
+        picks_disponibles = [p for p in picks_pool if p.id not in picks_prohibidos]
         
         if len(picks_disponibles) < num_picks:
             print(f"⚠️  Solo quedan {len(picks_disponibles)} picks, no se puede crear combinada de {num_picks}")
@@ -103,7 +72,7 @@ class CombinadorAutomatico:
         
         for pick in picks_disponibles:
             # Extraer nombre del partido base (sin "vs")
-            partido_key = pick['partido']
+            partido_key = pick.partido
             
             # Si este partido ya está en la combinada, saltar
             if partido_key in partidos_usados:
@@ -124,12 +93,12 @@ class CombinadorAutomatico:
         prob_combinada = 1.0
         
         for pick in picks_seleccionados:
-            cuota_total *= pick['cuota']
-            prob_combinada *= (pick['confianza'] / 100)
+            cuota_total *= pick.cuota
+            prob_combinada *= (pick.confianza / 100)
         
         # Marcar estos picks como usados globalmente
         for pick in picks_seleccionados:
-            picks_prohibidos.add(pick['id'])
+            picks_prohibidos.add(pick.id)
         
         return {
             'picks': picks_seleccionados,
@@ -192,17 +161,17 @@ class CombinadorAutomatico:
                 'num_picks': combo['num_picks'],
                 'picks': [
                     {
-                        'partido': p['partido'],
-                        'competicion': p['competicion'],
-                        'pick': f"{p['pick_tipo']}: {p['prediccion']}",
-                        'cuota': p['cuota'],
-                        'confianza': p['confianza'],
-                        'fecha': p['fecha'],
-                        'hora': p['hora']
+                        'partido': p.partido,
+                        'competicion': p.competicion,
+                        'pick': f"{p.pick_tipo}: {p.prediccion}",
+                        'cuota': p.cuota,
+                        'confianza': p.confianza,
+                        'fecha': p.fecha,
+                        'hora': p.hora
                     }
                     for p in combo['picks']
                 ],
-                'edge_promedio': round(sum(p['confianza'] for p in combo['picks']) / len(combo['picks']) - 50, 1),
+                'edge_promedio': round(sum(p.confianza for p in combo['picks']) / len(combo['picks']) - 50, 1),
                 'kelly_sugerido': round(kelly_sugerido, 1),
                 'roi_esperado': round(roi_esperado, 1),
                 'categoria': categoria,
@@ -237,8 +206,7 @@ class CombinadorAutomatico:
             'nota': 'Todas las combinadas usan picks DIFERENTES. Sin repeticiones.'
         }
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        escribir_artefacto(output_file, data)
         
         print(f"\n💾 Guardado en {output_file}")
         print(f"📊 Estadísticas:")
@@ -331,8 +299,7 @@ class CombinadorAutomatico:
         historial['ultima_actualizacion'] = datetime.now().isoformat()
         
         # Guardar
-        with open(historial_file, 'w', encoding='utf-8') as f:
-            json.dump(historial, f, ensure_ascii=False, indent=2)
+        escribir_artefacto(historial_file, historial)
         
         print(f"\n📚 Historial actualizado: {len(combinadas)} combinadas añadidas")
 
@@ -344,6 +311,10 @@ def main():
     print("=" * 70)
     print()
     
+    # PERFILADO=1 o --perfilar: tiempos, llamadas y traza por etapa
+    if activar_desde_entorno():
+        PERFILADOR.instrumentar(CombinadorAutomatico, ETAPAS_COMBINADAS)
+    
     # Crear generador
     generador = CombinadorAutomatico('public/data/picks_complete.json')
     
@@ -370,6 +341,8 @@ def main():
     print("🎯 Todas las combinadas usan picks ÚNICOS (sin repetir)")
     print("✅ Solo picks con 70%+ de probabilidad")
     print("📊 Automáticamente guardadas en historial")
+    if PERFILADOR.activo:
+        imprimir_resumen(PERFILADOR.exportar('combinadas', os.getenv('PERFILADO_DIR', PERFILADO_DIR)))
 
 
 if __name__ == "__main__":
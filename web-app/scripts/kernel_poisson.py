@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Kernel Poisson nativo (sin scipy)
+- PMF/CDF vectorizadas sobre arrays de lambdas con una recurrencia en
+  espacio logarítmico: log p(k) = log p(k-1) + log λ - log k
+- Estable para lambdas grandes (sin factoriales ni productos que desborden)
+- scipy solo se usa aquí para la verificación numérica (python kernel_poisson.py)
+"""
+
+import subprocess
+import sys
+import numpy as np
+
+
+def log_pmf_tabla(lambdas, max_k: int) -> np.ndarray:
+    """log P(X = k) para k = 0..max_k: array (N, max_k + 1)"""
+    lambdas = np.atleast_1d(np.asarray(lambdas, dtype=float))
+    with np.errstate(divide='ignore'):
+        log_lam = np.log(lambdas)
+    incrementos = log_lam[:, None] - np.log(np.arange(1, max_k + 1))[None, :]
+    tabla = np.empty((lambdas.shape[0], max_k + 1))
+    tabla[:, 0] = -lambdas
+    tabla[:, 1:] = -lambdas[:, None] + np.cumsum(incrementos, axis=1)
+    return tabla
+
+
+def pmf_tabla(lambdas, max_k: int) -> np.ndarray:
+    """P(X = k) para k = 0..max_k: array (N, max_k + 1)"""
+    return np.exp(log_pmf_tabla(lambdas, max_k))
+
+
+def cdf_tabla(lambdas, max_k: int) -> np.ndarray:
+    """P(X <= k) para k = 0..max_k: array (N, max_k + 1)"""
+    return np.minimum(np.cumsum(pmf_tabla(lambdas, max_k), axis=1), 1.0)
+
+
+def pmf(k, lambdas) -> np.ndarray:
+    """P(X = k) con broadcasting entre k (enteros >= 0) y lambdas"""
+    k, lambdas = np.broadcast_arrays(np.asarray(k, dtype=int), np.asarray(lambdas, dtype=float))
+    tabla = pmf_tabla(lambdas.ravel(), int(k.max()) if k.size else 0)
+    return np.take_along_axis(tabla, k.reshape(-1, 1), axis=1).reshape(k.shape)
+
+
+def cdf(k, lambdas) -> np.ndarray:
+    """P(X <= k) con broadcasting entre k (enteros >= 0) y lambdas"""
+    k, lambdas = np.broadcast_arrays(np.asarray(k, dtype=int), np.asarray(lambdas, dtype=float))
+    tabla = cdf_tabla(lambdas.ravel(), int(k.max()) if k.size else 0)
+    return np.take_along_axis(tabla, k.reshape(-1, 1), axis=1).reshape(k.shape)
+
+
+def verificar_contra_scipy(tolerancia: float = 1e-12) -> float:
+    """Error absoluto máximo frente a scipy.stats.poisson en una rejilla amplia"""
+    from scipy.stats import poisson
+
+    lambdas = np.concatenate([[0.0], np.linspace(0.01, 12.0, 400), [25.0, 40.0]])
+    k = np.arange(60)
+    error = max(
+        np.abs(pmf_tabla(lambdas, 59) - poisson.pmf(k[None, :], lambdas[:, None])).max(),
+        np.abs(cdf_tabla(lambdas, 59) - poisson.cdf(k[None, :], lambdas[:, None])).max(),
+    )
+    assert error < tolerancia, f"Kernel Poisson difiere de scipy: {error:.2e}"
+    return float(error)
+
+
+def _arranque_en_frio(modulo: str, repeticiones: int = 5) -> float:
+    """Mediana del tiempo de import en un proceso nuevo (ms)"""
+    codigo = ("import sys, time; sys.path.insert(0, 'scripts'); t = time.perf_counter(); "
+              f"import {modulo}; print((time.perf_counter() - t) * 1000)")
+    tiempos = [float(subprocess.run([sys.executable, '-c', codigo], capture_output=True,
+                                    text=True, check=True).stdout) for _ in range(repeticiones)]
+    return float(np.median(tiempos))
+
+
+def main():
+    print(f"✅ Kernel Poisson vs scipy: error máximo {verificar_contra_scipy():.2e}")
+    antes = _arranque_en_frio('numpy, scipy.stats')
+    despues = _arranque_en_frio('betting_analyzer')
+    print(f"⏱️  Arranque en frío numpy + scipy.stats: {antes:.0f} ms")
+    print(f"⏱️  Arranque en frío betting_analyzer (sin scipy): {despues:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
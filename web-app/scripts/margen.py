@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Eliminación del margen de la casa (probabilidades justas) en batch
+- Entrada: libros completos como array (N, K) de cuotas decimales
+  (K = 3 para 1X2, K = 2 para BTTS / over-under)
+- Métodos: proporcional, potencia y Shin (1993), resueltos para todos los
+  libros a la vez (bisección vectorizada, sin bucles por partido)
+- Libros incompletos (alguna cuota NaN o <= 1) devuelven NaN
+"""
+
+import numpy as np
+
+METODOS = ('proporcional', 'potencia', 'shin')
+METODO_DEFECTO = 'shin'
+# Libros completos a partir de las selecciones de market_odds
+LIBROS = (
+    ('home', 'draw', 'away'),
+    ('btts_yes', 'btts_no'),
+    ('over25', 'under25'),
+)
+ITERACIONES = 60
+
+
+def _implicitas(cuotas) -> np.ndarray:
+    cuotas = np.atleast_2d(np.asarray(cuotas, dtype=float))
+    validas = np.all(cuotas > 1.0, axis=1, keepdims=True)
+    return np.where(validas, 1 / np.where(cuotas > 1.0, cuotas, 2.0), np.nan)
+
+
+def margen(cuotas) -> np.ndarray:
+    """Overround de cada libro: sum(1 / cuota) - 1"""
+    return _implicitas(cuotas).sum(axis=1) - 1
+
+
+def proporcional(cuotas) -> np.ndarray:
+    q = _implicitas(cuotas)
+    return q / q.sum(axis=1, keepdims=True)
+
+
+def potencia(cuotas) -> np.ndarray:
+    """p_i = q_i^k con k tal que sum(p) = 1 (penaliza más a los outsiders)"""
+    q = _implicitas(cuotas)
+    bajo = np.ones(len(q))
+    alto = np.full(len(q), 1.0)
+    # Cota superior: duplicar k hasta que la suma baje de 1
+    for _ in range(ITERACIONES):
+        pendientes = np.nansum(q ** alto[:, None], axis=1) > 1
+        if not pendientes.any():
+            break
+        alto = np.where(pendientes, alto * 2, alto)
+    for _ in range(ITERACIONES):
+        k = (bajo + alto) / 2
+        exceso = np.nansum(q ** k[:, None], axis=1) > 1
+        bajo = np.where(exceso, k, bajo)
+        alto = np.where(exceso, alto, k)
+    p = q ** ((bajo + alto) / 2)[:, None]
+    return p / p.sum(axis=1, keepdims=True)
+
+
+def _shin_p(q2s: np.ndarray, z: np.ndarray) -> np.ndarray:
+    z = z[:, None]
+    return (np.sqrt(z ** 2 + 4 * (1 - z) * q2s) - z) / (2 * (1 - z))
+
+
+def shin(cuotas) -> np.ndarray:
+    """
+    Modelo de Shin: z = proporción de apostantes informados. sum(p(z)) es
+    decreciente en z; se busca z en [0, 1) con sum(p) = 1 por bisección
+    """
+    q = _implicitas(cuotas)
+    q2s = q ** 2 / q.sum(axis=1, keepdims=True)
+    bajo = np.zeros(len(q))
+    alto = np.full(len(q), 0.999)
+    for _ in range(ITERACIONES):
+        z = (bajo + alto) / 2
+        exceso = _shin_p(q2s, z).sum(axis=1) > 1
+        bajo = np.where(exceso, z, bajo)
+        alto = np.where(exceso, alto, z)
+    p = _shin_p(q2s, (bajo + alto) / 2)
+    return p / p.sum(axis=1, keepdims=True)
+
+
+def probabilidades_justas(cuotas, metodo: str = METODO_DEFECTO) -> np.ndarray:
+    """Probabilidades sin margen (N, K) con el método indicado"""
+    if metodo == 'proporcional':
+        return proporcional(cuotas)
+    if metodo == 'potencia':
+        return potencia(cuotas)
+    if metodo == 'shin':
+        return shin(cuotas)
+    raise ValueError(f"Método de margen desconocido: {metodo}")
+
+
+def main():
+    """Ejemplo: margen y probabilidades justas de un libro 1X2"""
+    cuotas = np.array([[2.30, 3.20, 3.10], [1.35, 5.00, 8.00]])
+    print(f"Cuotas:\n{cuotas}")
+    print(f"Margen: {np.round(margen(cuotas) * 100, 2)}%")
+    for metodo in METODOS:
+        print(f"{metodo:>12}: {np.round(probabilidades_justas(cuotas, metodo), 4).tolist()}")
+
+
+if __name__ == "__main__":
+    main()
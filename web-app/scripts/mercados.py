@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Motor de derivación de mercados desde la matriz de marcadores
+- Una sola pasada por el tensor N×G×G: distribuciones de total de goles,
+  diferencia de goles y marginales por equipo
+- Todos los mercados salen de esas distribuciones con sumas acumuladas:
+  1X2, Doble Oportunidad, BTTS, Over/Under en todas las líneas .5,
+  Asian Handicap exacto (incluidas líneas de cuarto), goles exactos,
+  margen de victoria, totales por equipo y marcador exacto top-k
+"""
+
+import numpy as np
+from typing import Dict
+
+# Líneas de Asian Handicap aplicadas al equipo local (de -3.0 a +3.0 en cuartos)
+LINEAS_AH = np.arange(-12, 13) / 4
+TOP_MARCADORES = 5
+
+
+def _proyecciones(size: int):
+    """Matrices one-hot que llevan cada celda (i, j) a su total i+j y a su diferencia i-j"""
+    goles = np.arange(size)
+    total = (goles[:, None] + goles[None, :]).ravel()
+    diferencia = (goles[:, None] - goles[None, :]).ravel() + (size - 1)
+    proy_total = np.zeros((size * size, 2 * size - 1))
+    proy_total[np.arange(size * size), total] = 1.0
+    proy_diferencia = np.zeros((size * size, 2 * size - 1))
+    proy_diferencia[np.arange(size * size), diferencia] = 1.0
+    return proy_total, proy_diferencia
+
+
+def _resultado_ah(margen: np.ndarray, margenes: np.ndarray, linea: float):
+    """
+    Probabilidades (gana, nulo, pierde) del local con handicap 'linea'
+    para líneas enteras o de medio gol
+    """
+    ajustado = margenes + linea
+    gana = margen[:, ajustado > 0].sum(axis=1)
+    nulo = margen[:, ajustado == 0].sum(axis=1)
+    pierde = margen[:, ajustado < 0].sum(axis=1)
+    return gana, nulo, pierde
+
+
+def asian_handicap(margen: np.ndarray, margenes: np.ndarray, lineas=LINEAS_AH) -> Dict[str, np.ndarray]:
+    """
+    AH exacto desde la distribución de la diferencia de goles.
+    Las líneas de cuarto (±0.25, ±0.75...) reparten la apuesta en dos mitades
+    sobre las líneas vecinas. Devuelve por línea la probabilidad efectiva
+    (gana / (gana + pierde), sin contar nulos) y la cuota justa de cada lado.
+    """
+    n = margen.shape[0]
+    gana = np.zeros((n, len(lineas)))
+    pierde = np.zeros((n, len(lineas)))
+    nulo = np.zeros((n, len(lineas)))
+
+    for k, linea in enumerate(lineas):
+        if (linea * 4) % 2 == 0:
+            componentes = (linea,)
+        else:
+            componentes = (linea - 0.25, linea + 0.25)
+        for componente in componentes:
+            g, x, p = _resultado_ah(margen, margenes, componente)
+            peso = 1 / len(componentes)
+            gana[:, k] += peso * g
+            nulo[:, k] += peso * x
+            pierde[:, k] += peso * p
+
+    decididas = gana + pierde
+    with np.errstate(divide='ignore', invalid='ignore'):
+        efectiva_local = np.where(decididas > 0, gana / decididas, 0.5)
+        cuota_local = np.where(gana > 0, 1 + pierde / gana, np.inf)
+        cuota_visitante = np.where(pierde > 0, 1 + gana / pierde, np.inf)
+
+    return {
+        'ah_gana': gana,
+        'ah_nulo': nulo,
+        'ah_pierde': pierde,
+        'ah_local': efectiva_local,
+        'ah_visitante': 1 - efectiva_local,
+        'ah_cuota_local': cuota_local,
+        'ah_cuota_visitante': cuota_visitante,
+    }
+
+
+def derivar_mercados(matrices: np.ndarray, top_k: int = TOP_MARCADORES) -> Dict[str, np.ndarray]:
+    """
+    Deriva todos los mercados de un tensor N×G×G (filas = local, columnas = visitante).
+    Los arrays por partido tienen N como primer eje; los ejes comunes
+    (líneas, goles, márgenes) van en resultado['ejes'].
+    """
+    n, size, _ = matrices.shape
+    planas = matrices.reshape(n, -1)
+
+    # Única pasada por las celdas: total de goles, diferencia y marginales
+    proy_total, proy_diferencia = _proyecciones(size)
+    goles_exactos = planas @ proy_total
+    margen = planas @ proy_diferencia
+    marginal_local = matrices.sum(axis=2)
+    marginal_visitante = matrices.sum(axis=1)
+
+    margenes = np.arange(-(size - 1), size)
+    lineas_total = np.arange(2 * size - 1) + 0.5
+    lineas_equipo = np.arange(size) + 0.5
+
+    # 1X2 desde la diferencia de goles
+    prob_home = margen[:, margenes > 0].sum(axis=1)
+    prob_draw = margen[:, margenes == 0].sum(axis=1)
+    prob_away = margen[:, margenes < 0].sum(axis=1)
+
+    # Over X.5 = 1 - P(total <= X) con suma acumulada
+    over = 1 - np.cumsum(goles_exactos, axis=1)
+    over_local = 1 - np.cumsum(marginal_local, axis=1)
+    over_visitante = 1 - np.cumsum(marginal_visitante, axis=1)
+
+    # BTTS = 1 - P(local 0) - P(visitante 0) + P(0-0)
+    prob_btts = 1 - marginal_local[:, 0] - marginal_visitante[:, 0] + matrices[:, 0, 0]
+
+    # Marcador exacto top-k
+    orden = np.argsort(-planas, axis=1, kind='stable')[:, :top_k]
+    top_prob = np.take_along_axis(planas, orden, axis=1)
+    top_marcador = np.stack([orden // size, orden % size], axis=-1)
+
+    mercados = {
+        'home': prob_home,
+        'draw': prob_draw,
+        'away': prob_away,
+        'dc_1x': prob_home + prob_draw,
+        'dc_x2': prob_away + prob_draw,
+        'dc_12': prob_home + prob_away,
+        'btts': prob_btts,
+        'over': over,
+        'over_local': over_local,
+        'over_visitante': over_visitante,
+        'goles_exactos': goles_exactos,
+        'margen': margen,
+        'marcadores_top': top_marcador,
+        'marcadores_top_prob': top_prob,
+    }
+    # Claves históricas de las líneas más usadas
+    for linea in (1, 2, 3):
+        mercados[f'over{linea}5'] = over[:, linea] if linea < over.shape[1] else np.zeros(n)
+
+    mercados.update(asian_handicap(margen, margenes))
+    mercados['ejes'] = {
+        'lineas_total': lineas_total,
+        'lineas_equipo': lineas_equipo,
+        'margenes': margenes,
+        'lineas_ah': LINEAS_AH,
+    }
+    return mercados
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita API-Football para probar cliente_api.py sin gastar cuota
+- Sirve fixtures, standings, teams/statistics y odds construidos a partir de
+  las jornadas del almacén (data/jornadas): mismos equipos, forma y cuotas
+- Latencia artificial y fallos 503 / 429 con Retry-After configurables para
+  ver la concurrencia, los reintentos y el backoff
+- Cabeceras x-ratelimit-* con la cuota diaria simulada
+- ETag por respuesta: If-None-Match con el mismo ETag devuelve 304 sin cuerpo
+- /odds paginado como la API (paging.current / paging.total, parámetro page)
+
+Uso: python scripts/mock_api_football.py [puerto]
+     API_FOOTBALL_URL=http://127.0.0.1:8099 API_FOOTBALL_KEY=mock python scripts/actualizar_partidos.py
+MOCK_LATENCIA_MS (250), MOCK_FALLOS (fracción de respuestas 503, 0), MOCK_CUOTA (100),
+MOCK_POR_PAGINA (partidos por página de /odds, 10)
+Tests del cliente contra el mock: python -m pytest scripts/test_cliente_api.py
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+from typing import Dict, List
+
+from aiohttp import web
+
+from almacen_datos import AlmacenJornadas
+from cliente_api import LIGAS_API, SELECCIONES_API
+
+PUERTO = 8099
+POR_PAGINA = 10
+LETRAS_API = {'V': 'W', 'E': 'D', 'D': 'L'}
+# Contador de peticiones servidas (app[ESTADO]['peticiones'])
+ESTADO = web.AppKey('estado', dict)
+
+
+def datos_mock(almacen: AlmacenJornadas) -> Dict[int, Dict[str, List[Dict]]]:
+    """Respuestas por id de liga de la API a partir de la última jornada de cada competición"""
+    ultimas = {}
+    for temporada, competicion, jornada in almacen.disponibles():
+        ultimas[competicion] = (temporada, competicion, jornada)
+    respuestas = {}
+    for competicion, clave in ultimas.items():
+        partidos, cuotas = almacen.cargar(*clave)
+        fixtures, filas, odds = [], {}, []
+        for partido in partidos:
+            equipos = {}
+            for lado, prefijo in (('home', 'local'), ('away', 'visitante')):
+                ident = int(partido.fila[prefijo])
+                equipos[lado] = {'id': ident, 'name': partido[prefijo]}
+                # La forma de la API va del más antiguo al más reciente
+                filas[ident] = {
+                    'rank': partido[f'{prefijo}_pos'],
+                    'team': equipos[lado],
+                    'form': ''.join(LETRAS_API.get(r, 'D') for r in reversed(partido[f'{prefijo}_forma'])),
+                    'all': {'goals': {'for': partido[f'{prefijo}_goles_favor'],
+                                      'against': partido[f'{prefijo}_goles_contra']}},
+                }
+            fixtures.append({
+                'fixture': {'id': 1000 + partido['id'], 'date': f"{partido['fecha']}T{partido['hora']}:00+00:00",
+                            'venue': {'name': partido['estadio']}},
+                'league': {'id': LIGAS_API[competicion], 'name': partido['liga'],
+                           'round': f"Regular Season - {clave[2]}"},
+                'teams': equipos,
+            })
+            apuestas: Dict[str, List[Dict]] = {}
+            for (apuesta, valor), seleccion in SELECCIONES_API.items():
+                if seleccion in cuotas.get(partido['id'], {}):
+                    apuestas.setdefault(apuesta, []).append(
+                        {'value': valor, 'odd': f"{cuotas[partido['id']][seleccion]:.2f}"})
+            odds.append({'fixture': {'id': 1000 + partido['id']},
+                         'bookmakers': [{'name': 'Mock', 'bets': [{'name': nombre, 'values': valores}
+                                                                  for nombre, valores in apuestas.items()]}]})
+        respuestas[LIGAS_API[competicion]] = {
+            'fixtures': fixtures,
+            'standings': [{'league': {'standings': [sorted(filas.values(), key=lambda f: f['rank'])]}}],
+            'odds': odds,
+            'filas': filas,
+        }
+    return respuestas
+
+
+def crear_app(respuestas: Dict, latencia_s: float = 0.25, fallos: float = 0.0, cuota: int = 100,
+              por_pagina: int = POR_PAGINA) -> web.Application:
+    estado = {'peticiones': 0}
+
+    async def responder(request: web.Request) -> web.Response:
+        estado['peticiones'] += 1
+        await asyncio.sleep(latencia_s)
+        cabeceras = {'x-ratelimit-requests-limit': str(cuota),
+                     'x-ratelimit-requests-remaining': str(max(cuota - estado['peticiones'], 0))}
+        if random.random() < fallos:
+            return web.Response(status=503, headers=cabeceras)
+        if estado['peticiones'] > cuota:
+            return web.json_response({'errors': {'requests': 'Limite diario alcanzado'}, 'response': []},
+                                     headers=cabeceras)
+        if not request.headers.get('x-apisports-key'):
+            return web.json_response({'errors': {'token': 'Falta la API key'}, 'response': []}, headers=cabeceras)
+
+        endpoint = request.match_info['endpoint']
+        liga = respuestas.get(int(request.query.get('league', 0)), {})
+        if endpoint == 'teams/statistics':
+            fila = liga.get('filas', {}).get(int(request.query['team']))
+            respuesta = {} if fila is None else {
+                'form': fila['form'],
+                'goals': {'for': {'total': {'total': fila['all']['goals']['for']}},
+                          'against': {'total': {'total': fila['all']['goals']['against']}}},
+            }
+        else:
+            respuesta = liga.get(endpoint, [])
+        paging = {'current': 1, 'total': 1}
+        if endpoint == 'odds':
+            pagina = int(request.query.get('page', 1))
+            paging = {'current': pagina, 'total': max(-(-len(respuesta) // por_pagina), 1)}
+            respuesta = respuesta[(pagina - 1) * por_pagina:pagina * por_pagina]
+        cuerpo = json.dumps({'errors': [], 'paging': paging, 'response': respuesta})
+        cabeceras['ETag'] = f'"{hashlib.sha1(cuerpo.encode("utf-8")).hexdigest()[:16]}"'
+        if request.headers.get('If-None-Match') == cabeceras['ETag']:
+            return web.Response(status=304, headers=cabeceras)
+        return web.Response(text=cuerpo, content_type='application/json', headers=cabeceras)
+
+    app = web.Application()
+    app[ESTADO] = estado
+    app.router.add_get('/{endpoint:.+}', responder)
+    return app
+
+
+def main():
+    puerto = int(sys.argv[1]) if len(sys.argv) > 1 else PUERTO
+    app = crear_app(datos_mock(AlmacenJornadas()),
+                    latencia_s=float(os.getenv('MOCK_LATENCIA_MS', '250')) / 1000,
+                    fallos=float(os.getenv('MOCK_FALLOS', '0')),
+                    cuota=int(os.getenv('MOCK_CUOTA', '100')),
+                    por_pagina=int(os.getenv('MOCK_POR_PAGINA', str(POR_PAGINA))))
+    print(f"🧪 Mock de API-Football en http://127.0.0.1:{puerto}")
+    web.run_app(app, host='127.0.0.1', port=puerto, print=None)
+
+
+if __name__ == "__main__":
+    main()
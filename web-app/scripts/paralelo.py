@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Ejecución paralela del reporte por shards (competición / jornada)
+- Los partidos viajan a los procesos como TablaPartidos (array
+  estructurado + nombres internados, registros.py), no como listas de dicts
+- Cada proceso crea su analizador una sola vez (initializer del pool)
+- El ensamblado respeta el orden original: la salida es idéntica byte a byte
+  a la ruta serie
+"""
+
+import numpy as np
+from typing import Dict, List
+
+from registros import TablaPartidos
+
+_ANALIZADOR = None
+
+
+def shards_partidos(partidos: TablaPartidos) -> List[np.ndarray]:
+    """Índices de los partidos agrupados por (competición, jornada), en orden de aparición"""
+    if not len(partidos):
+        return []
+    claves = partidos.datos['liga'].astype(np.int64) << 16 | partidos.datos['jornada'].astype(np.int64)
+    _, primeros, grupo = np.unique(claves, return_index=True, return_inverse=True)
+    rango = np.empty_like(primeros)
+    rango[np.argsort(primeros)] = np.arange(len(primeros))
+    grupo = rango[grupo.ravel()]
+    orden = np.argsort(grupo, kind='stable')
+    return np.split(orden, np.cumsum(np.bincount(grupo))[:-1])
+
+
+def inicializar_worker(configuracion: Dict):
+    """Crea el analizador del proceso con la misma configuración que el padre"""
+    global _ANALIZADOR
+    from betting_analyzer import AdvancedBettingAnalyzer
+
+    _ANALIZADOR = AdvancedBettingAnalyzer(usar_tabla=configuracion['usar_tabla'],
+                                          parametros_dc=configuracion['parametros_dc'],
+                                          jornadas=configuracion['jornadas'],
+                                          calibrador=configuracion['calibrador'])
+    _ANALIZADOR.market_odds = configuracion['market_odds']
+    _ANALIZADOR.probs_justas = configuracion['probs_justas']
+    _ANALIZADOR.elo_ratings = configuracion['elo_ratings']
+    _ANALIZADOR.rho = configuracion['rho']
+    _ANALIZADOR.edge_minimo = configuracion['edge_minimo']
+    _ANALIZADOR.pesos_ensemble = configuracion['pesos_ensemble']
+    _ANALIZADOR.empate_elo = configuracion['empate_elo']
+
+
+def analizar_shard_worker(tarea) -> List[Dict]:
+    partidos, lambdas, max_goals = tarea
+    return _ANALIZADOR.analizar_shard(partidos, lambdas, max_goals)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Instrumentación por etapas del pipeline (tiempos, llamadas y memoria)
+- Desactivado: los métodos no se envuelven, coste cero
+- Activado (PERFILADO=1 o --perfilar): cada etapa acumula tiempo total,
+  número de llamadas y mínimo/máximo, y emite eventos de traza
+- PERFILADO_MEMORIA=1 añade bytes netos asignados por etapa (tracemalloc)
+- Exporta un resumen JSON y una traza en formato Chrome trace-event
+  (chrome://tracing, Perfetto) en PERFILADO_DIR, y añade una línea por
+  ejecución a historial.jsonl para seguir el coste en el workflow
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Dict, Iterable
+
+PERFILADO_DIR = 'data/perfil'
+MAX_EVENTOS = 200000
+
+
+class Perfilador:
+    """Acumula métricas por etapa y eventos de traza del proceso"""
+
+    def __init__(self):
+        self.activo = False
+        self.memoria = False
+        self.etapas: Dict[str, Dict] = {}
+        self.eventos = []
+        self.descartados = 0
+        self._origen = time.perf_counter()
+
+    def activar(self, memoria: bool = False):
+        self.activo = True
+        self.memoria = memoria
+        self._origen = time.perf_counter()
+        if memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _registrar(self, nombre: str, inicio: float, fin: float, asignado: int):
+        etapa = self.etapas.get(nombre)
+        if etapa is None:
+            etapa = self.etapas[nombre] = {'llamadas': 0, 'total_s': 0.0, 'min_s': float('inf'),
+                                           'max_s': 0.0, 'bytes_netos': 0}
+        duracion = fin - inicio
+        etapa['llamadas'] += 1
+        etapa['total_s'] += duracion
+        etapa['min_s'] = min(etapa['min_s'], duracion)
+        etapa['max_s'] = max(etapa['max_s'], duracion)
+        etapa['bytes_netos'] += asignado
+        if len(self.eventos) < MAX_EVENTOS:
+            self.eventos.append((nombre, inicio, duracion, threading.get_ident()))
+        else:
+            self.descartados += 1
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        """Bloque instrumentado (sin coste apreciable si está desactivado)"""
+        if not self.activo:
+            yield
+            return
+        memoria_inicial = tracemalloc.get_traced_memory()[0] if self.memoria else 0
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            fin = time.perf_counter()
+            asignado = tracemalloc.get_traced_memory()[0] - memoria_inicial if self.memoria else 0
+            self._registrar(nombre, inicio, fin, asignado)
+
+    def envolver(self, nombre: str, funcion):
+        @wraps(funcion)
+        def instrumentada(*args, **kwargs):
+            memoria_inicial = tracemalloc.get_traced_memory()[0] if self.memoria else 0
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                fin = time.perf_counter()
+                asignado = tracemalloc.get_traced_memory()[0] - memoria_inicial if self.memoria else 0
+                self._registrar(nombre, inicio, fin, asignado)
+        return instrumentada
+
+    def instrumentar(self, objetivo, metodos: Iterable[str]):
+        """Envuelve los métodos de una clase (o funciones de un módulo) si está activo"""
+        if not self.activo:
+            return
+        prefijo = getattr(objetivo, '__name__', type(objetivo).__name__)
+        for metodo in metodos:
+            setattr(objetivo, metodo, self.envolver(f"{prefijo}.{metodo}", getattr(objetivo, metodo)))
+
+    def resumen(self) -> Dict:
+        etapas = {
+            nombre: {**etapa, 'media_ms': round(1000 * etapa['total_s'] / etapa['llamadas'], 4),
+                     'total_s': round(etapa['total_s'], 6), 'min_s': round(etapa['min_s'], 6),
+                     'max_s': round(etapa['max_s'], 6)}
+            for nombre, etapa in sorted(self.etapas.items(), key=lambda e: -e[1]['total_s'])
+        }
+        resumen = {'fecha': datetime.now().isoformat(), 'etapas': etapas,
+                   'eventos_descartados': self.descartados}
+        if self.memoria:
+            resumen['pico_memoria_bytes'] = tracemalloc.get_traced_memory()[1]
+        return resumen
+
+    def traza_chrome(self) -> Dict:
+        """Eventos completos ('X') con tiempos en microsegundos desde la activación"""
+        pid = os.getpid()
+        return {
+            'traceEvents': [{'name': nombre, 'ph': 'X', 'pid': pid, 'tid': tid,
+                             'ts': round((inicio - self._origen) * 1e6, 3), 'dur': round(duracion * 1e6, 3)}
+                            for nombre, inicio, duracion, tid in self.eventos],
+            'displayTimeUnit': 'ms',
+        }
+
+    def exportar(self, proceso: str, directorio: str = PERFILADO_DIR) -> Dict:
+        """perfil_<proceso>.json, traza_<proceso>.json y una línea en historial.jsonl"""
+        os.makedirs(directorio, exist_ok=True)
+        resumen = {'proceso': proceso, **self.resumen()}
+        with open(os.path.join(directorio, f"perfil_{proceso}.json"), 'w', encoding='utf-8') as f:
+            json.dump(resumen, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(directorio, f"traza_{proceso}.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.traza_chrome(), f, separators=(',', ':'))
+        with open(os.path.join(directorio, 'historial.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'fecha': resumen['fecha'], 'proceso': proceso,
+                                'total_s': {n: e['total_s'] for n, e in resumen['etapas'].items()}},
+                               ensure_ascii=False) + '\n')
+        return resumen
+
+
+# Perfilador del proceso, compartido por todos los scripts
+PERFILADOR = Perfilador()
+
+
+def activar_desde_entorno(argv=None) -> bool:
+    """PERFILADO=1 o --perfilar en la línea de comandos; PERFILADO_MEMORIA=1 añade tracemalloc"""
+    argv = sys.argv if argv is None else argv
+    if os.getenv('PERFILADO') == '1' or '--perfilar' in argv:
+        PERFILADOR.activar(memoria=os.getenv('PERFILADO_MEMORIA') == '1')
+    return PERFILADOR.activo
+
+
+def imprimir_resumen(resumen: Dict, top: int = 10):
+    print("\n⏱️  Perfil por etapa (total | llamadas | media):")
+    for nombre, etapa in list(resumen['etapas'].items())[:top]:
+        memoria = f" | {etapa['bytes_netos'] / 1024:+.0f} KB" if 'pico_memoria_bytes' in resumen else ""
+        print(f"   - {nombre}: {etapa['total_s'] * 1000:.1f} ms | {etapa['llamadas']} | "
+              f"{etapa['media_ms']:.3f} ms{memoria}")
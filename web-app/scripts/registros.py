@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Representación compacta de partidos y picks
+- Partidos: un array estructurado NumPy por tabla (una fila de tamaño fijo
+  por partido); equipos con su id del registro canónico (equipos.py) y
+  textos internados como ids enteros
+- VistaPartido: acceso partido['campo'] sobre una fila, sin copiar a dict
+- Pick / PickCombinable: registros con __slots__
+- Los dicts solo se materializan en la frontera JSON (como_dict, que el
+  encoder de salida_web.py llama directamente)
+"""
+
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+from equipos import RegistroEquipos, registro_por_defecto, clave_partido
+
+# Formato columnar en disco (almacen_datos.py), compatible con los .npz existentes
+CAMPOS_ENTEROS = (
+    'id', 'local_pos', 'visitante_pos',
+    'local_goles_favor', 'local_goles_contra',
+    'visitante_goles_favor', 'visitante_goles_contra',
+)
+CAMPOS_TEXTO = (
+    'local', 'visitante', 'fecha', 'hora', 'estadio', 'liga',
+    'local_forma', 'visitante_forma',
+)
+CAMPOS_EQUIPO = ('local', 'visitante')
+CAMPOS_ULTIMOS = ('local_ultimos_5', 'visitante_ultimos_5')
+
+DTYPE_PARTIDO = np.dtype(
+    [('id', np.int32), ('jornada', np.int16)]
+    + [(campo, np.int16) for campo in CAMPOS_ENTEROS[1:]]
+    + [(campo, np.int32) for campo in CAMPOS_TEXTO]
+    + [(campo, np.int8, (5,)) for campo in CAMPOS_ULTIMOS]
+)
+
+
+class Internador:
+    """Nombre <-> id entero estable dentro de la tabla (búsqueda O(1) en ambos sentidos)"""
+
+    __slots__ = ('nombres', 'indice')
+
+    def __init__(self, nombres: Iterable[str] = ()):
+        self.nombres: List[str] = []
+        self.indice: Dict[str, int] = {}
+        for nombre in nombres:
+            self.id(nombre)
+
+    def id(self, nombre: str) -> int:
+        ident = self.indice.get(nombre)
+        if ident is None:
+            ident = self.indice[nombre] = len(self.nombres)
+            self.nombres.append(nombre)
+        return ident
+
+    def ids(self, nombres: Iterable[str]) -> np.ndarray:
+        return np.array([self.id(nombre) for nombre in nombres], dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.nombres)
+
+
+class VistaPartido:
+    """Fila de una TablaPartidos con la interfaz de lectura del antiguo dict"""
+
+    __slots__ = ('tabla', 'fila')
+
+    def __init__(self, tabla: 'TablaPartidos', fila):
+        self.tabla = tabla
+        self.fila = fila
+
+    def __getitem__(self, campo: str):
+        valor = self.fila[campo]
+        if campo in CAMPOS_EQUIPO:
+            return self.tabla.equipos.nombres[valor]
+        if campo in CAMPOS_TEXTO:
+            return self.tabla.textos.nombres[valor]
+        if campo in CAMPOS_ULTIMOS:
+            return valor.tolist()
+        return int(valor)
+
+    def get(self, campo: str, defecto=None):
+        return self[campo] if campo in DTYPE_PARTIDO.names else defecto
+
+    def como_dict(self) -> Dict:
+        return {campo: self[campo] for campo in DTYPE_PARTIDO.names}
+
+
+class TablaPartidos:
+    """
+    Partidos de una o varias jornadas en un array estructurado.
+    tabla.datos['local'] son ids del registro de equipos (tabla.equipos, el
+    compartido por defecto): los alias se resuelven al cargar y el nombre
+    devuelto es siempre el canónico. Los textos (fecha, liga, forma, ...)
+    comparten el internador tabla.textos.
+    """
+
+    __slots__ = ('datos', 'equipos', 'textos')
+
+    def __init__(self, datos: Optional[np.ndarray] = None, equipos: Optional[RegistroEquipos] = None,
+                 textos: Optional[Internador] = None):
+        self.datos = np.zeros(0, dtype=DTYPE_PARTIDO) if datos is None else datos
+        self.equipos = equipos if equipos is not None else registro_por_defecto()
+        self.textos = textos or Internador()
+
+    @classmethod
+    def desde_dicts(cls, partidos: List[Dict]) -> 'TablaPartidos':
+        """Los campos de texto ausentes (p.ej. hora/estadio en el backtest) quedan vacíos"""
+        tabla = cls(np.zeros(len(partidos), dtype=DTYPE_PARTIDO))
+        datos = tabla.datos
+        for campo in CAMPOS_ENTEROS:
+            datos[campo] = [p[campo] for p in partidos]
+        datos['jornada'] = [p.get('jornada') or 0 for p in partidos]
+        for campo in CAMPOS_EQUIPO:
+            datos[campo] = tabla.equipos.ids(p[campo] for p in partidos)
+        for campo in CAMPOS_TEXTO[2:]:
+            datos[campo] = tabla.textos.ids(p.get(campo, '') for p in partidos)
+        for campo in CAMPOS_ULTIMOS:
+            datos[campo] = np.array([p[campo] for p in partidos], dtype=np.int8).reshape(-1, 5)
+        return tabla
+
+    @classmethod
+    def desde_columnas(cls, columnas: Dict[str, np.ndarray], jornada: int = 0) -> 'TablaPartidos':
+        """Arrays columnares de AlmacenJornadas -> tabla, sin pasar por dicts"""
+        enteros = columnas['enteros']
+        tabla = cls(np.zeros(len(enteros), dtype=DTYPE_PARTIDO))
+        datos = tabla.datos
+        for col, campo in enumerate(CAMPOS_ENTEROS):
+            datos[campo] = enteros[:, col]
+        datos['jornada'] = jornada
+        for campo in CAMPOS_EQUIPO:
+            datos[campo] = tabla.equipos.ids(columnas[campo].tolist())
+        for campo in CAMPOS_TEXTO[2:]:
+            datos[campo] = tabla.textos.ids(columnas[campo].tolist())
+        for k, campo in enumerate(CAMPOS_ULTIMOS):
+            datos[campo] = columnas['ultimos_5'][:, k]
+        return tabla
+
+    def columnas(self) -> Dict[str, np.ndarray]:
+        """Formato columnar de AlmacenJornadas"""
+        datos = self.datos
+        columnas = {
+            'enteros': np.stack([datos[campo].astype(np.int32) for campo in CAMPOS_ENTEROS], axis=1)
+                         .reshape(-1, len(CAMPOS_ENTEROS)),
+            'ultimos_5': np.stack([datos[campo] for campo in CAMPOS_ULTIMOS], axis=1).reshape(-1, 2, 5),
+        }
+        for campo in CAMPOS_TEXTO:
+            nombres = self.equipos.nombres if campo in CAMPOS_EQUIPO else self.textos.nombres
+            columnas[campo] = np.array([nombres[i] for i in datos[campo].tolist()], dtype=str)
+        return columnas
+
+    def ampliar(self, otra: 'TablaPartidos'):
+        """Añade las filas de otra tabla traduciendo sus ids a los internadores propios"""
+        filas = otra.datos.copy()
+        for internador, propio, campos in ((otra.equipos, self.equipos, CAMPOS_EQUIPO),
+                                           (otra.textos, self.textos, CAMPOS_TEXTO[2:])):
+            if internador is propio:
+                continue
+            traduccion = propio.ids(internador.nombres)
+            for campo in campos:
+                filas[campo] = traduccion[filas[campo]]
+        self.datos = np.concatenate([self.datos, filas])
+
+    def claves(self) -> np.ndarray:
+        """Clave (local, visitante) de cada partido para cruzar con otras fuentes (equipos.unir)"""
+        return clave_partido(self.datos['local'], self.datos['visitante'])
+
+    def seleccionar(self, indices) -> 'TablaPartidos':
+        """Subtabla (comparte los internadores: los ids no cambian)"""
+        return TablaPartidos(self.datos[indices], self.equipos, self.textos)
+
+    def __len__(self) -> int:
+        return len(self.datos)
+
+    def __getitem__(self, k: int) -> VistaPartido:
+        return VistaPartido(self, self.datos[k])
+
+    def __iter__(self):
+        for fila in self.datos:
+            yield VistaPartido(self, fila)
+
+    def como_dicts(self) -> List[Dict]:
+        return [partido.como_dict() for partido in self]
+
+
+class Pick:
+    """Pick de un partido; los campos opcionales a None no se serializan"""
+
+    __slots__ = ('tipo', 'prediccion', 'confianza', 'cuota_mercado', 'cuota_justa', 'seleccion',
+                 'edge_percent', 'apostar', 'kelly_stake_percent', 'razon', 'descripcion', 'modelo',
+                 'probabilidades')
+    OPCIONALES = frozenset(('cuota_justa', 'seleccion', 'descripcion', 'probabilidades'))
+    CLAVES_PROBABILIDADES = ('local', 'empate', 'visitante')
+
+    def __init__(self, tipo: str, prediccion: str, confianza: float, cuota_mercado: Optional[float] = None,
+                 edge_percent: float = 0.0, apostar: bool = False, kelly_stake_percent: float = 0.0,
+                 razon: str = '', modelo: str = '', cuota_justa: Optional[float] = None,
+                 seleccion: Optional[str] = None, descripcion: Optional[str] = None,
+                 probabilidades: Optional[tuple] = None):
+        self.tipo = tipo
+        self.prediccion = prediccion
+        self.confianza = confianza
+        self.cuota_mercado = cuota_mercado
+        self.cuota_justa = cuota_justa
+        self.seleccion = seleccion
+        self.edge_percent = edge_percent
+        self.apostar = apostar
+        self.kelly_stake_percent = kelly_stake_percent
+        self.razon = razon
+        self.descripcion = descripcion
+        self.modelo = modelo
+        self.probabilidades = probabilidades  # (local, empate, visitante) en %
+
+    @classmethod
+    def desde_dict(cls, datos: Dict) -> 'Pick':
+        probabilidades = datos.get('probabilidades')
+        if probabilidades is not None:
+            datos = {**datos, 'probabilidades': tuple(probabilidades[c] for c in cls.CLAVES_PROBABILIDADES)}
+        return cls(**datos)
+
+    def como_dict(self) -> Dict:
+        datos = {}
+        for campo in self.__slots__:
+            valor = getattr(self, campo)
+            if valor is None and campo in self.OPCIONALES:
+                continue
+            datos[campo] = valor
+        if self.probabilidades is not None:
+            datos['probabilidades'] = dict(zip(self.CLAVES_PROBABILIDADES, self.probabilidades))
+        return datos
+
+
+class PickCombinable:
+    """Pick del pool de combinadas (generar_combinadas.py)"""
+
+    __slots__ = ('id', 'partido', 'competicion', 'pick_tipo', 'prediccion', 'confianza', 'cuota',
+                 'fecha', 'hora')
+
+    def __init__(self, partido: Dict, pick: Dict, competicion: str):
+        self.partido = f"{partido['local']} vs {partido['visitante']}"
+        self.id = f"{partido['local']}_vs_{partido['visitante']}_{pick['tipo']}_{pick['prediccion']}"
+        self.competicion = competicion
+        self.pick_tipo = pick['tipo']
+        self.prediccion = pick['prediccion']
+        self.confianza = pick['confianza']
+        self.cuota = pick['cuota_mercado']
+        self.fecha = partido['fecha']
+        self.hora = partido['hora']
+
+    def como_dict(self) -> Dict:
+        return {campo: getattr(self, campo) for campo in self.__slots__}
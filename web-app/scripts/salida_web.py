@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Artefactos JSON para el frontend
+- JSON compacto (sin indentación ni espacios tras separadores)
+- Escalares y arrays NumPy, y registros con como_dict() (registros.py),
+  serializados directamente por el encoder
+- Hermanos precomprimidos .gz (siempre) y .br (si está instalado brotli)
+- Picks troceados por competición/jornada con un manifest.json pequeño
+  (hash del contenido y tamaños) para que el navegador solo descargue lo
+  que cambia y pueda cachear el resto
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import numpy as np
+from typing import Dict
+
+PICKS_DIR = 'public/data/picks'
+MANIFEST = 'manifest.json'
+RESUMEN = 'resumen.json'
+NIVEL_GZIP = 9
+CALIDAD_BROTLI = 11
+EXTENSIONES = ('.json', '.json.gz', '.json.br')
+
+
+def _por_defecto(obj):
+    """default= del encoder: NumPy y registros sin conversión previa"""
+    if hasattr(obj, 'como_dict'):
+        return obj.como_dict()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"{type(obj).__name__} no es serializable a JSON")
+
+
+def a_json(datos) -> bytes:
+    return json.dumps(datos, ensure_ascii=False, separators=(',', ':'), default=_por_defecto).encode('utf-8')
+
+
+def escribir_artefacto(path: str, datos) -> Dict:
+    """
+    Escribe path en JSON compacto y sus hermanos .gz / .br.
+    Devuelve la entrada de manifest: archivo, hash del contenido y tamaños.
+    """
+    contenido = a_json(datos)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(contenido)
+    entrada = {
+        'archivo': os.path.basename(path),
+        'sha256': hashlib.sha256(contenido).hexdigest()[:16],
+        'bytes': len(contenido),
+    }
+
+    # mtime=0: mismo .gz para el mismo contenido (sin ruido en git)
+    comprimido = gzip.compress(contenido, NIVEL_GZIP, mtime=0)
+    with open(path + '.gz', 'wb') as f:
+        f.write(comprimido)
+    entrada['bytes_gz'] = len(comprimido)
+
+    try:
+        import brotli
+    except ImportError:
+        return entrada
+    comprimido = brotli.compress(contenido, quality=CALIDAD_BROTLI)
+    with open(path + '.br', 'wb') as f:
+        f.write(comprimido)
+    entrada['bytes_br'] = len(comprimido)
+    return entrada
+
+
+def escribir_picks_troceados(reporte: Dict, jornadas: Dict[str, int],
+                             directorio: str = PICKS_DIR) -> Dict:
+    """
+    Un shard por competición/jornada con sus partidos, un resumen con el
+    resto del reporte y manifest.json con el hash de cada archivo.
+    Borra los shards de ejecuciones anteriores que ya no están en el manifest.
+    """
+    shards = {}
+    for competicion, bloque in reporte['jornada'].items():
+        nombre = f"{competicion}-j{jornadas.get(competicion, 0)}.json"
+        shards[competicion] = escribir_artefacto(os.path.join(directorio, nombre), bloque)
+
+    resumen = {clave: valor for clave, valor in reporte.items() if clave != 'jornada'}
+    resumen['jornada'] = {competicion: {clave: valor for clave, valor in bloque.items() if clave != 'partidos'}
+                          for competicion, bloque in reporte['jornada'].items()}
+    manifest = {
+        'fecha_generacion': reporte['fecha_generacion'],
+        'modelo_version': reporte['modelo_version'],
+        'resumen': escribir_artefacto(os.path.join(directorio, RESUMEN), resumen),
+        'shards': shards,
+    }
+    escribir_artefacto(os.path.join(directorio, MANIFEST), manifest)
+
+    vigentes = {MANIFEST, RESUMEN} | {entrada['archivo'] for entrada in shards.values()}
+    for archivo in os.listdir(directorio):
+        base = next((archivo[:-len(ext)] + '.json' for ext in EXTENSIONES if archivo.endswith(ext)), None)
+        if base is not None and base not in vigentes:
+            os.remove(os.path.join(directorio, archivo))
+    return manifest
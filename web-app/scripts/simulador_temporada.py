@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Simulador Monte Carlo de temporada (LaLiga / Segunda)
+- Simula el resto del calendario 100k+ veces, vectorizado en NumPy
+- Marcadores muestreados de la misma matriz Poisson-Dixon-Coles que los picks
+  (lambdas de calculate_lambda_values, rho del analizador)
+- Desempates LaLiga: puntos, enfrentamientos directos (puntos y diferencia),
+  diferencia de goles general y goles a favor
+- Opcionalmente reparte los bloques de temporadas en un pool de procesos con
+  streams de RNG independientes (SeedSequence.spawn): el resultado no depende
+  del número de procesos
+"""
+
+import csv
+import json
+import os
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+from dixon_coles import matrices_dixon_coles
+from estado_liga import EstadoLiga
+from equipos import registro_por_defecto
+
+# Zonas de la clasificación por competición (posiciones 1-indexadas)
+ZONAS = {
+    'LaLiga EA Sports': {
+        'campeon': (1, 1),
+        'top4': (1, 4),
+        'descenso': (18, 20),
+    },
+    'LaLiga Hypermotion': {
+        'campeon': (1, 1),
+        'ascenso_directo': (1, 2),
+        'playoff_ascenso': (3, 6),
+        'descenso': (19, 22),
+    },
+}
+BLOQUE_TEMPORADAS = 10_000
+
+
+def _simular_bloque(args) -> np.ndarray:
+    """Simula un bloque de temporadas y devuelve el conteo equipos × posiciones"""
+    simulador, n, semilla = args
+    rng = np.random.default_rng(semilla)
+    return simulador._conteo_posiciones(n, rng)
+
+
+class SimuladorTemporada:
+    """Probabilidades de clasificación final por simulación"""
+
+    def __init__(self, equipos: List[str],
+                 jugados: Dict[str, np.ndarray],
+                 pendientes: Dict[str, np.ndarray],
+                 rho: float = 0.10):
+        """
+        equipos: nombres; jugados/pendientes: arrays 'local' y 'visitante' con
+        índices en equipos. jugados trae 'goles_local'/'goles_visitante';
+        pendientes trae 'lambda_home'/'lambda_away'.
+        """
+        self.equipos = list(equipos)
+        self.n_equipos = len(equipos)
+        self.jugados = jugados
+        self.pendientes = pendientes
+
+        self.local_pend = np.asarray(pendientes['local'])
+        self.visit_pend = np.asarray(pendientes['visitante'])
+        self.local_jug = np.asarray(jugados['local'])
+        self.visit_jug = np.asarray(jugados['visitante'])
+
+        # CDF de marcadores por partido pendiente (misma matriz DC que los picks)
+        if len(self.local_pend):
+            matrices, _ = matrices_dixon_coles(pendientes['lambda_home'], pendientes['lambda_away'], rho)
+            self.tam_rejilla = matrices.shape[1]
+            self.cdf = np.cumsum(matrices.reshape(len(matrices), -1), axis=1)
+            self.cdf[:, -1] = 1.0
+        else:
+            self.tam_rejilla = 1
+            self.cdf = np.ones((0, 1))
+
+        # Resultados ya jugados (entran en la tabla y en los enfrentamientos directos)
+        self.gl_jug = np.asarray(jugados['goles_local'])
+        self.gv_jug = np.asarray(jugados['goles_visitante'])
+
+        # Incidencia partido -> equipo (jugados + pendientes) para acumular con matmul
+        self.local_todos = np.concatenate([self.local_jug, self.local_pend]).astype(int)
+        self.visit_todos = np.concatenate([self.visit_jug, self.visit_pend]).astype(int)
+        n_partidos = len(self.local_todos)
+        self.incid_local = np.zeros((n_partidos, self.n_equipos), dtype=np.float32)
+        self.incid_local[np.arange(n_partidos), self.local_todos] = 1
+        self.incid_visit = np.zeros((n_partidos, self.n_equipos), dtype=np.float32)
+        self.incid_visit[np.arange(n_partidos), self.visit_todos] = 1
+
+    def _acumular_sims(self, valor_local: np.ndarray, valor_visitante: np.ndarray) -> np.ndarray:
+        """Suma valores por equipo en todas las simulaciones: (n, partidos) -> (n, equipos)"""
+        return (valor_local.astype(np.float32) @ self.incid_local +
+                valor_visitante.astype(np.float32) @ self.incid_visit).astype(np.int64)
+
+    def _muestrear_goles(self, n: int, rng: np.random.Generator):
+        """Marcadores (n, partidos) muestreados de cada matriz DC por búsqueda en la CDF"""
+        u = rng.random((len(self.local_pend), n))
+        celdas = np.empty((n, len(self.local_pend)), dtype=np.int32)
+        for k in range(len(self.local_pend)):
+            celdas[:, k] = np.searchsorted(self.cdf[k], u[k], side='right')
+        np.minimum(celdas, self.tam_rejilla ** 2 - 1, out=celdas)
+        return celdas // self.tam_rejilla, celdas % self.tam_rejilla
+
+    def _clasificacion(self, gl_sim: np.ndarray, gv_sim: np.ndarray,
+                       rng: np.random.Generator) -> np.ndarray:
+        """Posición final (0-indexada) de cada equipo en cada simulación: (n, equipos)"""
+        n = gl_sim.shape[0]
+        local, visit = self.local_todos, self.visit_todos
+        gl = np.concatenate([np.broadcast_to(self.gl_jug, (n, len(self.gl_jug))), gl_sim], axis=1)
+        gv = np.concatenate([np.broadcast_to(self.gv_jug, (n, len(self.gv_jug))), gv_sim], axis=1)
+
+        pts_local = 3 * (gl > gv) + (gl == gv)
+        pts_visit = 3 * (gv > gl) + (gl == gv)
+        puntos = self._acumular_sims(pts_local, pts_visit)
+        gf = self._acumular_sims(gl, gv)
+        dif = gf - self._acumular_sims(gv, gl)
+
+        # Enfrentamientos directos: un partido cuenta en la mini-liga de desempate
+        # si y solo si ambos equipos terminan empatados a puntos
+        empatados = puntos[:, local] == puntos[:, visit]
+        h2h_pts = self._acumular_sims(pts_local * empatados, pts_visit * empatados)
+        h2h_dif = self._acumular_sims((gl - gv) * empatados, (gv - gl) * empatados)
+
+        # Clave única int64 en orden de prioridad (puntos, h2h puntos, h2h dif,
+        # dif general, goles a favor, sorteo): un solo argsort por simulación
+        clave = puntos
+        for valor, bits in ((h2h_pts, 8), (h2h_dif + 256, 9), (dif + 512, 10), (gf, 9)):
+            clave = (clave << bits) + np.clip(valor, 0, (1 << bits) - 1)
+        clave = (clave << 16) + rng.integers(0, 1 << 16, size=clave.shape)
+
+        orden = np.argsort(-clave, axis=1)
+        posiciones = np.empty_like(orden)
+        np.put_along_axis(posiciones, orden, np.broadcast_to(np.arange(self.n_equipos), orden.shape), axis=1)
+        return posiciones
+
+    def _conteo_posiciones(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        gl_sim, gv_sim = self._muestrear_goles(n, rng)
+        posiciones = self._clasificacion(gl_sim, gv_sim, rng)
+        conteo = np.zeros((self.n_equipos, self.n_equipos), dtype=np.int64)
+        for equipo in range(self.n_equipos):
+            conteo[equipo] = np.bincount(posiciones[:, equipo], minlength=self.n_equipos)
+        return conteo
+
+    def simular(self, n_temporadas: int = 100_000, semilla: int = 2026,
+                procesos: int = 1, bloque: int = BLOQUE_TEMPORADAS) -> np.ndarray:
+        """
+        Devuelve la matriz equipos × posiciones con la probabilidad de acabar
+        en cada puesto. Bloques con semillas independientes derivadas de 'semilla'.
+        """
+        tamanos = [bloque] * (n_temporadas // bloque)
+        if n_temporadas % bloque:
+            tamanos.append(n_temporadas % bloque)
+        semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+        tareas = [(self, tam, s) for tam, s in zip(tamanos, semillas)]
+
+        if procesos > 1:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                conteos = list(pool.map(_simular_bloque, tareas))
+        else:
+            conteos = [_simular_bloque(t) for t in tareas]
+
+        return np.sum(conteos, axis=0) / n_temporadas
+
+    def mercados_outright(self, prob_posiciones: np.ndarray, liga: str) -> Dict[str, Dict[str, float]]:
+        """Probabilidad de cada zona (título, top 4, descenso, ascenso...) por equipo"""
+        acumulada = np.cumsum(prob_posiciones, axis=1)
+        resultado = {}
+        for zona, (desde, hasta) in ZONAS.get(liga, {}).items():
+            hasta = min(hasta, self.n_equipos)
+            previa = acumulada[:, desde - 2] if desde > 1 else 0.0
+            prob = acumulada[:, hasta - 1] - previa
+            resultado[zona] = {equipo: round(float(p), 4) for equipo, p in zip(self.equipos, prob)}
+        return resultado
+
+
+def construir_simulador(analyzer, resultados: Dict[str, np.ndarray],
+                        calendario: List[Dict], liga: str) -> SimuladorTemporada:
+    """
+    Prepara el simulador de una liga: tabla desde los resultados ya jugados y
+    lambdas de los partidos pendientes con analyzer.calculate_lambda_values.
+    Sustituye analyzer.partidos por los partidos pendientes.
+    """
+    mascara = resultados['liga'] == liga
+    local_j = resultados['local'][mascara]
+    visit_j = resultados['visitante'][mascara]
+    gl = resultados['goles_local'][mascara]
+    gv = resultados['goles_visitante'][mascara]
+    orden_fechas = np.argsort(resultados['fecha'][mascara], kind='stable')
+
+    equipos = sorted(set(local_j) | set(visit_j) |
+                     {p['local'] for p in calendario} | {p['visitante'] for p in calendario})
+    idx = {e: k for k, e in enumerate(equipos)}
+
+    # Estadísticas actuales por equipo para construir los partidos pendientes
+    estado = EstadoLiga(equipos)
+    for k in orden_fechas:
+        estado.aplicar(local_j[k], visit_j[k], int(gl[k]), int(gv[k]))
+    partidos = estado.partidos(calendario)
+
+    # ELO para equipos que el analizador aún no conoce (misma regla por posición)
+    analyzer.partidos = partidos
+    analyzer.initialize_elo()
+
+    lambdas = np.array([analyzer.calculate_lambda_values(p) for p in partidos]).reshape(-1, 2)
+    pendientes = {
+        'local': np.array([idx[p['local']] for p in partidos], dtype=int),
+        'visitante': np.array([idx[p['visitante']] for p in partidos], dtype=int),
+        'lambda_home': lambdas[:, 0],
+        'lambda_away': lambdas[:, 1],
+    }
+    jugados = {
+        'local': np.array([idx[e] for e in local_j], dtype=int),
+        'visitante': np.array([idx[e] for e in visit_j], dtype=int),
+        'goles_local': gl,
+        'goles_visitante': gv,
+    }
+    return SimuladorTemporada(equipos, jugados, pendientes, rho=analyzer.rho)
+
+
+def cargar_calendario(path: str) -> List[Dict]:
+    """Calendario pendiente en CSV: fecha,liga,local,visitante (equipos con su nombre canónico)"""
+    registro = registro_por_defecto()
+    with open(path, 'r', encoding='utf-8') as f:
+        calendario = list(csv.DictReader(f))
+    for partido in calendario:
+        partido['local'] = registro.canonico(partido['local'])
+        partido['visitante'] = registro.canonico(partido['visitante'])
+    return calendario
+
+
+def main():
+    """Simula el resto de temporada de cada liga del calendario"""
+    from betting_analyzer import AdvancedBettingAnalyzer
+    from ajuste_dixon_coles import AjustadorDixonColes, cargar_resultados
+
+    resultados_path = sys.argv[1] if len(sys.argv) > 1 else 'data/resultados.csv'
+    calendario_path = sys.argv[2] if len(sys.argv) > 2 else 'data/calendario.csv'
+    n_temporadas = int(os.getenv('SIM_TEMPORADAS', '100000'))
+    procesos = int(os.getenv('SIM_PROCESOS', str(os.cpu_count() or 1)))
+    output_path = os.getenv('OUTRIGHTS_OUTPUT_PATH', 'public/data/outrights.json')
+
+    resultados = cargar_resultados(resultados_path)
+    calendario = cargar_calendario(calendario_path)
+    parametros_dc = AjustadorDixonColes.cargar(os.getenv('PARAMETROS_DC_PATH', 'data/parametros_dc.json'))
+    analyzer = AdvancedBettingAnalyzer(parametros_dc=parametros_dc)
+
+    salida = {'fecha_generacion': datetime.now().isoformat(), 'temporadas_simuladas': n_temporadas, 'ligas': {}}
+    for liga in sorted({p['liga'] for p in calendario}):
+        inicio = datetime.now()
+        simulador = construir_simulador(analyzer, resultados,
+                                        [p for p in calendario if p['liga'] == liga], liga)
+        prob = simulador.simular(n_temporadas, procesos=procesos)
+        salida['ligas'][liga] = simulador.mercados_outright(prob, liga)
+        segundos = (datetime.now() - inicio).total_seconds()
+        print(f"✅ {liga}: {n_temporadas} temporadas simuladas en {segundos:.1f}s")
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(salida, f, ensure_ascii=False, indent=2)
+    print(f"📁 Outrights guardados en: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Almacén de jornadas: ida y vuelta de partidos y cuotas (todos los libros)
+Uso: python -m pytest scripts/test_almacen_datos.py
+"""
+
+import numpy as np
+
+from almacen_datos import AlmacenJornadas, MERCADOS_CUOTAS
+from betting_analyzer import AdvancedBettingAnalyzer
+
+CUOTAS = {
+    1: {'home': 2.10, 'draw': 3.30, 'away': 3.60, 'btts_yes': 1.80, 'btts_no': 1.95,
+        'over25': 1.90, 'under25': 1.85},
+    2: {'home': 1.55, 'draw': 4.00, 'away': 6.00, 'btts_yes': 2.05, 'btts_no': 1.70},
+}
+
+
+def partidos_prueba():
+    return [{
+        'id': k, 'local_pos': 2 * k, 'visitante_pos': 2 * k + 1,
+        'local_goles_favor': 30, 'local_goles_contra': 20,
+        'visitante_goles_favor': 25, 'visitante_goles_contra': 25,
+        'local': f"Local Prueba {k}", 'visitante': f"Visitante Prueba {k}",
+        'fecha': '2026-02-13', 'hora': '21:00', 'estadio': '', 'liga': 'LaLiga EA Sports',
+        'local_forma': 'VVEDV', 'visitante_forma': 'DEVVE',
+        'local_ultimos_5': [3, 3, 1, 0, 3], 'visitante_ultimos_5': [0, 1, 3, 3, 1],
+    } for k in (1, 2)]
+
+
+def test_cuotas_ida_y_vuelta(tmp_path):
+    almacen = AlmacenJornadas(str(tmp_path))
+    almacen.guardar('2025-26', 'primera_division', 24, partidos_prueba(), CUOTAS)
+    partidos, cuotas = almacen.cargar('2025-26', 'primera_division', 24)
+    assert len(partidos) == 2
+    assert cuotas == CUOTAS
+
+
+def test_npz_antiguo_sin_no_ni_under(tmp_path):
+    almacen = AlmacenJornadas(str(tmp_path))
+    path = almacen.guardar('2025-26', 'primera_division', 24, partidos_prueba(), CUOTAS)
+    # Formato anterior: solo home/draw/away/btts_yes/over25
+    with np.load(path) as datos:
+        columnas = {clave: datos[clave] for clave in datos.files}
+    antiguos = ('home', 'draw', 'away', 'btts_yes', 'over25')
+    columnas['cuotas'] = columnas['cuotas'][:, [MERCADOS_CUOTAS.index(m) for m in antiguos]]
+    columnas['mercados'] = np.array(antiguos)
+    np.savez_compressed(path, **columnas)
+
+    _, cuotas = almacen.cargar('2025-26', 'primera_division', 24)
+    assert cuotas[1] == {m: CUOTAS[1][m] for m in antiguos}
+    assert 'btts_no' not in cuotas[2]
+
+
+def test_probs_justas_btts_y_over_under(tmp_path):
+    almacen = AlmacenJornadas(str(tmp_path))
+    almacen.guardar('2025-26', 'primera_division', 24, partidos_prueba(), CUOTAS)
+    analyzer = AdvancedBettingAnalyzer(fuente=almacen, jornadas=[('2025-26', 'primera_division', 24)])
+
+    completo = analyzer.probs_justas[1]
+    for si, no in (('btts_yes', 'btts_no'), ('over25', 'under25')):
+        assert 0 < completo[si] < 1
+        assert abs(completo[si] + completo[no] - 1) < 1e-9
+        assert completo[f'margen_{si}'] > 0
+    # Libro O/U incompleto en el partido 2: sin probabilidades justas
+    assert 'btts_no' in analyzer.probs_justas[2]
+    assert 'over25' not in analyzer.probs_justas[2]
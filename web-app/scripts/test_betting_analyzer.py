@@ -0,0 +1,41 @@
+"""
+Analizador sobre la jornada sintética de benchmarks.py
+Uso: python -m pytest scripts/test_betting_analyzer.py
+"""
+
+import numpy as np
+
+from benchmarks import analizador_sintetico
+from calibracion import CalibradorMercados
+from salida_web import a_json
+
+
+def test_dc_y_ah_con_precio_de_la_matriz():
+    analyzer = analizador_sintetico(16)
+    # Tablas ajustadas cargadas: no deben tocar los mercados sin calibrador (DC/AH)
+    rng = np.random.default_rng(7)
+    probs = rng.uniform(0.05, 0.95, 2000)
+    analyzer.calibrador = CalibradorMercados.ajustar({
+        mercado: {'prob': probs, 'resultado': (rng.uniform(size=2000) < probs ** 1.3).astype(int)}
+        for mercado in ('1x2', 'btts', 'over25')})
+
+    for partido in analyzer.partidos:
+        mercados = analyzer.mercados_partido(partido)
+        picks = {pick.tipo: pick for pick in analyzer.generar_predicciones(partido)}
+
+        dc = max(float(mercados['dc_1x']), float(mercados['dc_x2']))
+        assert picks['Doble Oportunidad'].confianza == round(dc * 100, 1)
+        assert picks['Doble Oportunidad'].cuota_justa == round(1 / dc, 2)
+
+        ah = picks['Asian Handicap']
+        precios = np.concatenate([mercados['ah_local'], mercados['ah_visitante']]).tolist()
+        assert any(round(p * 100, 1) == ah.confianza and round(1 / p, 2) == ah.cuota_justa for p in precios)
+
+
+def test_pool_de_procesos_igual_que_serie():
+    # 380 partidos: varias competiciones y jornadas, un shard por cada par
+    serie = analizador_sintetico(380).generar_reporte_completo()
+    paralelo = analizador_sintetico(380).generar_reporte_completo(procesos=4)
+    for reporte in (serie, paralelo):
+        reporte.pop('fecha_generacion')
+    assert a_json(paralelo) == a_json(serie)
@@ -0,0 +1,76 @@
+"""
+Búsqueda de hiperparámetros: selección sobre el tramo de validación
+Uso: python -m pytest scripts/test_busqueda_hiperparametros.py
+"""
+
+import numpy as np
+import pytest
+
+from almacen_cuotas import SELECCIONES
+from backtest import COMPONENTES, SALIDAS_MODELO
+from busqueda_hiperparametros import (OBJETIVOS, RHO_CANDIDATOS, buscar, configuraciones_aleatorias,
+                                      dividir_validacion)
+
+N = 1000
+
+
+def componentes_sinteticos(semilla: int = 5) -> dict:
+    """Salidas del ensemble y resultados de N partidos en orden cronológico, sin cuotas"""
+    rng = np.random.default_rng(semilla)
+    datos = {'goles_local': rng.poisson(1.5, N), 'goles_visitante': rng.poisson(1.1, N)}
+    for seleccion in SELECCIONES:
+        datos[f'cuota_{seleccion}'] = np.full(N, np.nan)
+        datos[f'cierre_{seleccion}'] = np.full(N, np.nan)
+
+    def mercados():
+        p_1x2 = rng.dirichlet([4, 2.5, 3], N)
+        return {'home': p_1x2[:, 0], 'draw': p_1x2[:, 1], 'away': p_1x2[:, 2],
+                'btts': rng.uniform(0.3, 0.7, N), 'over25': rng.uniform(0.3, 0.7, N)}
+
+    salidas = {**mercados(), 'expected_home_goals': rng.uniform(0.5, 2.5, N),
+               'expected_away_goals': rng.uniform(0.5, 2.5, N), 'elo_home': rng.uniform(0.2, 0.8, N)}
+    forma = mercados()
+    salidas.update({f'forma_{clave}': forma[clave] for clave in ('home', 'draw', 'away')})
+    assert set(SALIDAS_MODELO + COMPONENTES) <= set(salidas)
+    return {'datos': datos, 'salidas': salidas, 'poisson': {rho: mercados() for rho in RHO_CANDIDATOS}}
+
+
+def test_validacion_es_el_tramo_final():
+    componentes = componentes_sinteticos()
+    validacion, _ = dividir_validacion(componentes, 0.3)
+    np.testing.assert_array_equal(validacion['datos']['goles_local'], componentes['datos']['goles_local'][-300:])
+    np.testing.assert_array_equal(validacion['salidas']['home'], componentes['salidas']['home'][-300:])
+    for rho in RHO_CANDIDATOS:
+        np.testing.assert_array_equal(validacion['poisson'][rho]['btts'], componentes['poisson'][rho]['btts'][-300:])
+
+
+def test_calibrador_sin_datos_de_validacion():
+    componentes = componentes_sinteticos()
+    _, calibrador = dividir_validacion(componentes, 0.3)
+    # Otros resultados en la validación: mismo calibrador
+    for clave in ('goles_local', 'goles_visitante'):
+        componentes['datos'][clave][-300:] = np.random.default_rng(9).poisson(3.0, 300)
+    _, otro = dividir_validacion(componentes, 0.3)
+    for mercado, tabla in calibrador.tablas.items():
+        np.testing.assert_array_equal(otro.tablas[mercado].valores, tabla.valores)
+
+
+def test_ranking_solo_con_la_validacion():
+    componentes = componentes_sinteticos()
+    validacion, calibrador = dividir_validacion(componentes, 0.3)
+    configuraciones = configuraciones_aleatorias(40)
+    resultados = buscar(configuraciones, validacion, calibrador, objetivo='log_loss')
+
+    clave, _ = OBJETIVOS['log_loss']
+    assert [r[clave] for r in resultados] == sorted(r[clave] for r in resultados)
+    # El tramo de entrenamiento no interviene una vez ajustado el calibrador
+    for salida in componentes['salidas'].values():
+        salida[:-300] = np.random.default_rng(3).permutation(salida[:-300])
+    otra_validacion, _ = dividir_validacion(componentes, 0.3)
+    assert buscar(configuraciones, otra_validacion, calibrador, objetivo='log_loss') == resultados
+
+
+@pytest.mark.parametrize('fraccion', [0.0, 1.0])
+def test_fraccion_sin_partidos_a_un_lado(fraccion):
+    with pytest.raises(ValueError):
+        dividir_validacion(componentes_sinteticos(), fraccion)
@@ -0,0 +1,100 @@
+"""
+Calibradores Platt e isotónico frente a curvas de calibración conocidas
+Uso: python -m pytest scripts/test_calibracion.py
+"""
+
+import numpy as np
+import pytest
+
+from calibracion import (CalibradorMercados, TablaCalibracion, _logit, _sigmoide,
+                         ajustar_isotonica, ajustar_platt, calibracion_fija)
+
+N = 20000
+REJILLA = np.linspace(0.05, 0.95, 19)
+
+
+def muestras(curva, semilla: int = 2026, n: int = N):
+    """Probabilidades del modelo y resultados simulados con la probabilidad real curva(p)"""
+    rng = np.random.default_rng(semilla)
+    probs = rng.uniform(0.02, 0.98, n)
+    return probs, (rng.uniform(size=n) < curva(probs)).astype(int)
+
+
+def log_loss(probs, resultados):
+    probs = np.clip(probs, 1e-12, 1 - 1e-12)
+    return float(-np.mean(resultados * np.log(probs) + (1 - resultados) * np.log(1 - probs)))
+
+
+def test_platt_recupera_la_curva_real():
+    curva = lambda p: _sigmoide(0.7 * _logit(p) + 0.3)
+    tabla = TablaCalibracion.ajustar(*muestras(curva), metodo='platt')
+    assert np.abs(tabla.aplicar(REJILLA) - curva(REJILLA)).max() < 0.02
+
+
+def test_platt_ya_calibrado_es_la_identidad():
+    tabla = TablaCalibracion.ajustar(*muestras(lambda p: p), metodo='platt')
+    assert np.abs(tabla.aplicar(REJILLA) - REJILLA).max() < 0.02
+
+
+def test_platt_con_poca_senal_converge():
+    # Probabilidades casi constantes sin relación con el resultado: el Newton sin amortiguar divergía
+    rng = np.random.default_rng(11)
+    probs = rng.uniform(0.48, 0.52, 5000)
+    resultados = (rng.uniform(size=5000) < 0.3).astype(int)
+    valores = ajustar_platt(probs, resultados)
+    assert np.all(np.isfinite(valores))
+    calibradas = np.interp(probs, np.linspace(0, 1, len(valores)), valores)
+    assert abs(calibradas.mean() - resultados.mean()) < 0.01
+    assert log_loss(calibradas, resultados) <= log_loss(probs, resultados)
+
+
+def test_platt_sin_senal_es_la_tasa_base():
+    # Rango estrecho y resultados independientes: el ajuste libre tiene pendiente
+    # negativa, que la tabla monótona convertiría en ~1 para todo p
+    rng = np.random.default_rng(0)
+    probs = rng.uniform(0.045, 0.055, 400)
+    resultados = (rng.uniform(size=400) < 0.7).astype(int)
+    tabla = TablaCalibracion.ajustar(probs, resultados, metodo='platt')
+    np.testing.assert_allclose(tabla.aplicar(REJILLA), resultados.mean(), atol=0.01)
+    assert tabla.brier_despues <= tabla.brier_antes
+
+
+def test_isotonica_recupera_la_curva_real():
+    curva = lambda p: p ** 1.5
+    probs, resultados = muestras(curva)
+    tabla = TablaCalibracion.ajustar(probs, resultados, metodo='isotonica')
+    assert np.abs(tabla.aplicar(REJILLA) - curva(REJILLA)).max() < 0.05
+    # PAV es el óptimo monótono en muestra: no puede empeorar el Brier de la identidad
+    assert tabla.brier_despues <= tabla.brier_antes
+
+
+def test_isotonica_medias_por_bloque():
+    probs = np.array([0.1, 0.2, 0.3, 0.4])
+    resultados = np.array([1, 0, 0, 1])
+    valores = ajustar_isotonica(probs, resultados)
+    rejilla = np.linspace(0, 1, len(valores))
+    # Bloques PAV: {0.1, 0.2, 0.3} con media 1/3 y {0.4} con 1
+    np.testing.assert_allclose(np.interp(probs, rejilla, valores), [1 / 3, 1 / 3, 1 / 3, 1], atol=1e-9)
+
+
+@pytest.mark.parametrize('metodo', ['platt', 'isotonica'])
+def test_tablas_monotonas_en_rango(metodo):
+    tabla = TablaCalibracion.ajustar(*muestras(lambda p: 0.2 + 0.6 * p, n=3000), metodo=metodo)
+    assert np.all(np.diff(tabla.valores) >= 0)
+    assert tabla.valores.min() >= 0 and tabla.valores.max() <= 1
+
+
+def test_guardar_y_cargar(tmp_path):
+    probs, resultados = muestras(lambda p: p ** 1.2, n=3000)
+    calibrador = CalibradorMercados.ajustar({'1x2': {'prob': probs, 'resultado': resultados}})
+    path = str(tmp_path / 'calibracion.json')
+    calibrador.guardar(path)
+    cargado = CalibradorMercados.cargar(path)
+    np.testing.assert_allclose(cargado.aplicar('1x2', REJILLA), calibrador.aplicar('1x2', REJILLA), atol=1e-6)
+    # Mercado sin tabla: fórmula fija
+    np.testing.assert_array_equal(cargado.aplicar('btts', REJILLA), calibracion_fija(REJILLA))
+
+
+def test_metodo_desconocido():
+    with pytest.raises(ValueError):
+        TablaCalibracion.ajustar([0.2, 0.8], [0, 1], metodo='beta')
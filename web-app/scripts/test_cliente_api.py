@@ -0,0 +1,166 @@
+"""
+Cliente de API-Football contra el mock local (mock_api_football.py)
+Uso: python -m pytest scripts/test_cliente_api.py
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip('aiohttp')
+from aiohttp import web
+
+from actualizar_partidos import ActualizadorPartidos, TEMPORADA
+from almacen_datos import AlmacenJornadas
+from cache_http import CacheHttp
+from cliente_api import ClienteApiFootball, CuotaAgotada, LIGAS_API, LimitadorCuota
+from mock_api_football import ESTADO, crear_app, datos_mock
+
+PARTIDOS = 25
+POR_PAGINA = 10
+LIGA = LIGAS_API['primera_division']
+
+
+@pytest.fixture
+def respuestas(tmp_path):
+    """Jornada de PARTIDOS partidos con los libros completos, servida por el mock"""
+    almacen = AlmacenJornadas(str(tmp_path / 'jornadas'))
+    partidos = [{
+        'id': k, 'local_pos': 1 + k % 20, 'visitante_pos': 1 + (k + 7) % 20,
+        'local_goles_favor': 30, 'local_goles_contra': 20,
+        'visitante_goles_favor': 25, 'visitante_goles_contra': 25,
+        'local': f"Local Mock {k}", 'visitante': f"Visitante Mock {k}",
+        'fecha': '2026-02-13', 'hora': '21:00', 'estadio': f"Estadio {k}", 'liga': 'LaLiga EA Sports',
+        'local_forma': 'VVEDV', 'visitante_forma': 'DEVVE',
+        'local_ultimos_5': [3, 3, 1, 0, 3], 'visitante_ultimos_5': [0, 1, 3, 3, 1],
+    } for k in range(1, PARTIDOS + 1)]
+    cuotas = {k: {'home': 2.1, 'draw': 3.3, 'away': 3.6, 'btts_yes': 1.8, 'btts_no': 1.95,
+                  'over25': 1.9, 'under25': 1.85} for k in range(1, PARTIDOS + 1)}
+    almacen.guardar(TEMPORADA, 'primera_division', 24, partidos, cuotas)
+    return datos_mock(almacen)
+
+
+@asynccontextmanager
+async def servidor(respuestas, **opciones):
+    """Mock en un puerto libre; devuelve (url, estado con el contador de peticiones)"""
+    app = crear_app(respuestas, latencia_s=0.0, por_pagina=POR_PAGINA, **opciones)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    sitio = web.TCPSite(runner, '127.0.0.1', 0)
+    await sitio.start()
+    host, puerto = runner.addresses[0][:2]
+    try:
+        yield f"http://{host}:{puerto}", app[ESTADO]
+    finally:
+        await runner.cleanup()
+
+
+def cliente(url: str, cache=None, diario=None, por_minuto=None) -> ClienteApiFootball:
+    return ClienteApiFootball(api_key='mock', base_url=url, cache=cache, espera_base_s=0.01,
+                              diario=diario or LimitadorCuota(100, 86400),
+                              por_minuto=por_minuto or LimitadorCuota(100, 60))
+
+
+def test_cuotas_paginadas(respuestas, monkeypatch):
+    monkeypatch.setenv('API_CACHE_DIR', '')
+
+    async def pedir():
+        async with servidor(respuestas) as (url, estado):
+            async with cliente(url) as api:
+                return await api.cuotas(LIGA, 2025), estado['peticiones']
+
+    cuotas, peticiones = asyncio.run(pedir())
+    assert peticiones == -(-PARTIDOS // POR_PAGINA)
+    assert sorted(c['fixture']['id'] for c in cuotas) == [1000 + k for k in range(1, PARTIDOS + 1)]
+
+
+def test_limite_por_minuto_espera(respuestas, monkeypatch):
+    monkeypatch.setenv('API_CACHE_DIR', '')
+
+    async def pedir():
+        async with servidor(respuestas) as (url, estado):
+            # 2 peticiones por segundo: las 4 que exceden la ráfaga esperan 0.5s cada una
+            async with cliente(url, por_minuto=LimitadorCuota(2, 1.0, max_espera_s=5)) as api:
+                inicio = time.perf_counter()
+                await asyncio.gather(*(api.get('fixtures', league=LIGA, season=2025, round=k) for k in range(6)))
+                return time.perf_counter() - inicio, estado['peticiones']
+
+    segundos, peticiones = asyncio.run(pedir())
+    assert peticiones == 6
+    assert segundos >= 1.8
+
+
+def test_cuota_diaria_agotada_y_cabeceras(respuestas, monkeypatch):
+    monkeypatch.setenv('API_CACHE_DIR', '')
+
+    async def pedir():
+        async with servidor(respuestas, cuota=50) as (url, estado):
+            async with cliente(url, diario=LimitadorCuota(3, 86400)) as api:
+                await api.get('standings', league=LIGA, season=2025)
+                with pytest.raises(CuotaAgotada):
+                    for k in range(3):
+                        await api.get('fixtures', league=LIGA, season=2025, round=k)
+                return api.diario.gastadas, estado['peticiones']
+
+    gastadas, peticiones = asyncio.run(pedir())
+    assert gastadas == peticiones == 3
+
+    async def sincronizar():
+        # El servidor solo deja 2 peticiones: su cuenta manda sobre la local
+        async with servidor(respuestas, cuota=2) as (url, _):
+            async with cliente(url) as api:
+                await api.get('standings', league=LIGA, season=2025)
+                return api.diario.tokens
+
+    assert asyncio.run(sincronizar()) <= 1
+
+
+def test_cache_fresca_sin_red_y_revalidacion_etag(respuestas, tmp_path):
+    cache = CacheHttp(str(tmp_path / 'cache'))
+
+    async def pedir():
+        async with servidor(respuestas) as (url, estado):
+            async with cliente(url, cache=cache) as api:
+                primera = await api.cuotas(LIGA, 2025)
+                descargadas = estado['peticiones']
+                # TTL vigente: ninguna petición de red ni cuota gastada
+                segunda = await api.cuotas(LIGA, 2025)
+                assert estado['peticiones'] == descargadas
+                assert api.diario.gastadas == descargadas
+
+                # Caducadas: se revalidan con If-None-Match y el mock responde 304
+                for pagina in range(1, descargadas + 1):
+                    params = {'league': LIGA, 'season': 2025, **({'page': pagina} if pagina > 1 else {})}
+                    entrada = cache.obtener('odds', params)
+                    entrada['guardado'] -= 2 * 3600
+                    cache._escribir(entrada)
+                tercera = await api.cuotas(LIGA, 2025)
+                return primera, segunda, tercera, descargadas, estado['peticiones']
+
+    primera, segunda, tercera, descargadas, peticiones = asyncio.run(pedir())
+    assert primera == segunda == tercera
+    assert peticiones == 2 * descargadas
+    assert cache.informe() == {'aciertos': descargadas, 'revalidadas': descargadas, 'descargas': descargadas,
+                               'caducadas': 0, 'tasa_aciertos': round(1 / 3, 3)}
+
+
+def test_cuotas_no_y_under_se_guardan(respuestas, tmp_path, monkeypatch):
+    monkeypatch.setenv('API_CACHE_DIR', '')
+    monkeypatch.setenv('EQUIPOS_PATH', str(tmp_path / 'equipos.json'))
+
+    async def pedir():
+        async with servidor(respuestas) as (url, _):
+            async with cliente(url) as api:
+                return await api.refrescar({'primera_division': LIGA}, 2025, '2026-02-13', '2026-02-20')
+
+    actualizador = ActualizadorPartidos('api')
+    datos = actualizador.formatear_partidos_api(asyncio.run(pedir()))
+    almacen = AlmacenJornadas(str(tmp_path / 'guardadas'))
+    actualizador.guardar_jornadas_api(datos, almacen)
+
+    _, cuotas = almacen.cargar(TEMPORADA, 'primera_division', 24)
+    assert len(cuotas) == PARTIDOS
+    for cuota in cuotas.values():
+        assert cuota['btts_no'] == 1.95 and cuota['under25'] == 1.85
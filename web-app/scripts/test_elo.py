@@ -0,0 +1,61 @@
+"""
+Motor ELO incremental: checkpoints y alias de equipos
+Uso: python -m pytest scripts/test_elo.py
+"""
+
+import numpy as np
+
+from elo import ELO_BASE, MotorElo
+from equipos import RegistroEquipos
+
+
+def registro_prueba() -> RegistroEquipos:
+    registro = RegistroEquipos()
+    registro.registrar('Real Madrid', alias=['R. Madrid'])
+    registro.registrar('Barcelona')
+    registro.registrar('Sevilla')
+    return registro
+
+
+def resultados(filas):
+    fecha, local, visitante, gl, gv = zip(*filas)
+    return {'fecha': np.array(fecha, dtype='datetime64[D]'), 'local': np.array(local),
+            'visitante': np.array(visitante), 'goles_local': np.array(gl), 'goles_visitante': np.array(gv)}
+
+
+def test_checkpoint_antiguo_con_alias(tmp_path):
+    # Checkpoint anterior al registro: dos filas para el mismo equipo
+    np.savez_compressed(tmp_path / 'elo_2025-01-01.npz',
+                        equipos=np.array(['Real Madrid', 'Barcelona', 'R. Madrid']),
+                        ratings=np.array([1600.0, 1520.0, 1580.0]),
+                        fecha=np.array('2025-01-01'), partidos=np.array(10))
+    motor = MotorElo.cargar_ultimo(str(tmp_path), registro=registro_prueba())
+
+    assert motor.como_dict() == {'Real Madrid': 1590.0, 'Barcelona': 1520.0}
+    # Un equipo nuevo no puede ocupar el hueco de un rating existente
+    motor.actualizar('Sevilla', 'R. Madrid', 1, 1)
+    ratings = motor.como_dict()
+    assert ratings['Barcelona'] == 1520.0
+    assert ratings['Sevilla'] > ELO_BASE and ratings['Real Madrid'] < 1590.0
+
+    motor.guardar_checkpoint(str(tmp_path))
+    recargado = MotorElo.cargar_ultimo(str(tmp_path), registro=motor.registro)
+    assert recargado.como_dict() == ratings
+
+
+def test_incremental_igual_que_recalcular(tmp_path):
+    partidos = [
+        ('2025-01-04', 'Real Madrid', 'Barcelona', 2, 1),
+        ('2025-01-05', 'Sevilla', 'R. Madrid', 0, 0),
+        ('2025-01-11', 'Barcelona', 'Sevilla', 3, 0),
+        ('2025-01-11', 'Real Madrid', 'Sevilla', 1, 2),
+    ]
+    completo = MotorElo(registro=registro_prueba())
+    completo.procesar(resultados(partidos))
+
+    # Primera pasada sin el partido tardío del día 11; se aplica al recargar
+    registro = registro_prueba()
+    MotorElo(registro=registro).procesar(resultados(partidos[:3]), str(tmp_path))
+    motor = MotorElo.cargar_ultimo(str(tmp_path), registro=registro)
+    assert motor.procesar(resultados(partidos)) == 1
+    assert motor.como_dict() == completo.como_dict()
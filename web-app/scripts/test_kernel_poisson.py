@@ -0,0 +1,49 @@
+"""
+Kernel Poisson nativo frente a scipy.stats.poisson
+Uso: python -m pytest scripts/test_kernel_poisson.py
+"""
+
+import numpy as np
+import pytest
+
+from kernel_poisson import cdf, cdf_tabla, log_pmf_tabla, pmf, pmf_tabla, verificar_contra_scipy
+
+poisson = pytest.importorskip('scipy.stats').poisson
+
+LAMBDAS = np.concatenate([[0.0, 1e-12, 1e-6], np.linspace(0.01, 12.0, 200), [25.0, 40.0, 150.0]])
+MAX_K = 250
+
+
+def test_pmf_y_cdf_tabla():
+    k = np.arange(MAX_K + 1)
+    np.testing.assert_allclose(pmf_tabla(LAMBDAS, MAX_K), poisson.pmf(k, LAMBDAS[:, None]), rtol=0, atol=1e-13)
+    np.testing.assert_allclose(cdf_tabla(LAMBDAS, MAX_K), poisson.cdf(k, LAMBDAS[:, None]), rtol=0, atol=1e-12)
+
+
+def test_log_pmf_k_grande():
+    # En la cola (k >> λ) la pmf es 0 en float64: se compara el logaritmo
+    k = np.arange(MAX_K + 1)
+    lambdas = LAMBDAS[LAMBDAS > 0]
+    np.testing.assert_allclose(log_pmf_tabla(lambdas, MAX_K), poisson.logpmf(k, lambdas[:, None]),
+                               rtol=1e-10, atol=1e-10)
+
+
+def test_lambda_cero():
+    tabla = pmf_tabla([0.0], 5)
+    np.testing.assert_array_equal(tabla, [[1.0, 0, 0, 0, 0, 0]])
+    np.testing.assert_array_equal(cdf_tabla([0.0], 5), np.ones((1, 6)))
+    assert log_pmf_tabla([0.0], 3)[0, 0] == 0.0
+    assert np.all(np.isneginf(log_pmf_tabla([0.0], 3)[0, 1:]))
+
+
+def test_broadcasting_lambda_vectorial():
+    lambdas = np.array([[0.3], [1.7], [4.2]])
+    k = np.array([0, 1, 5, 12])
+    assert pmf(k, lambdas).shape == (3, 4)
+    np.testing.assert_allclose(pmf(k, lambdas), poisson.pmf(k, lambdas), rtol=1e-12, atol=0)
+    np.testing.assert_allclose(cdf(k, lambdas), poisson.cdf(k, lambdas), rtol=1e-12, atol=0)
+    np.testing.assert_allclose(pmf(3, [0.5, 2.0]), poisson.pmf(3, [0.5, 2.0]), rtol=1e-12)
+
+
+def test_verificacion_main():
+    assert verificar_contra_scipy() < 1e-12
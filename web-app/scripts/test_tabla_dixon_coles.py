@@ -0,0 +1,52 @@
+"""
+Tabla Dixon-Coles interpolada frente al modelo exacto (cota de error del docstring)
+Uso: python -m pytest scripts/test_tabla_dixon_coles.py
+"""
+
+import numpy as np
+import pytest
+
+from dixon_coles import poisson_dixon_coles_batch
+from tabla_dixon_coles import LAMBDA_MAX, LAMBDA_MIN, MERCADOS_1D, RHO_MAX, RHO_MIN, TablaDixonColes
+
+COTA_ERROR = 1.1e-3
+COTA_ERROR_NODO_RHO = 2.5e-4
+COTA_ERROR_NODO_RHO_AH = 8e-4
+MERCADOS_DERIVADOS = ('dc_1x', 'dc_x2', 'dc_12', 'ah_local', 'ah_visitante')
+
+
+@pytest.fixture(scope='module')
+def tabla(tmp_path_factory):
+    return TablaDixonColes(str(tmp_path_factory.mktemp('tabla') / 'tabla_dixon_coles.npy'))
+
+
+def errores(tabla, lh, la, rho):
+    aproximado = tabla.consultar_batch(lh, la, rho)
+    exacto = poisson_dixon_coles_batch(lh, la, rho)
+    return {m: float(np.abs(aproximado[m] - exacto[m]).max()) for m in MERCADOS_1D + MERCADOS_DERIVADOS}
+
+
+def test_cota_medida_al_construir(tabla):
+    assert 0 < tabla.meta['error_max'] <= COTA_ERROR
+
+
+def test_error_en_puntos_aleatorios(tabla):
+    rng = np.random.default_rng(2026)
+    lh, la = rng.uniform(LAMBDA_MIN, LAMBDA_MAX, (2, 20000))
+    rho = rng.uniform(RHO_MIN, RHO_MAX, 20000)
+    assert max(errores(tabla, lh, la, rho).values()) <= COTA_ERROR
+
+
+def test_error_con_rho_en_nodo(tabla):
+    rng = np.random.default_rng(7)
+    lh, la = rng.uniform(LAMBDA_MIN, LAMBDA_MAX, (2, 20000))
+    error = errores(tabla, lh, la, 0.10)
+    assert max(error[m] for m in error if not m.startswith('ah_')) <= COTA_ERROR_NODO_RHO
+    assert max(error['ah_local'], error['ah_visitante']) <= COTA_ERROR_NODO_RHO_AH
+
+
+def test_mercados_derivados_coherentes(tabla):
+    consulta = tabla.consultar_batch([0.8, 1.6, 3.1], [2.2, 1.1, 0.4], 0.05)
+    np.testing.assert_allclose(consulta['dc_1x'] + consulta['away'], 1, atol=1e-12)
+    np.testing.assert_allclose(consulta['ah_local'] + consulta['ah_visitante'], 1, atol=1e-12)
+    assert consulta['ah_local'].shape == (3, len(consulta['ejes']['lineas_ah']))